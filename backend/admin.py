@@ -4,11 +4,14 @@ Django admin registrations and admin class customizations for the
 `backend` app. Registers models and configures list display, filters,
 and search fields used by staff in the Django admin site.
 
-Keep admin-specific display and form configuration here.
+Keep admin-specific display and form configuration here. High-volume
+models use the changelist helpers in `backend.admin_utils`.
 """
 
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from .admin_utils import CategoryFilter, LargeTableAdmin, StatusValuesFilter, status_action
+from .models.enums import BoxStatus, DomesticOrderStatus, ItemStatus, SourceOrderStatus
 from .models import (
     User, Warehouse, Locker, InternationalOrder, ShipmentLabel,
     Item, InternationalBox, BoxItem, DomesticOrder, ItemRequest, StatusLog
@@ -52,56 +55,87 @@ class WarehouseAdmin(admin.ModelAdmin):
     search_fields = ('name', 'city', 'country')
 
 @admin.register(Locker)
-class LockerAdmin(admin.ModelAdmin):
+class LockerAdmin(LargeTableAdmin):
     list_display = ('code', 'customer', 'warehouse')
+    list_select_related = ('customer', 'warehouse')
     list_filter = ('warehouse',)
     search_fields = ('code', 'customer__email', 'customer__first_name', 'customer__last_name')  # Changed from username to email
 
 @admin.register(InternationalOrder)
 class InternationalOrderAdmin(admin.ModelAdmin):
     list_display = ('marketplace', 'marketplace_order_ref', 'customer', 'status', 'total_amount')
+    list_select_related = ('customer',)
     list_filter = ('marketplace', 'status')
     search_fields = ('marketplace_order_ref', 'customer__email', 'customer__first_name', 'customer__last_name')  # Changed
+    actions = [
+        status_action(SourceOrderStatus.ARRIVED_WAREHOUSE, 'arrived at warehouse'),
+        status_action(SourceOrderStatus.CANCELLED, 'cancelled'),
+    ]
 
 @admin.register(ShipmentLabel)
 class ShipmentLabelAdmin(admin.ModelAdmin):
     list_display = ('barcode_number', 'customer', 'international_order', 'is_printed')
+    list_select_related = ('customer', 'international_order')
     list_filter = ('is_printed',)
     search_fields = ('barcode_number', 'customer__email', 'customer__first_name', 'customer__last_name')  # Changed
+    actions = ['mark_printed']
+
+    @admin.action(description='Mark selected labels as printed')
+    def mark_printed(self, request, queryset):
+        updated = queryset.filter(is_printed=False).update(is_printed=True)
+        self.message_user(request, f'{updated} label(s) marked as printed.')
 
 @admin.register(Item)
-class ItemAdmin(admin.ModelAdmin):
+class ItemAdmin(LargeTableAdmin):
     list_display = ('tracking_number', 'customer', 'category', 'status', 'condition')
-    list_filter = ('status', 'condition', 'category')
+    list_select_related = ('customer',)
+    # `category` has no choices; CategoryFilter caches its SELECT DISTINCT over items
+    list_filter = ('status', 'condition', CategoryFilter)
     search_fields = ('tracking_number', 'customer__email', 'customer__first_name', 'customer__last_name')  # Changed
+    actions = [
+        status_action(ItemStatus.VALIDATED, 'validated'),
+        status_action(ItemStatus.SHIPPED, 'shipped'),
+    ]
 
 @admin.register(InternationalBox)
-class InternationalBoxAdmin(admin.ModelAdmin):
+class InternationalBoxAdmin(LargeTableAdmin):
     list_display = ('box_number', 'status', 'total_weight_kg', 'items_count')
     list_filter = ('status',)
     search_fields = ('box_number', 'tracking_number')
+    actions = [
+        status_action(BoxStatus.READY_TO_SHIP, 'ready to ship'),
+        status_action(BoxStatus.SHIPPED, 'shipped'),
+    ]
 
 @admin.register(BoxItem)
-class BoxItemAdmin(admin.ModelAdmin):
+class BoxItemAdmin(LargeTableAdmin):
     list_display = ('box', 'item', 'added_at')
+    list_select_related = ('box', 'item__customer')
     list_filter = ('added_at',)
 
 @admin.register(DomesticOrder)
 class DomesticOrderAdmin(admin.ModelAdmin):
     list_display = ('id', 'customer', 'status', 'created_at')
+    list_select_related = ('customer',)
     list_filter = ('status',)
     search_fields = ('customer__email', 'customer__first_name', 'customer__last_name')  # Changed
+    actions = [
+        status_action(DomesticOrderStatus.OUT_FOR_DELIVERY, 'out for delivery'),
+        status_action(DomesticOrderStatus.DELIVERED, 'delivered'),
+    ]
 
 @admin.register(ItemRequest)
 class ItemRequestAdmin(admin.ModelAdmin):
     list_display = ('subject', 'customer', 'status', 'created_at')
+    list_select_related = ('customer',)
     list_filter = ('status',)
     search_fields = ('subject', 'customer__email', 'customer__first_name', 'customer__last_name')  # Changed
 
 @admin.register(StatusLog)
-class StatusLogAdmin(admin.ModelAdmin):
+class StatusLogAdmin(LargeTableAdmin):
     list_display = ('entity_type', 'entity_id', 'status', 'changed_by', 'created_at')
-    list_filter = ('entity_type', 'status')
+    list_select_related = ('changed_by',)
+    list_filter = ('entity_type', StatusValuesFilter)
     search_fields = ('entity_id',)
 
 # Special registration for User model
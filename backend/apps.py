@@ -14,4 +14,13 @@ class BackendConfig(AppConfig):
 
     def ready(self):
         # Import signals to ensure they are registered
-        import backend.models.signals
\ No newline at end of file
+        import backend.models.signals
+
+        # Warm the token blacklist cache when serving starts, not during
+        # management commands (the tables may not exist yet).
+        from django.core.signals import request_started
+        from backend.token_blacklist import warm_on_first_request
+        request_started.connect(warm_on_first_request)
+
+        from backend import db_metrics
+        db_metrics.install()
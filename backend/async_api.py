@@ -0,0 +1,97 @@
+"""backend.async_api
+
+`async_api_view`: async read endpoints with the DRF pieces they need.
+
+DRF's `@api_view` is synchronous, so under ASGI Django runs each such
+view on its sync thread for the whole request. The hot read endpoints
+(stats, boxes, items, customers, `/api/auth/me/`, code lookup) are
+instead `async def` views wrapped with `async_api_view`, which gives
+them:
+
+* authentication through `backend.authentication.aauthenticate` (Bearer
+  token, else the other `DEFAULT_AUTHENTICATION_CLASSES` such as the
+  session or Basic), with the user row read through the async ORM unless
+  the token's role claims make it unnecessary;
+* the same `permission_classes` as the sync views;
+* a DRF `Request` (`query_params`, paginators) and rendering of the
+  returned `Response` with `ORJSONRenderer`; `APIException`s become
+  error responses as in DRF.
+
+Only safe methods are supported: session users are not CSRF-checked,
+and writes need `transaction.atomic`, which has no async API, so write
+endpoints stay synchronous. The browsable API is not offered for these
+views. Under WSGI they still work; Django runs each one in its own event
+loop.
+"""
+
+from functools import wraps
+
+from django.http import HttpResponse
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from backend.authentication import aauthenticate
+from backend.renderers import ORJSONRenderer
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def render(request, data, status_code=status.HTTP_200_OK, headers=None):
+    """An `HttpResponse` with `data` rendered as JSON."""
+    renderer = ORJSONRenderer()
+    response = HttpResponse(
+        renderer.render(data, renderer.media_type, {'request': request}),
+        status=status_code,
+        content_type=renderer.media_type,
+    )
+    for name, value in (headers or {}).items():
+        if name.lower() != 'content-type':
+            response[name] = value
+    return response
+
+
+def _error(request, exc):
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    status_code = exc.status_code
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        # What DRF answers when the first authentication class
+        # (`SessionAuthentication`) sends no `WWW-Authenticate` challenge.
+        status_code = status.HTTP_403_FORBIDDEN
+    return render(request, data, status_code)
+
+
+def async_api_view(http_method_names=('GET',), permission_classes=None):
+    """Decorate an `async def view(request, ...)` returning a DRF `Response`."""
+    unsafe = set(http_method_names) - set(SAFE_METHODS)
+    if unsafe:
+        raise ValueError(f'async_api_view only supports safe methods, got {sorted(unsafe)}')
+    allowed = {*http_method_names, 'OPTIONS'}
+    if 'GET' in allowed:
+        allowed.add('HEAD')
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            drf_request = Request(request)
+            if request.method not in allowed:
+                return _error(drf_request, exceptions.MethodNotAllowed(request.method))
+            try:
+                drf_request.user = await aauthenticate(request)
+                classes = api_settings.DEFAULT_PERMISSION_CLASSES if permission_classes is None else permission_classes
+                for permission in (permission_class() for permission_class in classes):
+                    if not permission.has_permission(drf_request, None):
+                        if not drf_request.user.is_authenticated:
+                            raise exceptions.NotAuthenticated()
+                        raise exceptions.PermissionDenied(getattr(permission, 'message', None))
+                if request.method == 'OPTIONS':
+                    return render(drf_request, None, headers={'Allow': ', '.join(sorted(allowed))})
+                response = await view(drf_request, *args, **kwargs)
+            except exceptions.APIException as exc:
+                return _error(drf_request, exc)
+            if isinstance(response, Response):
+                return render(drf_request, response.data, response.status_code, response.headers)
+            return response
+        return wrapper
+    return decorator
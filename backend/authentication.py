@@ -0,0 +1,173 @@
+"""backend.authentication
+
+JWT authentication that does not load the `User` row on every request.
+
+Tokens issued by `RoleClaimsRefreshToken` carry the user's role and
+display fields (`ROLE_CLAIMS`); access tokens derived from them inherit
+the claims. With `JWT_STATELESS_USER` enabled, `RoleClaimsJWTAuthentication`
+turns such a token into a `RoleTokenUser`, which answers `is_admin()`,
+`is_employee()` and friends from the claims, so permission checks and
+`/api/auth/me/` run without a query. Tokens without the claims (issued
+before this change) fall back to the usual database lookup.
+
+Claims are a snapshot taken at login or refresh: a role change or
+deactivation takes effect when the access token is next refreshed.
+Views that need current data or a model instance call `db_user(request)`.
+
+`aauthenticate`, `aget_user` and `adb_user` are the counterparts for the
+async views in `backend.async_api`.
+"""
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.utils.functional import cached_property
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework.settings import api_settings as drf_settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from backend.models import User
+from backend.models.user_models import RoleMixin
+
+ROLE_CLAIMS = ('email', 'first_name', 'last_name', 'role')
+
+
+def add_role_claims(token, user):
+    """Copy `ROLE_CLAIMS` from `user` into `token`."""
+    for claim in ROLE_CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+class RoleClaimsRefreshToken(RefreshToken):
+    """Refresh token whose access tokens carry role and display claims."""
+
+    @classmethod
+    def for_user(cls, user):
+        return add_role_claims(super().for_user(user), user)
+
+
+class RoleTokenUser(RoleMixin, TokenUser):
+    """Request user backed by the validated token instead of a DB row."""
+
+    @cached_property
+    def id(self):
+        return int(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def pk(self):
+        return self.id
+
+    @cached_property
+    def role(self):
+        return self.token.get('role')
+
+    @cached_property
+    def email(self):
+        return self.token.get('email', '')
+
+    @cached_property
+    def first_name(self):
+        return self.token.get('first_name', '')
+
+    @cached_property
+    def last_name(self):
+        return self.token.get('last_name', '')
+
+    @cached_property
+    def db_user(self):
+        """The `User` row for this token, loaded on first access."""
+        try:
+            user = User.objects.get(pk=self.id)
+        except User.DoesNotExist:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        if not user.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        return user
+
+
+class RoleClaimsJWTAuthentication(JWTAuthentication):
+    """`JWTAuthentication` that trusts role claims when `JWT_STATELESS_USER` is on."""
+
+    def get_user(self, validated_token):
+        if getattr(settings, 'JWT_STATELESS_USER', False) and 'role' in validated_token:
+            return RoleTokenUser(validated_token)
+        return super().get_user(validated_token)
+
+    async def aget_user(self, validated_token):
+        """`get_user` for async views; the user row is read with the async ORM."""
+        if getattr(settings, 'JWT_STATELESS_USER', False) and 'role' in validated_token:
+            return RoleTokenUser(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+        try:
+            user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed("The user's password has been changed.", code='password_changed')
+        return user
+
+
+async def aauthenticate(request):
+    """Authenticate a Django request without blocking the event loop.
+
+    A `Bearer` token wins, checked without leaving the event loop.
+    Otherwise the other `DEFAULT_AUTHENTICATION_CLASSES` are tried in
+    order, as DRF does: the session through the async ORM, the rest (e.g.
+    Basic) in a thread. Returns `AnonymousUser` if none applies; raises
+    `AuthenticationFailed` for bad credentials. Session users are not
+    CSRF-checked, so use it for safe methods only.
+    """
+    auth = RoleClaimsJWTAuthentication()
+    header = auth.get_header(request)
+    raw_token = auth.get_raw_token(header) if header is not None else None
+    if raw_token is not None:
+        return await auth.aget_user(auth.get_validated_token(raw_token))
+    for authentication_class in drf_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        if issubclass(authentication_class, JWTAuthentication):
+            continue
+        if issubclass(authentication_class, SessionAuthentication):
+            user = await request.auser()
+            if user.is_authenticated:
+                return user
+            continue
+        result = await sync_to_async(authentication_class().authenticate)(Request(request))
+        if result is not None:
+            return result[0]
+    return AnonymousUser()
+
+
+def db_user(request):
+    """Return `request.user` as a `User` instance, querying if it is token-backed."""
+    user = request.user
+    if isinstance(user, RoleTokenUser):
+        return user.db_user
+    return user
+
+
+async def adb_user(request):
+    """`db_user` for async views."""
+    user = request.user
+    if not isinstance(user, RoleTokenUser):
+        return user
+    try:
+        user = await User.objects.aget(pk=user.id)
+    except User.DoesNotExist:
+        raise AuthenticationFailed('User not found', code='user_not_found')
+    if not user.is_active:
+        raise AuthenticationFailed('User is inactive', code='user_inactive')
+    return user
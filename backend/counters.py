@@ -0,0 +1,111 @@
+"""backend.counters
+
+Per-status counters for items, boxes, orders and users.
+
+`StatusCounter` rows are adjusted with `UPDATE ... SET count = count + n`
+from the model signals in `backend.models.signals`, inside the same
+transaction as the write that caused them, so `/api/stats/` can answer
+from a few rows instead of counting the live tables. Code that changes
+statuses in bulk (`QuerySet.update()`, `bulk_create`, `bulk_update`)
+bypasses signals and must call `apply_deltas` itself. Every applied
+delta is also published to live dashboards through `backend.live`. The
+`reconcile_counters` command recomputes everything from scratch.
+"""
+
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from backend import live
+from backend.models import (
+    DomesticOrder, InternationalBox, InternationalOrder, Item, StatusCounter, User,
+)
+from backend.models.enums import CounterEntity
+from backend.versions import STATS, bump
+
+# model -> (counter entity, field holding the counted status)
+COUNTED_MODELS = {
+    Item: (CounterEntity.ITEM, 'status'),
+    InternationalBox: (CounterEntity.BOX, 'status'),
+    InternationalOrder: (CounterEntity.ORDER, 'status'),
+    DomesticOrder: (CounterEntity.DOMESTIC_ORDER, 'status'),
+    User: (CounterEntity.USER, 'role'),
+}
+
+
+def apply_deltas(entity, deltas):
+    """Add `deltas` ({status: +/-n}) to the counters of `entity`.
+
+    Runs one `UPDATE` per touched status; a missing row is created on
+    first use. Call it inside the transaction that made the change. Rows
+    are updated in status order, so concurrent opposite transitions lock
+    them in the same order instead of deadlocking.
+    """
+    changed = False
+    for status, delta in sorted(deltas.items()):
+        if not delta:
+            continue
+        counter = StatusCounter.objects.filter(entity=entity, status=status)
+        if not counter.update(count=F('count') + delta):
+            StatusCounter.objects.get_or_create(entity=entity, status=status)
+            counter.update(count=F('count') + delta)
+        changed = True
+    if changed:
+        bump(STATS)
+        live.publish_counters(entity, deltas)
+
+
+def apply_transition(entity, from_statuses, to_status):
+    """Record that rows moved from `from_statuses` (an iterable) to `to_status`."""
+    deltas = Counter()
+    for status in from_statuses:
+        if status != to_status:
+            deltas[status] -= 1
+            deltas[to_status] += 1
+    apply_deltas(entity, deltas)
+
+
+def read_counters():
+    """Return `{entity: {status: count}}` from the counters table."""
+    counters = {}
+    for entity, status, count in StatusCounter.objects.values_list('entity', 'status', 'count'):
+        counters.setdefault(entity, {})[status] = count
+    return counters
+
+
+async def aread_counters():
+    """`read_counters` for async views."""
+    counters = {}
+    async for entity, status, count in StatusCounter.objects.values_list('entity', 'status', 'count'):
+        counters.setdefault(entity, {})[status] = count
+    return counters
+
+
+def reconcile():
+    """Recompute every counter from the live tables and return the result.
+
+    Existing counter rows are locked first, so concurrent writers queue
+    behind the rebuild and apply their deltas on top of the fresh totals.
+    """
+    with transaction.atomic():
+        existing = {
+            (counter.entity, counter.status): counter
+            for counter in StatusCounter.objects.select_for_update()
+        }
+        fresh = {}
+        for model, (entity, field) in COUNTED_MODELS.items():
+            rows = model.objects.order_by().values(field).annotate(n=Count('pk'))
+            fresh[entity] = {row[field]: row['n'] for row in rows}
+
+        missing = []
+        for counter in existing.values():
+            counter.count = fresh.get(counter.entity, {}).get(counter.status, 0)
+        for entity, statuses in fresh.items():
+            for status, count in statuses.items():
+                if (entity, status) not in existing:
+                    missing.append(StatusCounter(entity=entity, status=status, count=count))
+        StatusCounter.objects.bulk_update(existing.values(), ['count'])
+        StatusCounter.objects.bulk_create(missing)
+        bump(STATS)
+    return fresh
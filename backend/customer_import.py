@@ -0,0 +1,191 @@
+"""backend.customer_import
+
+Bulk import of customer accounts from partner CSV/JSON files.
+
+Creating customers one by one fires `create_customer_lockers` per user,
+which costs a `count()`, an `exists()` and an INSERT per warehouse. This
+importer validates every row up front, creates the users with
+`bulk_create` (bypassing the per-instance signal), reserves every locker
+code for a warehouse with one allocator call (`backend.locker_codes`) and
+creates all lockers with a few more `bulk_create` statements — one
+transaction for the whole file.
+
+Passwords: a `password_hash` column holding an already-hashed Django
+password is stored as-is; rows with neither get an unusable password so
+the customer sets one through the reset flow. A plaintext `password`
+column is hashed once per distinct value, but only when the caller passes
+`allow_plaintext=True` (the management command) — PBKDF2 costs a few
+hundred milliseconds per password, which the synchronous API request must
+not pay, so there such rows are reported as errors.
+
+Emails are stored as `UserManager.normalize_email` leaves them and are
+duplicates when they match case-insensitively, in the file or in the
+database. A user created concurrently between validation and insert is
+reported against its row; the rest of the file is still imported.
+"""
+
+import csv
+import io
+import json
+from collections import Counter
+
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models.functions import Lower
+
+from backend.counters import apply_deltas
+from backend.models import Locker, User, Warehouse
+from backend.models.enums import CounterEntity, UserRole
+from backend.locker_codes import allocate_locker_codes
+from backend.versions import CUSTOMERS, bump
+
+IMPORT_FIELDS = (
+    'email', 'username', 'first_name', 'last_name', 'phone',
+    'country', 'city', 'address',
+)
+BATCH_SIZE = 1000
+
+
+def parse_rows(content, file_format):
+    """Parse CSV text or a JSON list of objects into row dicts."""
+    if file_format == 'csv':
+        return list(csv.DictReader(io.StringIO(content)))
+    if file_format == 'json':
+        rows = json.loads(content)
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError('JSON import must be a list of objects')
+        return rows
+    raise ValueError(f"Unknown import format '{file_format}'")
+
+
+def _clean(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _password(row, hashed_plaintext, allow_plaintext):
+    password_hash = _clean(row.get('password_hash'))
+    if password_hash:
+        try:
+            identify_hasher(password_hash)
+        except ValueError:
+            raise ValidationError('password_hash is not a recognised Django password hash')
+        return password_hash
+    password = _clean(row.get('password'))
+    if password is None:
+        return make_password(None)
+    if not allow_plaintext:
+        raise ValidationError('Plaintext passwords are not accepted here; provide password_hash')
+    if password not in hashed_plaintext:
+        hashed_plaintext[password] = make_password(password)
+    return hashed_plaintext[password]
+
+
+def _existing_emails(keys):
+    """The lowercased `keys` that match a stored email, ignoring case."""
+    keys = list(keys)
+    existing = set()
+    for start in range(0, len(keys), BATCH_SIZE):
+        existing.update(
+            User.objects.annotate(email_key=Lower('email'))
+            .filter(email_key__in=keys[start:start + BATCH_SIZE])
+            .values_list('email_key', flat=True)
+        )
+    return existing
+
+
+def _validate(rows, allow_plaintext):
+    """Split rows into `(valid, errors)`; `valid` holds `(row index, user)`."""
+    valid = []
+    errors = []
+    seen = set()
+    hashed_plaintext = {}
+    existing = _existing_emails({
+        User.objects.normalize_email(_clean(row.get('email')) or '').lower()
+        for row in rows
+    })
+
+    for index, row in enumerate(rows):
+        email = User.objects.normalize_email(_clean(row.get('email')) or '')
+        key = email.lower()
+        try:
+            if not email:
+                raise ValidationError('email is required')
+            validate_email(email)
+            if key in seen:
+                raise ValidationError('Duplicate email in import')
+            if key in existing:
+                raise ValidationError('A user with this email already exists')
+            password = _password(row, hashed_plaintext, allow_plaintext)
+        except ValidationError as e:
+            errors.append({'row': index, 'email': email or None, 'error': ' '.join(e.messages)})
+            continue
+        seen.add(key)
+        fields = {field: _clean(row.get(field)) for field in IMPORT_FIELDS}
+        fields['email'] = email
+        fields['first_name'] = fields['first_name'] or ''
+        fields['last_name'] = fields['last_name'] or ''
+        valid.append((index, User(role=UserRole.CUSTOMER, password=password, **fields)))
+    return valid, errors
+
+
+def _create(users):
+    """Insert `users` and their lockers in one transaction; returns the locker count."""
+    with transaction.atomic():
+        users = User.objects.bulk_create(users, batch_size=BATCH_SIZE)
+        lockers = []
+        for warehouse in Warehouse.objects.all():
+            codes = allocate_locker_codes(warehouse, users)
+            lockers.extend(
+                Locker(
+                    code=code,
+                    description=f"Auto-assigned locker for {user.username or user.email}",
+                    customer=user,
+                    warehouse=warehouse,
+                )
+                for user, code in zip(users, codes)
+            )
+        lockers = Locker.objects.bulk_create(lockers, batch_size=BATCH_SIZE)
+        apply_deltas(CounterEntity.USER, Counter({UserRole.CUSTOMER: len(users)}))
+        bump(CUSTOMERS)
+    return len(lockers)
+
+
+def import_customers(rows, dry_run=False, allow_plaintext=False):
+    """Create customers and their lockers from parsed rows.
+
+    Returns a summary with `created`, `lockers_created` and per-row
+    `errors`; invalid rows are skipped, the rest are imported atomically.
+    Plaintext `password` values are hashed only with `allow_plaintext`.
+    """
+    valid, errors = _validate(rows, allow_plaintext)
+    summary = {'valid': len(valid), 'created': 0, 'lockers_created': 0, 'errors': errors}
+    if not valid or dry_run:
+        return summary
+
+    while valid:
+        try:
+            summary['lockers_created'] = _create([user for _, user in valid])
+        except IntegrityError:
+            # Someone signed up with one of these emails since validation.
+            taken = _existing_emails(user.email.lower() for _, user in valid)
+            if not any(user.email.lower() in taken for _, user in valid):
+                raise
+            for index, user in valid:
+                if user.email.lower() in taken:
+                    errors.append({
+                        'row': index, 'email': user.email, 'error': 'A user with this email already exists',
+                    })
+                # The failed insert may have assigned primary keys.
+                user.pk = None
+                user._state.adding = True
+            valid = [(index, user) for index, user in valid if user.email.lower() not in taken]
+            continue
+        summary['created'] = len(valid)
+        break
+    errors.sort(key=lambda error: error['row'])
+    return summary
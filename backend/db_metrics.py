@@ -0,0 +1,101 @@
+"""backend.db_metrics
+
+Database connection usage for this process, per alias.
+
+`DB_CONN_MODE` (see settings) decides how connections are reused, and
+`connection_stats()` reports what that costs:
+
+* `requests` and `connects` count requests served and connections Django
+  opened (`connection_created`). Without pooling each connect is a TCP +
+  auth handshake, so `connects / requests` near 1 means no reuse; in
+  pool mode a connect is a checkout from the pool.
+* In pool mode the psycopg pool's own counters are added: connections
+  `in_use` and `available`, requests `waiting` now, total `waits` (requests
+  that had to queue) and their `wait_ms`, `timeouts` (requests that gave
+  up after the pool timeout), and `opened` (real handshakes).
+
+Replica aliases (see `backend.db_routing`) are marked `available: false`
+while the router skips them after a failed connect.
+
+Counters live in memory and start at zero with the process.
+"""
+
+import threading
+from collections import Counter
+
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from backend.db_routing import is_down, replica_aliases
+
+_lock = threading.Lock()
+_connects = Counter()
+_requests = 0
+
+
+def _count_connect(sender, connection, **kwargs):
+    with _lock:
+        _connects[connection.alias] += 1
+
+
+def _count_request(sender, **kwargs):
+    global _requests
+    with _lock:
+        _requests += 1
+
+
+def install():
+    """Start counting; called from `BackendConfig.ready`."""
+    connection_created.connect(_count_connect, dispatch_uid='backend.db_metrics.connects')
+    request_started.connect(_count_request, dispatch_uid='backend.db_metrics.requests')
+
+
+def connection_mode(settings_dict):
+    if settings_dict['OPTIONS'].get('pool'):
+        return 'pool'
+    return 'persistent' if settings_dict['CONN_MAX_AGE'] else 'off'
+
+
+def pool_stats(connection):
+    """Counters of the psycopg pool behind `connection`, or None without one."""
+    if connection_mode(connection.settings_dict) != 'pool' or connection.vendor != 'postgresql':
+        return None
+    stats = connection.pool.get_stats()
+    return {
+        'min_size': stats.get('pool_min', 0),
+        'max_size': stats.get('pool_max', 0),
+        'in_use': stats.get('pool_size', 0) - stats.get('pool_available', 0),
+        'available': stats.get('pool_available', 0),
+        'waiting': stats.get('requests_waiting', 0),
+        'checkouts': stats.get('requests_num', 0),
+        'waits': stats.get('requests_queued', 0),
+        'wait_ms': stats.get('requests_wait_ms', 0),
+        'timeouts': stats.get('requests_errors', 0),
+        'opened': stats.get('connections_num', 0),
+        'open_errors': stats.get('connections_errors', 0),
+        'lost': stats.get('connections_lost', 0),
+    }
+
+
+def connection_stats():
+    """`{alias: {...}}` for every configured database, plus the request count."""
+    with _lock:
+        requests = _requests
+        connects = dict(_connects)
+    databases = {}
+    replicas = replica_aliases()
+    for alias in connections:
+        connection = connections[alias]
+        settings_dict = connection.settings_dict
+        databases[alias] = {
+            'vendor': connection.vendor,
+            'role': 'replica' if alias in replicas else 'primary',
+            'available': not is_down(alias),
+            'mode': connection_mode(settings_dict),
+            'conn_max_age': settings_dict['CONN_MAX_AGE'],
+            'health_checks': settings_dict['CONN_HEALTH_CHECKS'],
+            'connects': connects.get(alias, 0),
+            'pool': pool_stats(connection),
+        }
+    return {'requests': requests, 'databases': databases}
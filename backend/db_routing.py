@@ -0,0 +1,251 @@
+"""backend.db_routing
+
+Read-replica routing: heavy reads go to a replica, everything else to
+the primary (`default`).
+
+Nothing is sent to a replica implicitly. Reads move there only where
+stale-by-replication-lag data is acceptable:
+
+* views decorated with `replica_view` (list, search and timeline
+  endpoints) and code inside `reads_from_replica()` (admin changelists)
+  -- `ReplicaRouter` sends their ORM reads to a replica;
+* reports and exports, which take an explicit alias from
+  `replica_alias()` so streamed responses and management commands read
+  from the replica too.
+
+Read-your-writes: `ReplicaRoutingMiddleware` notes when a request writes
+(any `db_for_write`). From then on that request reads from the primary,
+and the user is pinned to the primary for `PIN_SECONDS`, so the list
+they load after saving shows their change. Pins live in the default
+cache; with several processes configure a shared cache (Redis,
+Memcached), or a pin only holds on the process that set it.
+
+Fallback: before a replica is used its connection is opened; if that
+fails the replica is skipped for `RETRY_SECONDS` and reads go to another
+replica or the primary. Queries already running on a replica that dies
+still fail.
+
+Configure replicas as extra `DATABASES` aliases (see `DB_REPLICA_HOST`
+in settings) and list them in `DB_ROUTING['REPLICAS']`. Two SQLite
+files work for local testing: `migrate --database replica`, then copy
+the primary file over the replica to "replicate".
+"""
+
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'REPLICAS': ('replica',),
+    'PIN_SECONDS': 10,
+    'RETRY_SECONDS': 30,
+}
+
+PIN_KEY = 'db_routing:pin:{}'
+
+_state = ContextVar('db_routing_state', default=None)
+_down_lock = threading.Lock()
+_down_until = {}
+
+
+class RoutingState:
+    """Per-request routing flags, shared by the threads serving the request."""
+    __slots__ = ('replica', 'wrote')
+
+    def __init__(self):
+        self.replica = False
+        self.wrote = False
+
+
+def routing_settings():
+    return {**DEFAULTS, **getattr(settings, 'DB_ROUTING', {})}
+
+
+def replica_aliases():
+    return [alias for alias in routing_settings()['REPLICAS'] if alias in settings.DATABASES]
+
+
+def is_down(alias):
+    return _down_until.get(alias, 0) > time.monotonic()
+
+
+def _available(alias):
+    if is_down(alias):
+        return False
+    connection = connections[alias]
+    if connection.connection is not None:
+        return True
+    try:
+        connection.ensure_connection()
+    except DatabaseError as e:
+        retry = routing_settings()['RETRY_SECONDS']
+        with _down_lock:
+            _down_until[alias] = time.monotonic() + retry
+        logger.warning('Replica %s unavailable, reading from the primary for %ss: %s', alias, retry, e)
+        return False
+    return True
+
+
+def _healthy_replica():
+    aliases = replica_aliases()
+    random.shuffle(aliases)
+    return next((alias for alias in aliases if _available(alias)), None)
+
+
+# Pinning ----------------------------------------------------------------------
+
+def pin(user):
+    """Send `user`'s replica reads to the primary for `PIN_SECONDS`."""
+    if user is not None and user.is_authenticated:
+        cache.set(PIN_KEY.format(user.pk), True, routing_settings()['PIN_SECONDS'])
+
+
+def is_pinned(user):
+    return user is not None and user.is_authenticated and bool(cache.get(PIN_KEY.format(user.pk)))
+
+
+async def ais_pinned(user):
+    return user is not None and user.is_authenticated and bool(await cache.aget(PIN_KEY.format(user.pk)))
+
+
+def replica_alias(user=None):
+    """Alias to read from: a healthy replica, unless this request wrote or `user` is pinned."""
+    state = _state.get()
+    if (state is not None and state.wrote) or is_pinned(user):
+        return DEFAULT_DB_ALIAS
+    return _healthy_replica() or DEFAULT_DB_ALIAS
+
+
+# Scoping ----------------------------------------------------------------------
+
+@contextmanager
+def _replica_reads(pinned):
+    state = _state.get()
+    token = None
+    if state is None:
+        state = RoutingState()
+        token = _state.set(state)
+    previous = state.replica
+    state.replica = not pinned
+    try:
+        yield
+    finally:
+        state.replica = previous
+        if token is not None:
+            _state.reset(token)
+
+
+def reads_from_replica(user=None):
+    """Route ORM reads inside the block to a replica (unless `user` is pinned)."""
+    return _replica_reads(is_pinned(user))
+
+
+@contextmanager
+def unpinned_writes():
+    """Writes inside the block neither pin the request nor its user.
+
+    For maintenance a read triggers (e.g. folding rollups before a
+    report) rather than changes the user expects to read back.
+    """
+    state = _state.get()
+    wrote = state.wrote if state is not None else False
+    try:
+        yield
+    finally:
+        if state is not None:
+            state.wrote = wrote
+
+
+def replica_view(view):
+    """Serve a read-only view (sync or async) from a replica.
+
+    Apply it below the DRF/`async_api_view` decorator, so `request.user`
+    is authenticated, and above `versioned`, so version stamps come from
+    the same database as the data.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            with _replica_reads(await ais_pinned(request.user)):
+                return await view(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with reads_from_replica(request.user):
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Replica reads inside `reads_from_replica`; all writes to the primary."""
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.replica or state.wrote:
+            return None
+        return _healthy_replica()
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        # Explicit, so rows read from a replica are saved to the primary.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """Track writes per request and pin writers to the primary.
+
+    Must come after `AuthenticationMiddleware`, and before any middleware
+    that writes once the view has returned.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RoutingState()
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote:
+            pin(getattr(request, 'user', None))
+        return response
+
+    async def __acall__(self, request):
+        state = RoutingState()
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote:
+            # `request.user` may be a lazy session lookup.
+            await sync_to_async(lambda: pin(getattr(request, 'user', None)))()
+        return response
@@ -0,0 +1,195 @@
+"""backend.exports
+
+Streaming bulk exports of items, international boxes and status logs.
+
+Rows are pulled from the database with `QuerySet.iterator()`, which uses
+a server-side cursor on PostgreSQL (`aiterator()` when served under
+ASGI), and encoded chunk by chunk into NDJSON or CSV (optionally
+gzip-compressed). Nothing holds more than one
+chunk of rows in memory, so the same code path serves a 100-row and a
+10-million-row export. Used by `GET /api/exports/<dataset>/` and the
+`export_data` management command.
+"""
+
+import csv
+import io
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from backend.models import InternationalBox, Item, StatusLog
+
+DEFAULT_CHUNK_SIZE = 2000
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+# dataset name -> (model, exported columns)
+EXPORT_DATASETS = {
+    'items': (Item, (
+        'id', 'tracking_number', 'status', 'condition', 'category',
+        'country_origin', 'weight_kg', 'quantity', 'scanning_date',
+        'customer_id', 'locker_id', 'international_order_id',
+    )),
+    'boxes': (InternationalBox, (
+        'id', 'box_number', 'tracking_number', 'status', 'origin_country',
+        'destination_country', 'total_weight_kg', 'items_count', 'warehouse_id',
+    )),
+    'status_logs': (StatusLog, (
+        'id', 'entity_type', 'entity_id', 'status', 'note',
+        'changed_by_id', 'created_at',
+    )),
+}
+
+
+def iter_rows(queryset, fields, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield value tuples in primary-key order straight from the DB cursor."""
+    return queryset.order_by('pk').values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def aiter_rows(queryset, fields, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Async counterpart of `iter_rows`, for responses served under ASGI."""
+    # Plain `values_list()` runs its query as soon as iteration starts, on
+    # the event loop; the named-tuple iterable defers it to `aiterator()`'s
+    # worker thread like the other iterables do.
+    return queryset.order_by('pk').values_list(*fields, named=True).aiterator(chunk_size=chunk_size)
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def _ndjson_encoder(fields):
+    """`(header, encode)`: no header, then one JSON object per line."""
+    encoder = DjangoJSONEncoder()
+
+    def encode(rows):
+        return ''.join(encoder.encode(dict(zip(fields, row))) + '\n' for row in rows).encode()
+    return b'', encode
+
+
+def _csv_encoder(fields):
+    """`(header, encode)`: the column names, then one CSV line per row."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def encode(rows):
+        writer.writerows([_csv_value(value) for value in row] for row in rows)
+        data = buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+    writer.writerow(fields)
+    return encode(()), encode
+
+
+_ENCODERS = {'ndjson': _ndjson_encoder, 'csv': _csv_encoder}
+
+
+def encode_ndjson(rows, fields, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Encode rows as newline-delimited JSON, one bytes chunk per `chunk_size` rows."""
+    _, encode = _ndjson_encoder(fields)
+    for batch in _batches(rows, chunk_size):
+        yield encode(batch)
+
+
+def encode_csv(rows, fields, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Encode rows as CSV with a header line, one bytes chunk per `chunk_size` rows."""
+    header, encode = _csv_encoder(fields)
+    yield header
+    for batch in _batches(rows, chunk_size):
+        yield encode(batch)
+
+
+def _gzip_compressor(level=6):
+    return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+
+def gzip_chunks(chunks, level=6):
+    """Compress a stream of byte chunks into a single gzip member."""
+    compressor = _gzip_compressor(level)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _export_source(dataset, output, queryset):
+    if dataset not in EXPORT_DATASETS:
+        raise ValueError(f"Unknown dataset '{dataset}'")
+    if output not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{output}'")
+    model, fields = EXPORT_DATASETS[dataset]
+    if queryset is None:
+        queryset = model.objects.all()
+    return queryset, fields
+
+
+def export_chunks(dataset, output='ndjson', compress=False, queryset=None,
+                  chunk_size=DEFAULT_CHUNK_SIZE):
+    """Return an iterator of encoded byte chunks for `dataset`.
+
+    `queryset` narrows the export (e.g. filtered items); it defaults to
+    every row of the dataset's model.
+    """
+    queryset, fields = _export_source(dataset, output, queryset)
+    rows = iter_rows(queryset, fields, chunk_size)
+    encode = encode_csv if output == 'csv' else encode_ndjson
+    chunks = encode(rows, fields, chunk_size)
+    return gzip_chunks(chunks) if compress else chunks
+
+
+async def aexport_chunks(dataset, output='ndjson', compress=False, queryset=None,
+                         chunk_size=DEFAULT_CHUNK_SIZE):
+    """Async iterator of the same byte chunks as `export_chunks`.
+
+    Under ASGI Django would drain a sync iterator into a list in a worker
+    thread before sending anything; this one fetches each chunk of rows
+    with `aiterator()` and yields it as soon as it is encoded.
+    """
+    queryset, fields = _export_source(dataset, output, queryset)
+    header, encode = _ENCODERS[output](fields)
+    compressor = _gzip_compressor() if compress else None
+
+    def finish(data):
+        return compressor.compress(data) if compressor is not None else data
+
+    data = finish(header)
+    if data:
+        yield data
+    batch = []
+    async for row in aiter_rows(queryset, fields, chunk_size):
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            data = finish(encode(batch))
+            batch = []
+            if data:
+                yield data
+    if batch:
+        data = finish(encode(batch))
+        if data:
+            yield data
+    if compressor is not None:
+        yield compressor.flush()
+
+
+def export_filename(dataset, output='ndjson', compress=False):
+    return f"{dataset}.{output}" + ('.gz' if compress else '')
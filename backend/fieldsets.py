@@ -0,0 +1,81 @@
+"""backend.fieldsets
+
+`?fields=` / `?expand=` sparse fieldsets for the list endpoints.
+
+    /api/boxes/?fields=box_number,status,warehouse&expand=warehouse
+
+`fields` limits the response to the named serializer fields; without it
+every field is returned. Nested objects (e.g. a box's `warehouse`) are
+expanded by default, but once `fields` is given only the relations named
+in `expand` are nested; the others render as the related primary key.
+
+`sparse_fieldset` pushes the choice down into the query: `.only()` loads
+just the columns behind the requested fields, and `select_related` joins
+a relation only when it is expanded. Use it with a serializer built on
+`SparseFieldsMixin` (see `backend.serializers`).
+"""
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import BaseSerializer
+
+
+def _parse_names(params, name):
+    raw = params.get(name)
+    if raw is None:
+        return None
+    return [value.strip() for value in raw.split(',') if value.strip()]
+
+
+def _column(field):
+    """ORM path of a plain serializer field, or None if it is computed."""
+    if field.source == '*' or not field.source:
+        return None
+    return field.source.replace('.', '__')
+
+
+def sparse_fieldset(queryset, serializer_class, params):
+    """Narrow `queryset` to the requested fields.
+
+    Returns `(queryset, serializer_kwargs)`; pass the kwargs to the
+    serializer so it renders the same subset. Unknown names raise a DRF
+    `ValidationError` (400).
+    """
+    available = serializer_class().fields
+    nested = {name for name, field in available.items() if isinstance(field, BaseSerializer)}
+    requested = _parse_names(params, 'fields')
+    expand = _parse_names(params, 'expand') or []
+
+    unknown = [name for name in requested or () if name not in available]
+    if unknown:
+        raise ValidationError({'fields': f"Unknown field(s): {', '.join(unknown)}"})
+    not_nested = [name for name in expand if name not in nested]
+    if not_nested:
+        raise ValidationError({'expand': f"Cannot expand: {', '.join(not_nested)}"})
+
+    if requested is None:
+        fields = list(available)
+        expand = sorted(nested)
+    else:
+        fields = requested
+
+    columns = []
+    related = []
+    for name in fields:
+        field = available[name]
+        column = _column(field)
+        if column is None:
+            # Computed from the whole instance: load every column.
+            return queryset.select_related(*expand), {'fields': fields, 'expand': expand}
+        if name in expand:
+            related.append(column)
+            nested_columns = [_column(nested_field) for nested_field in field.fields.values()]
+            if None in nested_columns:
+                columns.append(column)
+            else:
+                columns.extend(f'{column}__{nested_column}' for nested_column in nested_columns)
+        else:
+            columns.append(column)
+
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset.only(*columns), {'fields': fields, 'expand': expand}
@@ -0,0 +1,115 @@
+"""backend.filters
+
+Server-side query-string filters for the list endpoints. Each helper
+takes a queryset and `request.query_params` and returns the narrowed
+queryset; invalid values raise a DRF `ValidationError` so the view
+answers with a 400 instead of silently ignoring the filter.
+
+Filters are plain equality / range lookups so they can be served by the
+composite indexes declared on the models (e.g. `items(customer, status)`).
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from backend.models.enums import BoxStatus, ItemStatus
+
+
+def _parse_choices(params, name, choices):
+    """Return the list of values for a comma-separated choice filter."""
+    raw = params.get(name)
+    if not raw:
+        return []
+    values = [value.strip() for value in raw.split(',') if value.strip()]
+    invalid = [value for value in values if value not in choices.values]
+    if invalid:
+        raise ValidationError({name: f"Invalid value(s): {', '.join(invalid)}"})
+    return values
+
+
+def _parse_int(params, name):
+    raw = params.get(name)
+    if raw in (None, ''):
+        return None
+    try:
+        return int(raw)
+    except (TypeError, ValueError):
+        raise ValidationError({name: 'Must be an integer.'})
+
+
+def _parse_moment(params, name):
+    """Parse an ISO date or datetime query parameter.
+
+    Returns `(moment, date_only)` where `moment` is an aware datetime; a
+    bare date expands to midnight at the start of that day so range
+    filters compare the raw column and stay indexable.
+    """
+    raw = params.get(name)
+    if not raw:
+        return None, False
+    date_only = False
+    try:
+        moment = parse_datetime(raw)
+        if moment is None:
+            day = parse_date(raw)
+            if day is not None:
+                moment = datetime.combine(day, time.min)
+                date_only = True
+    except ValueError:
+        moment = None
+    if moment is None:
+        raise ValidationError({name: 'Must be an ISO 8601 date or datetime.'})
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment, date_only
+
+
+def _filter_status(queryset, params, choices):
+    statuses = _parse_choices(params, 'status', choices)
+    if len(statuses) == 1:
+        return queryset.filter(status=statuses[0])
+    if statuses:
+        return queryset.filter(status__in=statuses)
+    return queryset
+
+
+def filter_items(queryset, params):
+    """Apply `/api/items/` filters.
+
+    Supported parameters: `status` (comma-separated), `customer`,
+    `category`, `country_origin`, `scanned_from` and `scanned_to`
+    (inclusive bounds on `scanning_date`).
+    """
+    customer = _parse_int(params, 'customer')
+    if customer is not None:
+        queryset = queryset.filter(customer_id=customer)
+    queryset = _filter_status(queryset, params, ItemStatus)
+    if params.get('category'):
+        queryset = queryset.filter(category=params['category'])
+    if params.get('country_origin'):
+        queryset = queryset.filter(country_origin=params['country_origin'])
+
+    scanned_from, _ = _parse_moment(params, 'scanned_from')
+    if scanned_from is not None:
+        queryset = queryset.filter(scanning_date__gte=scanned_from)
+    scanned_to, date_only = _parse_moment(params, 'scanned_to')
+    if scanned_to is not None and date_only:
+        # A bare date includes the whole day: compare against the next midnight.
+        queryset = queryset.filter(scanning_date__lt=scanned_to + timedelta(days=1))
+    elif scanned_to is not None:
+        queryset = queryset.filter(scanning_date__lte=scanned_to)
+    return queryset
+
+
+def filter_boxes(queryset, params):
+    """Apply `/api/boxes/` filters: `status`, `warehouse`, `destination_country`."""
+    queryset = _filter_status(queryset, params, BoxStatus)
+    warehouse = _parse_int(params, 'warehouse')
+    if warehouse is not None:
+        queryset = queryset.filter(warehouse_id=warehouse)
+    if params.get('destination_country'):
+        queryset = queryset.filter(destination_country=params['destination_country'])
+    return queryset
@@ -0,0 +1,327 @@
+"""backend.live
+
+Live push of status changes and counter deltas to staff dashboards.
+
+Writers call `publish_status` (items and boxes that changed status) and
+`publish_counters` (from `backend.counters.apply_deltas`) inside their
+transaction. Events reach subscribers only after the transaction commits:
+
+* with no broker (the default) the event is handed to this process's
+  `Hub` from `transaction.on_commit`, which is enough for a single
+  server process;
+* with `LIVE_UPDATES['BROKER'] = 'postgres'` the event is sent with
+  `pg_notify`, which PostgreSQL delivers at commit to every process
+  LISTENing on `CHANNEL`; each process runs one listener thread that
+  feeds its hub, so writes made by any worker reach every connection.
+
+The hub keeps one bounded queue per connection and wakes each event loop
+once per event, not once per connection, so thousands of idle
+connections cost a queue each. A connection that falls `QUEUE_SIZE`
+events behind has its queue replaced by one `resync` event and should
+refetch. Nothing is looked up or sent when nobody is subscribed and no
+broker is configured.
+
+Events are filtered per connection by warehouse and role: counters for
+users and orders go to admins only, everything else to all staff.
+Transports live in `backend.views.live_views` (SSE and WebSocket).
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import re
+import select
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+
+from backend.models import InternationalBox, Item
+from backend.models.enums import CounterEntity, UserRole
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    # None (in-process only) or 'postgres' (LISTEN/NOTIFY across processes).
+    'BROKER': None,
+    'CHANNEL': 'backend_live',
+    'QUEUE_SIZE': 256,
+    'HEARTBEAT_SECONDS': 25,
+    # Ids per status event; keeps NOTIFY payloads under PostgreSQL's 8000 bytes.
+    'MAX_IDS_PER_EVENT': 400,
+}
+
+STAFF_ROLES = (UserRole.EMPLOYEE, UserRole.ADMIN, UserRole.SUPER_ADMIN)
+ADMIN_ROLES = (UserRole.ADMIN, UserRole.SUPER_ADMIN)
+ADMIN_ONLY_COUNTERS = {CounterEntity.USER, CounterEntity.ORDER, CounterEntity.DOMESTIC_ORDER}
+
+# model -> (entity name in events, path to the warehouse id)
+LIVE_MODELS = {
+    Item: ('item', 'locker__warehouse_id'),
+    InternationalBox: ('box', 'warehouse_id'),
+}
+
+
+def live_settings():
+    return {**DEFAULTS, **getattr(settings, 'LIVE_UPDATES', {})}
+
+
+class Event:
+    """One message for subscribers; `payload` is encoded once for all of them."""
+    __slots__ = ('id', 'kind', 'warehouse', 'admin_only', 'payload')
+
+    def __init__(self, event_id, kind, data, warehouse=None, admin_only=False):
+        self.id = event_id
+        self.kind = kind
+        self.warehouse = warehouse
+        self.admin_only = admin_only
+        self.payload = json.dumps(data, separators=(',', ':'))
+
+
+RESYNC = Event(0, 'resync', {})
+
+
+class Subscription:
+    """One connection's queue and filters; used only from its event loop."""
+    __slots__ = ('loop', 'queue', 'admin', 'warehouses')
+
+    def __init__(self, loop, role, warehouses, queue_size):
+        self.loop = loop
+        self.queue = asyncio.Queue(queue_size)
+        self.admin = role in ADMIN_ROLES
+        # None means every warehouse.
+        self.warehouses = warehouses
+
+    def accepts(self, event):
+        if event.admin_only and not self.admin:
+            return False
+        return self.warehouses is None or event.warehouse is None or event.warehouse in self.warehouses
+
+    def offer(self, event):
+        if not self.accepts(event):
+            return
+        if self.queue.full():
+            # Too far behind to be worth catching up: drop the backlog
+            # and tell the client to refetch.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = RESYNC
+        self.queue.put_nowait(event)
+
+    async def next_event(self, timeout):
+        """The next event, or None after `timeout` seconds without one."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+def _deliver(subscriptions, event):
+    for subscription in subscriptions:
+        subscription.offer(event)
+
+
+class Hub:
+    """Process-wide fan-out from publishers (any thread) to subscribers (event loops)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_loop = {}
+        self._ids = itertools.count(1)
+
+    @property
+    def active(self):
+        return bool(self._by_loop)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._by_loop.values())
+
+    def event(self, kind, data, warehouse=None, admin_only=False):
+        return Event(next(self._ids), kind, data, warehouse, admin_only)
+
+    def subscribe(self, role, warehouses=None):
+        """Register a subscription on the running event loop."""
+        loop = asyncio.get_running_loop()
+        subscription = Subscription(loop, role, warehouses, live_settings()['QUEUE_SIZE'])
+        with self._lock:
+            self._by_loop.setdefault(loop, set()).add(subscription)
+        start_listener()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._by_loop.get(subscription.loop)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._by_loop[subscription.loop]
+
+    def dispatch(self, event):
+        """Queue `event` for every matching subscription; safe from any thread."""
+        with self._lock:
+            targets = [(loop, tuple(subscriptions)) for loop, subscriptions in self._by_loop.items()]
+        for loop, subscriptions in targets:
+            try:
+                loop.call_soon_threadsafe(_deliver, subscriptions, event)
+            except RuntimeError:
+                # The loop was closed without its connections unsubscribing.
+                with self._lock:
+                    self._by_loop.pop(loop, None)
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_hub():
+    global _hub
+    with _hub_lock:
+        if _hub is None:
+            _hub = Hub()
+        return _hub
+
+
+# Publishing -------------------------------------------------------------------
+
+def _broker():
+    return live_settings()['BROKER']
+
+
+def publish(kind, data, warehouse=None, admin_only=False):
+    """Send an event to subscribers once the current transaction commits."""
+    options = live_settings()
+    if options['BROKER'] == 'postgres':
+        message = json.dumps({'kind': kind, 'data': data, 'warehouse': warehouse, 'admin_only': admin_only})
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [options['CHANNEL'], message])
+        return
+    hub = get_hub()
+    if hub.active:
+        event = hub.event(kind, data, warehouse, admin_only)
+        transaction.on_commit(lambda: hub.dispatch(event))
+
+
+def publish_counters(entity, deltas):
+    """Publish counter deltas ({status: +/-n}) of `entity`."""
+    deltas = {status: delta for status, delta in deltas.items() if delta}
+    if not deltas or not (_broker() or get_hub().active):
+        return
+    publish('counters', {'entity': entity, 'deltas': deltas}, admin_only=entity in ADMIN_ONLY_COUNTERS)
+
+
+def publish_status(model, pks, status):
+    """Publish that rows `pks` of `model` moved to `status`, one event per warehouse.
+
+    Costs one query per 2000 ids to find the warehouses, and nothing
+    when there is no one to tell.
+    """
+    if model not in LIVE_MODELS or not pks or not (_broker() or get_hub().active):
+        return
+    entity, warehouse_field = LIVE_MODELS[model]
+    pks = list(pks)
+    by_warehouse = defaultdict(list)
+    for start in range(0, len(pks), 2000):
+        for pk, warehouse in model.objects.filter(pk__in=pks[start:start + 2000]).values_list(
+            'pk', warehouse_field,
+        ):
+            by_warehouse[warehouse].append(pk)
+    chunk = live_settings()['MAX_IDS_PER_EVENT']
+    for warehouse, ids in by_warehouse.items():
+        for start in range(0, len(ids), chunk):
+            publish('status', {
+                'entity': entity, 'status': status, 'warehouse': warehouse,
+                'ids': ids[start:start + chunk],
+            }, warehouse=warehouse)
+
+
+# PostgreSQL broker ------------------------------------------------------------
+
+class BrokerListener(threading.Thread):
+    """LISTENs on the broker channel and feeds notifications to the hub.
+
+    Uses its own autocommit connection and reconnects with backoff; after
+    a reconnect every subscriber gets `resync`, since notifications sent
+    meanwhile are lost.
+    """
+
+    def __init__(self, hub, channel):
+        super().__init__(name='live-listener', daemon=True)
+        if not re.fullmatch(r'[a-z_][a-z0-9_]*', channel):
+            raise ValueError(f'Invalid LIVE_UPDATES channel name: {channel!r}')
+        self.hub = hub
+        self.channel = channel
+
+    def run(self):
+        delay = 1
+        connected_before = False
+        while True:
+            wrapper = connections.create_connection(DEFAULT_DB_ALIAS)
+            # LISTEN is session state: hold a dedicated connection, never a pooled one.
+            options = {**wrapper.settings_dict['OPTIONS']}
+            options.pop('pool', None)
+            wrapper.settings_dict = {**wrapper.settings_dict, 'OPTIONS': options}
+            try:
+                wrapper.ensure_connection()
+                raw = wrapper.connection
+                raw.autocommit = True
+                raw.cursor().execute(f'LISTEN {self.channel}')
+                if connected_before:
+                    self.hub.dispatch(RESYNC)
+                connected_before = True
+                delay = 1
+                self._listen(raw)
+            except Exception:
+                logger.exception('Live update listener lost its connection; retrying in %ss', delay)
+            finally:
+                try:
+                    wrapper.close()
+                except Exception:
+                    pass
+            time.sleep(delay)
+            delay = min(delay * 2, 60)
+
+    def _listen(self, raw):
+        if hasattr(raw, 'poll'):
+            # psycopg2
+            while True:
+                if select.select([raw], [], [], 5) != ([], [], []):
+                    raw.poll()
+                    while raw.notifies:
+                        self._handle(raw.notifies.pop(0).payload)
+        else:
+            # psycopg 3
+            while True:
+                for notify in raw.notifies(timeout=5):
+                    self._handle(notify.payload)
+
+    def _handle(self, payload):
+        try:
+            message = json.loads(payload)
+            event = self.hub.event(
+                message['kind'], message['data'], message.get('warehouse'), message.get('admin_only', False),
+            )
+        except (ValueError, KeyError, TypeError):
+            logger.warning('Ignoring malformed live update: %.200s', payload)
+            return
+        self.hub.dispatch(event)
+
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def start_listener():
+    """Start this process's broker listener once, if a broker is configured."""
+    global _listener
+    options = live_settings()
+    if options['BROKER'] != 'postgres':
+        return
+    hub = get_hub()
+    with _listener_lock:
+        if _listener is None:
+            _listener = BrokerListener(hub, options['CHANNEL'])
+            _listener.start()
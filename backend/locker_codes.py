@@ -0,0 +1,143 @@
+"""backend.locker_codes
+
+Collision-free locker code allocation.
+
+Codes look like `DUB-JOHND-042`: warehouse code, customer code and a
+number. The number comes from a per-warehouse-code counter row in
+`LockerCodeSequence`, so two codes can never share a number under the
+same warehouse code and no "does this code exist?" query is needed.
+
+On PostgreSQL each process reserves numbers in blocks of
+`LOCKER_CODE_BLOCK_SIZE` with a single `UPDATE ... RETURNING` issued on
+a separate autocommit connection, opened for the reservation (checked
+out of the pool in `DB_CONN_MODE=pool`) and closed right after. The
+reservation commits immediately (like a native sequence), so it is safe
+across workers and is never undone by a rolled-back signup; the only
+cost is gaps in the numbering.
+Other backends (SQLite in development) reserve exactly the numbers
+requested inside the caller's transaction.
+
+A counter row is created on first use, starting after the highest
+number already used by legacy codes under that warehouse code.
+"""
+
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import F
+
+from backend.models import Locker, LockerCodeSequence
+
+DEFAULT_BLOCK_SIZE = 50
+
+
+def warehouse_code(warehouse):
+    """Three-letter warehouse part of a locker code (city, else name)."""
+    source = warehouse.city or warehouse.name
+    return source[:3].upper().replace(' ', '')
+
+
+def user_code(username, email):
+    """Up to five-letter customer part of a locker code."""
+    source = username or email.split('@')[0]
+    return source.upper()[:5].replace(' ', '')
+
+
+def _first_free_number(prefix):
+    """One past the highest number used by existing codes under `prefix`."""
+    highest = 0
+    codes = Locker.objects.filter(code__startswith=f'{prefix}-').values_list('code', flat=True)
+    for code in codes.iterator(chunk_size=5000):
+        number = code.rpartition('-')[2]
+        if number.isdigit():
+            highest = max(highest, int(number))
+    return highest + 1
+
+
+class LockerCodeAllocator:
+    """Hands out unique locker numbers per warehouse code."""
+
+    def __init__(self, block_size=DEFAULT_BLOCK_SIZE, using=DEFAULT_DB_ALIAS):
+        self.block_size = block_size
+        self.using = using
+        self._blocks = {}
+        self._lock = threading.Lock()
+
+    def allocate(self, prefix, count=1):
+        """Return `count` unused numbers for `prefix`."""
+        if connections[self.using].vendor != 'postgresql':
+            return self._reserve_in_transaction(prefix, count)
+
+        with self._lock:
+            next_free, end = self._blocks.get(prefix, (0, 0))
+            taken = min(count, end - next_free)
+            numbers = list(range(next_free, next_free + taken))
+            next_free += taken
+            if taken < count:
+                missing = count - taken
+                first, end = self._reserve(prefix, max(missing, self.block_size))
+                numbers.extend(range(first, first + missing))
+                next_free = first + missing
+            self._blocks[prefix] = (next_free, end)
+        return numbers
+
+    def _reserve(self, prefix, size):
+        """Reserve `size` numbers; returns the half-open range `(first, end)`."""
+        # Outside the caller's transaction, so the counter row is not locked
+        # until the caller commits. Closed at once: request threads are
+        # recycled, and a per-thread connection would never be released.
+        connection = connections.create_connection(self.using)
+        try:
+            table = connection.ops.quote_name(LockerCodeSequence._meta.db_table)
+            update = f'UPDATE {table} SET next_value = next_value + %s WHERE prefix = %s RETURNING next_value'
+            with connection.cursor() as cursor:
+                cursor.execute(update, [size, prefix])
+                row = cursor.fetchone()
+                if row is None:
+                    cursor.execute(
+                        f'INSERT INTO {table} (prefix, next_value) VALUES (%s, %s) '
+                        f'ON CONFLICT (prefix) DO NOTHING',
+                        [prefix, _first_free_number(prefix)],
+                    )
+                    cursor.execute(update, [size, prefix])
+                    row = cursor.fetchone()
+        finally:
+            connection.close()
+        end = row[0]
+        return end - size, end
+
+    def _reserve_in_transaction(self, prefix, count):
+        sequence = LockerCodeSequence.objects.using(self.using).filter(prefix=prefix)
+        with transaction.atomic(using=self.using):
+            if not sequence.update(next_value=F('next_value') + count):
+                LockerCodeSequence.objects.using(self.using).get_or_create(
+                    prefix=prefix, defaults={'next_value': _first_free_number(prefix)}
+                )
+                sequence.update(next_value=F('next_value') + count)
+            end = sequence.values_list('next_value', flat=True).get()
+        return list(range(end - count, end))
+
+
+_allocator = None
+_allocator_lock = threading.Lock()
+
+
+def get_allocator():
+    global _allocator
+    with _allocator_lock:
+        if _allocator is None:
+            _allocator = LockerCodeAllocator(
+                getattr(settings, 'LOCKER_CODE_BLOCK_SIZE', DEFAULT_BLOCK_SIZE)
+            )
+        return _allocator
+
+
+def allocate_locker_codes(warehouse, customers):
+    """Return one new locker code per customer at `warehouse`, in order."""
+    prefix = warehouse_code(warehouse)
+    numbers = get_allocator().allocate(prefix, len(customers))
+    return [
+        f'{prefix}-{user_code(customer.username, customer.email)}-{number:03d}'
+        for customer, number in zip(customers, numbers)
+    ]
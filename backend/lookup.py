@@ -0,0 +1,380 @@
+"""backend.lookup
+
+Unified resolver for raw codes thrown at us by scanners.
+
+A code may be an `Item.tracking_number`, an `InternationalBox`
+`tracking_number` or `box_number`, a `ShipmentLabel.barcode_number` or a
+`Locker.code`. `resolve_code` answers in at most one round trip:
+
+1. A bounded in-process LRU cache serves hot codes. Entries are dropped
+   when the underlying row is saved or deleted in this process (see
+   `backend.models.signals`) and expire after `CACHE_TTL_SECONDS` so
+   writes made by other workers become visible.
+2. A Bloom filter over every known code answers "unknown code" without
+   touching the database. Rows are added as they are saved; rows saved
+   by other processes are picked up by a cheap incremental refresh (one
+   indexed `updated_at` range query per table) at most every
+   `FILTER_REFRESH_SECONDS` before a negative answer is trusted. Each
+   refresh re-reads `FILTER_REFRESH_OVERLAP_SECONDS` before the previous
+   one, so rows committed late (or stamped by a slightly slow clock) are
+   not missed. Code fields must therefore be written through `save()` or
+   `bulk_create` (which set `updated_at`); a bulk `update()` of a code
+   field must set `updated_at` too.
+3. Otherwise one `UNION ALL` query probes all four unique indexes.
+"""
+
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.db.models import CharField, Q, Value
+from django.utils import timezone
+
+from backend.models import InternationalBox, Item, Locker, ShipmentLabel
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'CACHE_SIZE': 10000,
+    'CACHE_TTL_SECONDS': 60,
+    'FILTER_CAPACITY': 2000000,
+    'FILTER_ERROR_RATE': 0.01,
+    'FILTER_REFRESH_SECONDS': 5,
+    # A few refresh intervals: covers commit lag and small clock skew
+    # without re-reading minutes of writes on every refresh.
+    'FILTER_REFRESH_OVERLAP_SECONDS': 30,
+}
+
+# model -> (match type, reference field, code fields, status field or None)
+CODE_SOURCES = {
+    Item: ('item', 'tracking_number', ('tracking_number',), 'status'),
+    InternationalBox: ('box', 'box_number', ('box_number', 'tracking_number'), 'status'),
+    ShipmentLabel: ('label', 'barcode_number', ('barcode_number',), None),
+    Locker: ('locker', 'code', ('code',), None),
+}
+
+
+def lookup_settings():
+    return {**DEFAULTS, **getattr(settings, 'TRACKING_LOOKUP', {})}
+
+
+class CodeCache:
+    """Thread-safe LRU of `code -> matches` with per-entry expiry."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._codes_by_object = {}
+        self._lock = threading.Lock()
+
+    def get(self, code):
+        with self._lock:
+            entry = self._entries.get(code)
+            if entry is None:
+                return None
+            expires, matches = entry
+            if expires < time.monotonic():
+                self._discard(code)
+                return None
+            self._entries.move_to_end(code)
+            return matches
+
+    def set(self, code, matches):
+        with self._lock:
+            self._discard(code)
+            self._entries[code] = (time.monotonic() + self.ttl, matches)
+            for match in matches:
+                self._codes_by_object.setdefault((match['type'], match['id']), set()).add(code)
+            while len(self._entries) > self.max_size:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate(self, match_type, pk):
+        """Drop every cached code that resolved to the given row."""
+        with self._lock:
+            for code in self._codes_by_object.pop((match_type, pk), ()):
+                self._discard(code)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._codes_by_object.clear()
+
+    def _discard(self, code):
+        entry = self._entries.pop(code, None)
+        if entry is None:
+            return
+        for match in entry[1]:
+            codes = self._codes_by_object.get((match['type'], match['id']))
+            if codes is not None:
+                codes.discard(code)
+                if not codes:
+                    del self._codes_by_object[(match['type'], match['id'])]
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (no false negatives)."""
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.capacity = capacity
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+        self._lock = threading.Lock()
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        positions = self._positions(value)
+        with self._lock:
+            new = False
+            for position in positions:
+                mask = 1 << (position & 7)
+                if not self._bits[position >> 3] & mask:
+                    self._bits[position >> 3] |= mask
+                    new = True
+            # Re-adding a known value (refreshes overlap) does not count.
+            if new:
+                self.count += 1
+
+    def __contains__(self, value):
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class KnownCodes:
+    """Bloom filter of every known code, built in the background.
+
+    Until the first build finishes every code is reported as possibly
+    known, so lookups fall through to the database.
+    """
+
+    def __init__(self, capacity, error_rate, refresh_seconds, overlap_seconds=30):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_seconds = refresh_seconds
+        self.overlap = timedelta(seconds=overlap_seconds)
+        self._filter = None
+        self._since = None
+        self._pending = []
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._building = False
+
+    def add(self, *codes):
+        codes = [code for code in codes if code]
+        with self._lock:
+            if self._building:
+                # Saved while a build is scanning the tables; replayed after.
+                self._pending.extend(codes)
+            bloom = self._filter
+        if bloom is not None:
+            for code in codes:
+                bloom.add(code)
+
+    def might_contain(self, code):
+        """False only when `code` is certainly not stored anywhere."""
+        answer = self.check(code)
+        if answer is None:
+            self.refresh()
+            return code in self._filter
+        return answer
+
+    def check(self, code):
+        """`might_contain` without querying: None when a refresh must come first."""
+        bloom = self._filter
+        if bloom is None:
+            self._start_build()
+            return True
+        if code in bloom:
+            return True
+        if time.monotonic() - self._refreshed_at > self.refresh_seconds:
+            return None
+        return False
+
+    def refresh(self):
+        """Add codes of rows saved since the last build or refresh.
+
+        Concurrent callers wait for the refresh in progress instead of
+        repeating it; `add()` and builds only wait for the state swap, not
+        for the query.
+        """
+        with self._refresh_lock:
+            if time.monotonic() - self._refreshed_at <= self.refresh_seconds:
+                return
+            with self._lock:
+                bloom, since = self._filter, self._since
+            started = self._load(bloom, since - self.overlap)
+            with self._lock:
+                if self._filter is bloom:
+                    # Otherwise a build replaced the filter and set its own start.
+                    self._since = started
+                if self._filter.count > self.capacity and not self._building:
+                    # Past capacity the false-positive rate climbs; rebuild larger.
+                    self.capacity *= 2
+                    self._start_build(locked=True)
+
+    def _start_build(self, locked=False):
+        if not locked:
+            with self._lock:
+                return self._start_build(locked=True)
+        if self._building:
+            return
+        self._building = True
+        threading.Thread(target=self._build, name='lookup-filter', daemon=True).start()
+
+    def _build(self):
+        try:
+            bloom = BloomFilter(self.capacity, self.error_rate)
+            since = self._load(bloom)
+            with self._lock:
+                for code in self._pending:
+                    bloom.add(code)
+                self._filter = bloom
+                self._since = since
+        except Exception:
+            logger.exception('Failed to build the tracking code filter')
+        finally:
+            with self._lock:
+                self._pending = []
+                self._building = False
+            connection.close()
+
+    def _load(self, bloom, changed_since=None):
+        """Add the codes of every row (or those saved since `changed_since`).
+
+        Returns the time the scan started, the next refresh's starting point.
+        """
+        started = timezone.now()
+        for model, (_, _, code_fields, _) in CODE_SOURCES.items():
+            rows = model.objects.all()
+            if changed_since is not None:
+                rows = rows.filter(updated_at__gte=changed_since)
+            for codes in rows.values_list(*code_fields).iterator(chunk_size=10000):
+                for code in codes:
+                    if code:
+                        bloom.add(code)
+        self._refreshed_at = time.monotonic()
+        return started
+
+
+def _source_query(model, code):
+    match_type, reference, code_fields, status_field = CODE_SOURCES[model]
+    condition = Q()
+    for field in code_fields:
+        condition |= Q(**{field: code})
+    return model.objects.filter(condition).values_list(
+        Value(match_type, output_field=CharField()),
+        'pk',
+        reference,
+        status_field or Value('', output_field=CharField()),
+    )
+
+
+def _union_query(code):
+    item_query, *other_queries = [_source_query(model, code) for model in CODE_SOURCES]
+    return item_query.union(*other_queries, all=True)
+
+
+def _match(match_type, pk, reference, status):
+    return {'type': match_type, 'id': pk, 'reference': reference, 'status': status or None}
+
+
+def query_code(code):
+    """Resolve `code` against every source table in one UNION ALL query."""
+    return [_match(*row) for row in _union_query(code)]
+
+
+_cache = None
+_known_codes = None
+_init_lock = threading.Lock()
+
+
+def _state():
+    global _cache, _known_codes
+    with _init_lock:
+        if _cache is None:
+            options = lookup_settings()
+            _cache = CodeCache(options['CACHE_SIZE'], options['CACHE_TTL_SECONDS'])
+            _known_codes = KnownCodes(
+                options['FILTER_CAPACITY'],
+                options['FILTER_ERROR_RATE'],
+                options['FILTER_REFRESH_SECONDS'],
+                options['FILTER_REFRESH_OVERLAP_SECONDS'],
+            )
+        return _cache, _known_codes
+
+
+def resolve_code(code):
+    """Return the list of matches for `code` (empty when unknown)."""
+    code = code.strip()
+    if not code:
+        return []
+    cache, known_codes = _state()
+    matches = cache.get(code)
+    if matches is not None:
+        return matches
+    if not known_codes.might_contain(code):
+        return []
+    matches = query_code(code)
+    if matches:
+        cache.set(code, matches)
+    return matches
+
+
+async def aresolve_code(code):
+    """`resolve_code` for async views.
+
+    Cache hits and filter negatives are answered on the event loop; only
+    the UNION ALL query (and a due filter refresh) reach the database.
+    """
+    code = code.strip()
+    if not code:
+        return []
+    cache, known_codes = _state()
+    matches = cache.get(code)
+    if matches is not None:
+        return matches
+    known = known_codes.check(code)
+    if known is None:
+        known = await sync_to_async(known_codes.might_contain)(code)
+    if not known:
+        return []
+    matches = [_match(*row) async for row in _union_query(code)]
+    if matches:
+        cache.set(code, matches)
+    return matches
+
+
+def code_saved(instance):
+    """Invalidate cached lookups for `instance` and register its codes."""
+    match_type, _, code_fields, _ = CODE_SOURCES[type(instance)]
+    cache, known_codes = _state()
+    cache.invalidate(match_type, instance.pk)
+    known_codes.add(*(getattr(instance, field) for field in code_fields))
+
+
+def invalidate(match_type, pks):
+    """Drop cached lookups for rows changed in bulk (no signals fired)."""
+    cache, _ = _state()
+    for pk in pks:
+        cache.invalidate(match_type, pk)
+
+
+def code_deleted(instance):
+    match_type = CODE_SOURCES[type(instance)][0]
+    cache, _ = _state()
+    cache.invalidate(match_type, instance.pk)
@@ -0,0 +1,140 @@
+"""Django management command: bench_db_pool
+
+Measures per-request database latency under each `DB_CONN_MODE`
+against the configured PostgreSQL server:
+
+* off -- connect, query, disconnect (a handshake per request);
+* persistent -- `CONN_MAX_AGE` with health checks, one connection per
+  thread;
+* pool -- psycopg 3's pool shared by all threads (skipped when psycopg 3
+  is not installed).
+
+`--concurrency` threads each play `--requests` requests. A request
+follows Django's lifecycle: `close_if_unusable_or_obsolete()` when it
+starts and finishes (what `request_started`/`request_finished` do)
+around one query like `/api/stats/` runs. Use a local server to see the
+handshake cost without network noise.
+
+Example:
+    python manage.py bench_db_pool --requests 500 --concurrency 8
+"""
+
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import load_backend
+
+from backend.models import StatusCounter
+
+MODES = ('off', 'persistent', 'pool')
+
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-request DB latency with and without connection reuse/pooling'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300, help='Requests per thread')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+        parser.add_argument('--pool-size', type=int, help='Pool max size (default: --concurrency)')
+
+    def handle(self, *args, **options):
+        base = connections[DEFAULT_DB_ALIAS].settings_dict
+        if connections[DEFAULT_DB_ALIAS].vendor != 'postgresql':
+            raise CommandError('bench_db_pool needs the PostgreSQL database configured')
+        table = connections[DEFAULT_DB_ALIAS].ops.quote_name(StatusCounter._meta.db_table)
+        self.query = f'SELECT entity, status, count FROM {table}'
+
+        self.stdout.write(f"{options['concurrency']} threads x {options['requests']} requests")
+        for mode in options['modes']:
+            settings_dict = self.settings_for(base, mode, options['pool_size'] or options['concurrency'])
+            if settings_dict is None:
+                self.stdout.write(f'{mode:<11} skipped: psycopg 3 with psycopg_pool is not installed')
+                continue
+            self.report(mode, self.run(mode, settings_dict, options['requests'], options['concurrency']))
+
+    def settings_for(self, base, mode, pool_size):
+        options = {key: value for key, value in base['OPTIONS'].items() if key != 'pool'}
+        settings_dict = {**base, 'OPTIONS': options, 'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False}
+        if mode == 'persistent':
+            settings_dict.update(CONN_MAX_AGE=600, CONN_HEALTH_CHECKS=True)
+        elif mode == 'pool':
+            try:
+                import psycopg_pool
+            except ImportError:
+                return None
+            options['pool'] = {
+                'min_size': pool_size, 'max_size': pool_size, 'timeout': 10,
+                'check': psycopg_pool.ConnectionPool.check_connection,
+            }
+        return settings_dict
+
+    def run(self, mode, settings_dict, requests, concurrency):
+        backend = load_backend(settings_dict['ENGINE'])
+        alias = f'bench_{mode}'
+        latencies = []
+        connects = []
+        errors = []
+        lock = threading.Lock()
+
+        def worker():
+            wrapper = backend.DatabaseWrapper(settings_dict, alias)
+            opened = 0
+            mine = []
+            try:
+                for _ in range(requests):
+                    started = time.perf_counter()
+                    wrapper.close_if_unusable_or_obsolete()
+                    if wrapper.connection is None:
+                        opened += 1
+                    with wrapper.cursor() as cursor:
+                        cursor.execute(self.query)
+                        cursor.fetchall()
+                    wrapper.close_if_unusable_or_obsolete()
+                    mine.append(time.perf_counter() - started)
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+            finally:
+                wrapper.close()
+                with lock:
+                    latencies.extend(mine)
+                    connects.append(opened)
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        pool = None
+        if mode == 'pool':
+            wrapper = backend.DatabaseWrapper(settings_dict, alias)
+            pool = wrapper.pool.get_stats()
+            wrapper.close_pool()
+        if errors:
+            raise CommandError(f'{mode}: {errors[0]}')
+        return {'elapsed': elapsed, 'latencies': sorted(latencies), 'connects': sum(connects), 'pool': pool}
+
+    def report(self, mode, result):
+        latencies = result['latencies']
+        if result['pool'] is not None:
+            handshakes = result['pool'].get('connections_num', 0)
+            extra = f"  waits {result['pool'].get('requests_queued', 0)}"
+        else:
+            handshakes = result['connects']
+            extra = ''
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {mode:<11} p50 {_percentile(latencies, 0.5) * 1000:7.2f} ms  '
+            f'p95 {_percentile(latencies, 0.95) * 1000:7.2f} ms  '
+            f'p99 {_percentile(latencies, 0.99) * 1000:7.2f} ms  '
+            f'{len(latencies) / result["elapsed"]:8.0f} req/s  handshakes {handshakes}{extra}'
+        ))
@@ -0,0 +1,181 @@
+"""Django management command: bench_http
+
+Load-tests running servers over HTTP to compare deployments, e.g. the
+WSGI app (`runserver`, gunicorn) against the ASGI app (uvicorn) serving
+the async read endpoints (see `backend.async_api`).
+
+Each of `--concurrency` clients loops for `--duration` seconds over
+`--path`s, one request per connection, authenticated with an access
+token minted for `--user` (the servers must share this SECRET_KEY).
+`--slow-ms` makes every client trickle its request and pause before
+reading the response, like a handheld scanner on poor Wi-Fi. With
+`--pid NAME=PID` the server process's thread count is sampled from
+/proc (Linux) while its target runs.
+
+Example:
+    python manage.py runserver 8000 --noreload &
+    uvicorn shipperdV1.asgi:application --port 8001 &
+    python manage.py bench_http --target wsgi=http://127.0.0.1:8000 \\
+        --target asgi=http://127.0.0.1:8001 --concurrency 200 --slow-ms 300
+"""
+
+import asyncio
+import ssl
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.authentication import RoleClaimsRefreshToken
+from backend.models import Item, User
+from backend.models.enums import UserRole
+
+DEFAULT_PATHS = ['/api/stats/', '/api/items/?page_size=50', '/api/boxes/', '/api/auth/me/']
+
+
+def _pair(value):
+    name, sep, rest = value.partition('=')
+    if not sep or not name or not rest:
+        raise ValueError(value)
+    return name, rest
+
+
+def _thread_count(pid):
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            for line in status:
+                if line.startswith('Threads:'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = 'Load-test WSGI/ASGI deployments with many (optionally slow) concurrent clients'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', required=True, help='NAME=BASE_URL, repeatable')
+        parser.add_argument('--path', action='append', help='Request path, repeatable')
+        parser.add_argument('--concurrency', type=int, default=100)
+        parser.add_argument('--duration', type=float, default=10.0)
+        parser.add_argument('--slow-ms', type=int, default=0, help='Per-request client-side slowness')
+        parser.add_argument('--user', help='Email of the staff user to authenticate as')
+        parser.add_argument('--pid', action='append', default=[], help='NAME=PID of a server to sample')
+
+    def handle(self, *args, **options):
+        try:
+            targets = [_pair(value) for value in options['target']]
+            pids = dict(_pair(value) for value in options['pid'])
+        except ValueError as e:
+            raise CommandError(f'Expected NAME=VALUE, got {e}')
+        users = User.objects.filter(role__in=[UserRole.EMPLOYEE, UserRole.ADMIN, UserRole.SUPER_ADMIN])
+        user = users.filter(email=options['user']).first() if options['user'] else users.first()
+        if user is None:
+            raise CommandError('Needs a staff user (see --user, or run seed_users first)')
+        token = str(RoleClaimsRefreshToken.for_user(user).access_token)
+        paths = options['path'] or DEFAULT_PATHS + [
+            f'/api/lookup/{code}/' for code in Item.objects.values_list('tracking_number', flat=True)[:1]
+        ]
+
+        self.stdout.write(
+            f"{options['concurrency']} clients x {options['duration']:.0f}s, "
+            f"slow {options['slow_ms']} ms, paths: {', '.join(paths)}"
+        )
+        for name, base_url in targets:
+            result = asyncio.run(self.run_target(
+                base_url, paths, token, options['concurrency'], options['duration'],
+                options['slow_ms'] / 1000, pids.get(name),
+            ))
+            self.report(name, result)
+
+    async def run_target(self, base_url, paths, token, concurrency, duration, slow, pid):
+        url = urlsplit(base_url)
+        tls = ssl.create_default_context() if url.scheme == 'https' else None
+        port = url.port or (443 if tls else 80)
+        latencies = []
+        errors = {}
+        threads = []
+        deadline = time.monotonic() + duration
+
+        async def client(number):
+            index = number
+            while time.monotonic() < deadline:
+                path = paths[index % len(paths)]
+                index += 1
+                started = time.monotonic()
+                try:
+                    status = await self.request(url.hostname, port, tls, path, token, slow)
+                except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+                    errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                    continue
+                if status >= 400:
+                    errors[f'HTTP {status}'] = errors.get(f'HTTP {status}', 0) + 1
+                else:
+                    latencies.append(time.monotonic() - started)
+
+        async def sample():
+            while time.monotonic() < deadline:
+                count = _thread_count(pid)
+                if count is not None:
+                    threads.append(count)
+                await asyncio.sleep(0.5)
+
+        started = time.monotonic()
+        await asyncio.gather(*(client(number) for number in range(concurrency)), *([sample()] if pid else []))
+        return {
+            'elapsed': time.monotonic() - started,
+            'latencies': sorted(latencies),
+            'errors': errors,
+            'threads': max(threads) if threads else None,
+        }
+
+    async def request(self, host, port, tls, path, token, slow):
+        reader, writer = await asyncio.open_connection(host, port, ssl=tls)
+        try:
+            request = (
+                f'GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n'
+                f'Authorization: Bearer {token}\r\nAccept: application/json\r\n'
+                'Connection: close\r\n\r\n'
+            ).encode()
+            if slow:
+                # Trickle the request in four pieces, then dawdle before reading.
+                step = len(request) // 4 + 1
+                for start in range(0, len(request), step):
+                    writer.write(request[start:start + step])
+                    await writer.drain()
+                    await asyncio.sleep(slow / 8)
+                await asyncio.sleep(slow / 2)
+            else:
+                writer.write(request)
+                await writer.drain()
+            status_line = await reader.readline()
+            parts = status_line.split()
+            if len(parts) < 2:
+                raise ValueError('Bad status line')
+            await reader.read()
+            return int(parts[1])
+        finally:
+            writer.close()
+
+    def report(self, name, result):
+        latencies = result['latencies']
+        failed = sum(result['errors'].values())
+        line = (
+            f'{name:<8} {len(latencies):7d} ok {failed:6d} failed '
+            f'{len(latencies) / result["elapsed"]:8.1f} req/s   '
+            f'p50 {_percentile(latencies, 0.5) * 1000:7.1f} ms  '
+            f'p95 {_percentile(latencies, 0.95) * 1000:7.1f} ms  '
+            f'p99 {_percentile(latencies, 0.99) * 1000:7.1f} ms'
+        )
+        if result['threads'] is not None:
+            line += f'   max threads {result["threads"]}'
+        self.stdout.write(self.style.SUCCESS(f'✅ {line}'))
+        if result['errors']:
+            self.stdout.write(f'         errors: {result["errors"]}')
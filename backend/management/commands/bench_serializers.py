@@ -0,0 +1,85 @@
+"""Django management command: bench_serializers
+
+Compares the list serialization paths for boxes and items: DRF
+`ModelSerializer` + `JSONRenderer` against `FastSerializer` over
+`.values()` + `ORJSONRenderer` (see `backend.fast_serializers` and
+`backend.renderers`). Each size is measured end to end (query, build
+dicts, render) and the two outputs are checked to be byte-identical.
+Benchmark rows are created inside a transaction that is rolled back.
+
+Example:
+    python manage.py bench_serializers --rows 1000 10000 100000
+"""
+
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from backend.fast_serializers import FastSerializer
+from backend.models import InternationalBox, Item, Locker, Warehouse
+from backend.models.enums import BoxStatus, ItemStatus
+from backend.renderers import ORJSONRenderer
+from backend.serializers import InternationalBoxSerializer, ItemSerializer
+
+
+class Command(BaseCommand):
+    help = 'Benchmark ModelSerializer vs FastSerializer + orjson on large lists'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000])
+
+    def handle(self, *args, **options):
+        locker = Locker.objects.select_related('warehouse').first()
+        if locker is None:
+            raise CommandError('Needs at least one locker (run seed_data first)')
+        batch = uuid.uuid4().hex[:8].upper()
+
+        with transaction.atomic():
+            for rows in sorted(options['rows']):
+                self.create_rows(locker, batch, rows)
+                boxes = InternationalBox.objects.filter(box_number__startswith=f'BENCH-{batch}-')
+                items = Item.objects.filter(tracking_number__startswith=f'BENCH-{batch}-')
+                self.stdout.write(f'{rows} rows')
+                self.compare('boxes', boxes.select_related('warehouse'), InternationalBoxSerializer)
+                self.compare('items', items, ItemSerializer)
+            transaction.set_rollback(True)
+
+    def create_rows(self, locker, batch, rows):
+        existing = InternationalBox.objects.filter(box_number__startswith=f'BENCH-{batch}-').count()
+        now = timezone.now()
+        InternationalBox.objects.bulk_create([
+            InternationalBox(
+                box_number=f'BENCH-{batch}-{i}', status=BoxStatus.BUILDING,
+                origin_country='AE', destination_country='IE',
+                total_weight_kg=i % 300 / 10, items_count=i % 50, warehouse=locker.warehouse,
+            )
+            for i in range(existing, rows)
+        ], batch_size=2000)
+        Item.objects.bulk_create([
+            Item(
+                tracking_number=f'BENCH-{batch}-{i}', status=ItemStatus.ARRIVED_WAREHOUSE,
+                scanning_date=now, weight_kg=i % 200 / 10, category='General',
+                country_origin='US', customer_id=locker.customer_id, locker=locker,
+            )
+            for i in range(existing, rows)
+        ], batch_size=2000)
+
+    def compare(self, label, queryset, serializer_class):
+        started = time.perf_counter()
+        slow = JSONRenderer().render(serializer_class(queryset.order_by('-id'), many=True).data)
+        slow_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        serializer = FastSerializer(serializer_class)
+        fast = ORJSONRenderer().render(serializer.serialize(serializer.values(queryset.order_by('-id'))))
+        fast_seconds = time.perf_counter() - started
+
+        identical = 'identical' if fast == slow else 'DIFFERENT'
+        self.stdout.write(
+            f'  {label:<6} ModelSerializer {slow_seconds * 1000:9.1f} ms   '
+            f'fast {fast_seconds * 1000:8.1f} ms   x{slow_seconds / fast_seconds:5.1f}   {identical}'
+        )
@@ -0,0 +1,72 @@
+"""Django management command: bench_status_log
+
+Measures StatusLog write throughput for per-row INSERTs against the
+buffered writer in `backend.status_logs` (single `bulk_create`) and the
+background writer. Rows written by the benchmark are deleted afterwards.
+
+Example:
+    python manage.py bench_status_log --rows 10000
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from backend import status_logs
+from backend.models import StatusLog
+from backend.models.enums import EntityType, ItemStatus
+
+BENCH_NOTE = 'bench_status_log'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark per-row vs buffered vs background StatusLog writes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        try:
+            self.report('per-row INSERT', rows, self.per_row(rows))
+            self.report('buffered bulk_create', rows, self.buffered(rows))
+            self.report('background writer', rows, self.background(rows))
+        finally:
+            deleted, _ = StatusLog.objects.filter(note=BENCH_NOTE).delete()
+            self.stdout.write(f'Cleaned up {deleted} benchmark rows')
+
+    def report(self, label, rows, seconds):
+        self.stdout.write(f'{label:<22} {seconds * 1000:9.1f} ms  {rows / seconds:12.0f} rows/s')
+
+    def per_row(self, rows):
+        started = time.perf_counter()
+        with transaction.atomic():
+            for i in range(rows):
+                StatusLog.objects.create(
+                    entity_type=EntityType.ITEM, entity_id=str(i),
+                    status=ItemStatus.ARRIVED_WAREHOUSE, note=BENCH_NOTE,
+                )
+        return time.perf_counter() - started
+
+    def buffered(self, rows):
+        started = time.perf_counter()
+        with status_logs.atomic():
+            for i in range(rows):
+                status_logs.log_status(
+                    EntityType.ITEM, i, ItemStatus.ARRIVED_WAREHOUSE, note=BENCH_NOTE
+                )
+        return time.perf_counter() - started
+
+    def background(self, rows):
+        writer = status_logs.BackgroundStatusLogWriter()
+        started = time.perf_counter()
+        # Simulate many small requests, each flushing a handful of entries.
+        for request_start in range(0, rows, 5):
+            writer.submit([
+                StatusLog(entity_type=EntityType.ITEM, entity_id=str(i),
+                          status=ItemStatus.ARRIVED_WAREHOUSE, note=BENCH_NOTE)
+                for i in range(request_start, min(request_start + 5, rows))
+            ])
+        writer.stop()
+        return time.perf_counter() - started
@@ -0,0 +1,47 @@
+"""Django management command: import_customers
+
+Bulk-imports customer accounts from a partner CSV or JSON file and
+provisions their lockers in every warehouse with set-based inserts (see
+`backend.customer_import`). Invalid rows are reported and skipped.
+
+Example:
+    python manage.py import_customers partner.csv
+    python manage.py import_customers partner.json --dry-run
+"""
+
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from backend.customer_import import import_customers, parse_rows
+
+
+class Command(BaseCommand):
+    help = 'Bulk import customers (CSV or JSON) with their lockers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'json'],
+                            help='Defaults to the file extension')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Validate rows without writing anything')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        try:
+            rows = parse_rows(path.read_text(encoding='utf-8-sig'), file_format)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        summary = import_customers(rows, dry_run=options['dry_run'], allow_plaintext=True)
+        for error in summary['errors']:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️ Row {error['row']} ({error['email']}): {error['error']}"
+            ))
+        if options['dry_run']:
+            self.stdout.write(f"ℹ️  Dry run: {summary['valid']} valid row(s), {len(summary['errors'])} error(s)")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Imported {summary['created']} customer(s) and {summary['lockers_created']} locker(s)"
+        ))
@@ -0,0 +1,25 @@
+"""Django management command: purge_tokens
+
+Deletes expired outstanding JWT refresh tokens together with their
+blacklist entries, in small chunks so it can run while the app is
+serving traffic. Schedule it (e.g. daily) to keep the `token_blacklist`
+tables bounded.
+"""
+
+from django.core.management.base import BaseCommand
+
+from backend.token_blacklist import purge_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete expired outstanding and blacklisted JWT tokens in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000,
+                            help='Tokens deleted per transaction (default 5000)')
+
+    def handle(self, *args, **options):
+        outstanding, blacklisted = purge_expired(options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Purged {outstanding} expired tokens ({blacklisted} blacklisted)'
+        ))
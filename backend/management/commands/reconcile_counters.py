@@ -0,0 +1,22 @@
+"""Django management command: reconcile_counters
+
+Recomputes the `status_counters` table from the live item, box, order
+and user tables. Safe to run while the app is serving traffic; use it
+after bulk loads that bypassed model signals or on a schedule to
+correct any drift.
+"""
+
+from django.core.management.base import BaseCommand
+
+from backend.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-status dashboard counters from scratch'
+
+    def handle(self, *args, **options):
+        counters = reconcile()
+        for entity, statuses in sorted(counters.items()):
+            total = sum(statuses.values())
+            self.stdout.write(f'{entity}: {total} ({len(statuses)} statuses)')
+        self.stdout.write(self.style.SUCCESS('✅ Counters reconciled'))
@@ -0,0 +1,47 @@
+"""Django management command: send_notifications
+
+Runs the notification outbox worker (see `backend.notifications`):
+claims pending notifications in batches, sends per-user digests by
+email/SMS and marks them sent. Runs until interrupted; `--once` drains
+what is due and exits, for cron. Several workers can run side by side.
+
+Example:
+    python manage.py send_notifications --interval 5
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from backend.notifications import deliver_pending
+
+
+class Command(BaseCommand):
+    help = 'Deliver pending customer notifications from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain due notifications and exit')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep when idle')
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        totals = {}
+        try:
+            while True:
+                close_old_connections()
+                stats = deliver_pending(options['batch_size'])
+                for key, value in stats.items():
+                    totals[key] = totals.get(key, 0) + value
+                if stats['claimed']:
+                    self.stdout.write(
+                        f"claimed {stats['claimed']}: sent {stats['sent']}, inbox only {stats['skipped']}, "
+                        f"deferred {stats['deferred']}, failed {stats['failed']}"
+                    )
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"✅ Sent {totals.get('sent', 0)} notification(s)"))
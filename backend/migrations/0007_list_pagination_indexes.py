@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('backend', '0006_user_email_notifications_user_sms_notifications_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='internationalbox',
+            index=models.Index(fields=['status', 'id'], name='internation_status_ebcdb5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='internationalbox',
+            index=models.Index(fields=['destination_country', 'id'], name='internation_destina_cbe812_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['status', 'id'], name='items_status_4bf508_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['category', 'id'], name='items_categor_ddb704_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['country_origin', 'id'], name='items_country_2e1bf4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['scanning_date', 'id'], name='items_scannin_f9236d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', 'id'], name='users_role_70f714_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:55
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+COUNTED = [
+    ('Item', 'item', 'status'),
+    ('InternationalBox', 'box', 'status'),
+    ('InternationalOrder', 'order', 'status'),
+    ('DomesticOrder', 'domestic_order', 'status'),
+    ('User', 'user', 'role'),
+]
+
+
+def seed_counters(apps, schema_editor):
+    StatusCounter = apps.get_model('backend', 'StatusCounter')
+    counters = []
+    for model_name, entity, field in COUNTED:
+        model = apps.get_model('backend', model_name)
+        for row in model.objects.order_by().values(field).annotate(n=Count('pk')):
+            counters.append(StatusCounter(entity=entity, status=row[field], count=row['n']))
+    StatusCounter.objects.bulk_create(counters)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0007_list_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatusCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(choices=[('item', 'Item'), ('box', 'Box'), ('order', 'International Order'), ('domestic_order', 'Domestic Order'), ('user', 'User')], max_length=20)),
+                ('status', models.CharField(max_length=50)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'status_counters',
+                'unique_together': {('entity', 'status')},
+            },
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
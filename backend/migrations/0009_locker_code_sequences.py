@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0008_status_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LockerCodeSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=20, unique=True)),
+                ('next_value', models.BigIntegerField(default=1)),
+            ],
+            options={
+                'db_table': 'locker_code_sequences',
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0009_locker_code_sequences'),
+        ('token_blacklist', '0013_alter_blacklistedtoken_options_and_more'),
+    ]
+
+    operations = [
+        # Lets `purge_tokens` find expired tokens without scanning the table.
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS token_blacklist_outstandingtoken_expires_at '
+            'ON token_blacklist_outstandingtoken (expires_at)',
+            'DROP INDEX IF EXISTS token_blacklist_outstandingtoken_expires_at',
+        ),
+    ]
@@ -0,0 +1,127 @@
+# Trigram search indexes for backend.search.
+#
+# PostgreSQL: pg_trgm GIN indexes, built CONCURRENTLY so large tables stay
+# writable (hence `atomic = False`). Creating the extension needs a role
+# allowed to run CREATE EXTENSION.
+# SQLite: an FTS5 table with the trigram tokenizer, filled from the
+# source tables and kept in sync by triggers. Migrations that rebuild a
+# source table drop its triggers; they re-create them with
+# `create_sqlite_triggers` (see 0019_restore_search_triggers).
+# Other databases get no index, and search returns nothing there.
+
+import warnings
+
+from django.db import migrations
+
+POSTGRES_INDEXES = {
+    'users_email_trgm': ('users', 'email'),
+    'users_phone_trgm': ('users', 'phone'),
+    'users_first_name_trgm': ('users', 'first_name'),
+    'users_last_name_trgm': ('users', 'last_name'),
+    'items_tracking_number_trgm': ('items', 'tracking_number'),
+    'lockers_code_trgm': ('lockers', 'code'),
+    'international_orders_ref_trgm': ('international_orders', 'marketplace_order_ref'),
+}
+
+# table -> (rowid offset, kind, row condition, reference, label, searched text)
+# Row ids are `id * 4 + offset`, so triggers delete by rowid.
+SQLITE_SOURCES = {
+    'users': (
+        0, 'customer', "{row}.role = 'customer'", '{row}.email',
+        "trim(coalesce({row}.first_name, '') || ' ' || coalesce({row}.last_name, ''))",
+        "{row}.email || ' ' || coalesce({row}.phone, '') || ' ' || "
+        "coalesce({row}.first_name, '') || ' ' || coalesce({row}.last_name, '')",
+    ),
+    'items': (1, 'item', '1', '{row}.tracking_number', '{row}.status', '{row}.tracking_number'),
+    'lockers': (2, 'locker', '1', '{row}.code', '{row}.description', '{row}.code'),
+    'international_orders': (
+        3, 'order', '1', '{row}.marketplace_order_ref', '{row}.marketplace',
+        "coalesce({row}.marketplace_order_ref, '')",
+    ),
+}
+
+
+def _sqlite_insert(table, row, source='(SELECT 1)'):
+    """INSERT of `row`'s index entry; `row` is `NEW` in triggers or the table itself."""
+    offset, kind, condition, reference, label, text = SQLITE_SOURCES[table]
+    values = ', '.join([
+        f'{row}.id * 4 + {offset}', f"'{kind}'", f'{row}.id', reference, label, text,
+    ]).format(row=row)
+    return (
+        'INSERT INTO search_index (rowid, kind, object_id, reference, label, body) '
+        f'SELECT {values} FROM {source} WHERE {condition.format(row=row)}'
+    )
+
+
+def fill_sqlite_index(schema_editor, table):
+    """(Re-)index every row of `table`."""
+    offset = SQLITE_SOURCES[table][0]
+    schema_editor.execute(f'DELETE FROM search_index WHERE rowid % 4 = {offset}')
+    schema_editor.execute(_sqlite_insert(table, table, source=table))
+
+
+def create_sqlite_triggers(schema_editor, table):
+    """Keep `table`'s index entries in sync, replacing any existing triggers."""
+    offset = SQLITE_SOURCES[table][0]
+    for event in ('insert', 'update', 'delete'):
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS {table}_search_{event}')
+    schema_editor.execute(
+        f'CREATE TRIGGER {table}_search_insert AFTER INSERT ON {table} BEGIN '
+        f'{_sqlite_insert(table, "NEW")}; END'
+    )
+    schema_editor.execute(
+        f'CREATE TRIGGER {table}_search_update AFTER UPDATE ON {table} BEGIN '
+        f'DELETE FROM search_index WHERE rowid = OLD.id * 4 + {offset}; '
+        f'{_sqlite_insert(table, "NEW")}; END'
+    )
+    schema_editor.execute(
+        f'CREATE TRIGGER {table}_search_delete AFTER DELETE ON {table} BEGIN '
+        f'DELETE FROM search_index WHERE rowid = OLD.id * 4 + {offset}; END'
+    )
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for name, (table, column) in POSTGRES_INDEXES.items():
+            schema_editor.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+                f'ON {table} USING gin ({column} gin_trgm_ops)'
+            )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE search_index USING fts5('
+            'kind UNINDEXED, object_id UNINDEXED, reference UNINDEXED, label UNINDEXED, '
+            "body, tokenize = 'trigram')"
+        )
+        for table in SQLITE_SOURCES:
+            fill_sqlite_index(schema_editor, table)
+            create_sqlite_triggers(schema_editor, table)
+    else:
+        warnings.warn(f'No search indexes for {vendor}; search will return no results')
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        for name in POSTGRES_INDEXES:
+            schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+    elif vendor == 'sqlite':
+        for table in SQLITE_SOURCES:
+            for event in ('insert', 'update', 'delete'):
+                schema_editor.execute(f'DROP TRIGGER IF EXISTS {table}_search_{event}')
+        schema_editor.execute('DROP TABLE IF EXISTS search_index')
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('backend', '0011_collection_versions'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0012_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='boxitem',
+            index=models.Index(fields=['added_at'], name='box_items_added_a_b386a1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['condition', 'id'], name='items_conditi_f9fcd5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='statuslog',
+            index=models.Index(fields=['entity_type', 'id'], name='status_logs_entity__ef96ac_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='statuslog',
+            index=models.Index(fields=['status', 'id'], name='status_logs_status_01e922_idx'),
+        ),
+    ]
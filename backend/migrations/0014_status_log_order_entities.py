@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0013_admin_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='statuslog',
+            name='entity_type',
+            field=models.CharField(choices=[('item', 'Item'), ('box', 'Box'), ('shipment_destination', 'Shipment Destination'), ('order', 'International Order'), ('domestic_order', 'Domestic Order')], max_length=20),
+        ),
+    ]
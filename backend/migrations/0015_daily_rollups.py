@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0014_status_log_order_entities'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_log_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'rollup_progress',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('metric', models.CharField(choices=[('arrivals', 'Item Arrivals'), ('arrivals_by_category', 'Item Arrivals by Category'), ('arrivals_by_origin', 'Item Arrivals by Country of Origin'), ('shipments', 'Boxes Shipped'), ('deliveries', 'Item Deliveries'), ('orders', 'Orders Placed'), ('dwell', 'Time in Status')], max_length=30)),
+                ('dimension', models.CharField(blank=True, default='', max_length=100)),
+                ('count', models.BigIntegerField(default=0)),
+                ('total', models.FloatField(default=0.0)),
+                ('warehouse', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='backend.warehouse')),
+            ],
+            options={
+                'db_table': 'daily_rollups',
+                'indexes': [models.Index(fields=['day', 'warehouse'], name='daily_rollu_day_07d209_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('warehouse__isnull', False)), fields=('day', 'warehouse', 'metric', 'dimension'), name='daily_rollup_unique'), models.UniqueConstraint(condition=models.Q(('warehouse__isnull', True)), fields=('day', 'metric', 'dimension'), name='daily_rollup_unique_no_warehouse')],
+            },
+        ),
+    ]
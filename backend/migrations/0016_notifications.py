@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:26
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0015_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity_type', models.CharField(choices=[('item', 'Item'), ('box', 'Box'), ('shipment_destination', 'Shipment Destination'), ('order', 'International Order'), ('domestic_order', 'Domestic Order')], max_length=20)),
+                ('entity_id', models.CharField(max_length=60)),
+                ('status', models.CharField(max_length=50)),
+                ('message', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('read_at', models.DateTimeField(blank=True, null=True)),
+                ('deliver_after', models.DateTimeField(blank=True, null=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('channels', models.CharField(blank=True, default='', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'notifications',
+                'indexes': [models.Index(fields=['user', 'id'], name='notificatio_user_id_2f27a3_idx'), models.Index(condition=models.Q(('sent_at__isnull', True)), fields=['id'], name='notifications_pending_idx')],
+            },
+        ),
+    ]
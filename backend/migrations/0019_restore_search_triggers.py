@@ -0,0 +1,31 @@
+# 0017_code_updated_at rebuilds `items` and `lockers` on SQLite (adding an
+# auto_now column needs a table rebuild there), which drops the search
+# triggers 0012_search_indexes put on them. Re-create the triggers and
+# re-index both tables; other databases are unaffected.
+
+from importlib import import_module
+
+from django.db import migrations
+
+search_indexes = import_module('backend.migrations.0012_search_indexes')
+
+REBUILT_TABLES = ('items', 'lockers')
+
+
+def restore_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for table in REBUILT_TABLES:
+        search_indexes.fill_sqlite_index(schema_editor, table)
+        search_indexes.create_sqlite_triggers(schema_editor, table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0018_user_email_lower_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 13:30
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0019_restore_search_triggers'),
+    ]
+
+    # The column is unchanged (Django applies the default, not the
+    # database); skip the table rebuild SQLite would otherwise do.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='statuslog',
+                    name='created_at',
+                    field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+                ),
+            ],
+        ),
+    ]
@@ -6,16 +6,21 @@ Import all models to make them available to Django
 from .base import BaseModel
 from .enums import *
 from .user_models import User
-from .logistics_models import Warehouse, Locker, InternationalOrder, ShipmentLabel
+from .logistics_models import Warehouse, Locker, LockerCodeSequence, InternationalOrder, ShipmentLabel
 from .items_models import Item, ItemRequest
 from .shipping_models import InternationalBox, BoxItem, DomesticOrder
 from .audit_models import StatusLog
+from .counter_models import StatusCounter
+from .version_models import CollectionVersion
+from .report_models import DailyRollup, RollupProgress
+from .notification_models import Notification
 
 __all__ = [
     'BaseModel',
     'User',
     'Warehouse', 
     'Locker',
+    'LockerCodeSequence',
     'InternationalOrder',
     'ShipmentLabel',
     'Item',
@@ -24,4 +29,9 @@ __all__ = [
     'BoxItem',
     'DomesticOrder',
     'StatusLog',
+    'StatusCounter',
+    'CollectionVersion',
+    'DailyRollup',
+    'RollupProgress',
+    'Notification',
 ]
\ No newline at end of file
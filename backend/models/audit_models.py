@@ -6,6 +6,7 @@ historical entries here.
 """
 
 from django.db import models
+from django.utils import timezone
 from .enums import EntityType
 
 class StatusLog(models.Model):
@@ -15,12 +16,17 @@ class StatusLog(models.Model):
     status = models.CharField(max_length=50)
     note = models.TextField(blank=True, null=True)
     changed_by = models.ForeignKey('User', on_delete=models.SET_NULL, blank=True, null=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: entries written later by the background writer in
+    # `backend.status_logs` keep the time the status changed.
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     
     class Meta:
         db_table = 'status_logs'
         indexes = [
             models.Index(fields=['entity_type', 'entity_id', 'created_at']),
+            # Admin changelist filters (ordered by -id)
+            models.Index(fields=['entity_type', 'id']),
+            models.Index(fields=['status', 'id']),
         ]
     
     def __str__(self):
@@ -0,0 +1,23 @@
+"""backend.models.counter_models
+
+Incrementally maintained aggregate counters. One row per
+(entity, status) pair holds the number of rows currently in that status,
+so dashboards read a handful of rows instead of running `COUNT(*)` over
+the live tables. Maintained by `backend.counters`.
+"""
+
+from django.db import models
+from .enums import CounterEntity
+
+class StatusCounter(models.Model):
+    """Number of `entity` rows currently in `status` (role for users)"""
+    entity = models.CharField(max_length=20, choices=CounterEntity.choices)
+    status = models.CharField(max_length=50)
+    count = models.BigIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'status_counters'
+        unique_together = ['entity', 'status']
+    
+    def __str__(self):
+        return f"{self.entity}:{self.status} = {self.count}"
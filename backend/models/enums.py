@@ -57,4 +57,28 @@ class RequestStatus(models.TextChoices):
 class EntityType(models.TextChoices):
     ITEM = 'item', 'Item'
     BOX = 'box', 'Box'
-    SHIPMENT_DESTINATION = 'shipment_destination', 'Shipment Destination'
\ No newline at end of file
+    SHIPMENT_DESTINATION = 'shipment_destination', 'Shipment Destination'
+    ORDER = 'order', 'International Order'
+    DOMESTIC_ORDER = 'domestic_order', 'Domestic Order'
+
+class DomesticOrderStatus(models.TextChoices):
+    CART = 'CART', 'Cart'
+    PLACED = 'PLACED', 'Placed'
+    OUT_FOR_DELIVERY = 'OUT_FOR_DELIVERY', 'Out for Delivery'
+    DELIVERED = 'DELIVERED', 'Delivered'
+
+class CounterEntity(models.TextChoices):
+    ITEM = 'item', 'Item'
+    BOX = 'box', 'Box'
+    ORDER = 'order', 'International Order'
+    DOMESTIC_ORDER = 'domestic_order', 'Domestic Order'
+    USER = 'user', 'User'
+
+class RollupMetric(models.TextChoices):
+    ARRIVALS = 'arrivals', 'Item Arrivals'
+    ARRIVALS_BY_CATEGORY = 'arrivals_by_category', 'Item Arrivals by Category'
+    ARRIVALS_BY_ORIGIN = 'arrivals_by_origin', 'Item Arrivals by Country of Origin'
+    SHIPMENTS = 'shipments', 'Boxes Shipped'
+    DELIVERIES = 'deliveries', 'Item Deliveries'
+    ORDERS = 'orders', 'Orders Placed'
+    DWELL = 'dwell', 'Time in Status'
@@ -30,11 +30,20 @@ class Item(models.Model):
     customer = models.ForeignKey('User', on_delete=models.CASCADE)
     locker = models.ForeignKey('Locker', on_delete=models.CASCADE)
     international_order = models.ForeignKey('InternationalOrder', on_delete=models.SET_NULL, blank=True, null=True)
+    # Last save(); the tracking-code filter (backend.lookup) re-reads rows changed since its last refresh.
+    updated_at = models.DateTimeField(auto_now=True, null=True, db_index=True)
     
     class Meta:
         db_table = 'items'
         indexes = [
             models.Index(fields=['customer', 'status']),
+            # Keyset pagination filters on /api/items/ (ordered by id)
+            models.Index(fields=['status', 'id']),
+            models.Index(fields=['category', 'id']),
+            models.Index(fields=['country_origin', 'id']),
+            models.Index(fields=['scanning_date', 'id']),
+            # Admin changelist filter (ordered by -id)
+            models.Index(fields=['condition', 'id']),
         ]
     
     def __str__(self):
@@ -26,6 +26,8 @@ class Locker(models.Model):
     description = models.TextField(blank=True, null=True)
     customer = models.ForeignKey('User', on_delete=models.CASCADE)
     warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE)
+    # Watched by the tracking-code filter refresh (backend.lookup).
+    updated_at = models.DateTimeField(auto_now=True, null=True, db_index=True)
     
     class Meta:
         db_table = 'lockers'
@@ -34,6 +36,17 @@ class Locker(models.Model):
     def __str__(self):
         return f"Locker {self.code} - {self.customer.username}"
 
+class LockerCodeSequence(models.Model):
+    """Next free locker number for one warehouse code (see backend.locker_codes)"""
+    prefix = models.CharField(max_length=20, unique=True)
+    next_value = models.BigIntegerField(default=1)
+    
+    class Meta:
+        db_table = 'locker_code_sequences'
+    
+    def __str__(self):
+        return f"{self.prefix} -> {self.next_value}"
+
 class InternationalOrder(models.Model):
     """External marketplace order (Amazon, Noon, etc.)"""
     customer = models.ForeignKey('User', on_delete=models.CASCADE)
@@ -65,6 +78,8 @@ class ShipmentLabel(models.Model):
     international_order = models.OneToOneField(InternationalOrder, on_delete=models.CASCADE)
     is_printed = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Watched by the tracking-code filter refresh (backend.lookup).
+    updated_at = models.DateTimeField(auto_now=True, null=True, db_index=True)
     
     class Meta:
         db_table = 'shipment_labels'
@@ -0,0 +1,43 @@
+"""backend.models.notification_models
+
+Customer notifications. Each `Notification` row is both an inbox entry
+(read through `/api/notifications/`) and a transactional outbox entry:
+it is inserted in the same transaction as the status change it reports
+and stays pending (`sent_at` NULL) until the worker in
+`backend.notifications` delivers it. Maintained by `backend.notifications`.
+"""
+
+from django.db import models
+from .enums import EntityType
+
+class Notification(models.Model):
+    """A status update for one user, delivered by the notification worker"""
+    user = models.ForeignKey('User', on_delete=models.CASCADE)
+    entity_type = models.CharField(max_length=20, choices=EntityType.choices)
+    entity_id = models.CharField(max_length=60)
+    status = models.CharField(max_length=50)
+    message = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+    read_at = models.DateTimeField(blank=True, null=True)
+    
+    # Outbox state
+    deliver_after = models.DateTimeField(blank=True, null=True)  # quiet hours / retry backoff
+    claimed_at = models.DateTimeField(blank=True, null=True)  # worker lease while sending
+    sent_at = models.DateTimeField(blank=True, null=True)
+    channels = models.CharField(max_length=20, blank=True, default='')  # e.g. 'email,sms'
+    attempts = models.PositiveSmallIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'notifications'
+        indexes = [
+            # Inbox, newest first
+            models.Index(fields=['user', 'id']),
+            # Pending outbox rows only
+            models.Index(
+                fields=['id'], name='notifications_pending_idx',
+                condition=models.Q(sent_at__isnull=True),
+            ),
+        ]
+    
+    def __str__(self):
+        return f"Notification {self.id} for user {self.user_id}: {self.message}"
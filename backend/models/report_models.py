@@ -0,0 +1,54 @@
+"""backend.models.report_models
+
+Pre-aggregated reporting tables. `DailyRollup` holds one row per (day,
+warehouse, metric, dimension) with an event count and a summed value, so
+report queries read a few rows per day instead of scanning history.
+`RollupProgress` records how far into `StatusLog` the rollups have been
+built. Maintained by `backend.reports`.
+"""
+
+from django.db import models
+from .enums import RollupMetric
+
+class DailyRollup(models.Model):
+    """Events of one report metric on one day (total: weight, value or seconds)"""
+    day = models.DateField()
+    warehouse = models.ForeignKey('Warehouse', on_delete=models.CASCADE, blank=True, null=True)
+    metric = models.CharField(max_length=30, choices=RollupMetric.choices)
+    dimension = models.CharField(max_length=100, blank=True, default='')
+    count = models.BigIntegerField(default=0)
+    total = models.FloatField(default=0.0)
+    
+    class Meta:
+        db_table = 'daily_rollups'
+        constraints = [
+            # Two partial constraints: NULL warehouses would not collide in one.
+            models.UniqueConstraint(
+                fields=['day', 'warehouse', 'metric', 'dimension'],
+                condition=models.Q(warehouse__isnull=False),
+                name='daily_rollup_unique',
+            ),
+            models.UniqueConstraint(
+                fields=['day', 'metric', 'dimension'],
+                condition=models.Q(warehouse__isnull=True),
+                name='daily_rollup_unique_no_warehouse',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'warehouse']),
+        ]
+    
+    def __str__(self):
+        return f"{self.day} {self.metric}:{self.dimension} = {self.count}"
+
+class RollupProgress(models.Model):
+    """Last `StatusLog` id folded into the rollups"""
+    name = models.CharField(max_length=50, unique=True)
+    last_log_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'rollup_progress'
+    
+    def __str__(self):
+        return f"{self.name} @ {self.last_log_id}"
@@ -5,7 +5,7 @@ relationships and final domestic orders.
 """
 
 from django.db import models
-from .enums import BoxStatus
+from .enums import BoxStatus, DomesticOrderStatus
 
 class InternationalBox(models.Model):
     """International shipping box/container"""
@@ -23,9 +23,15 @@ class InternationalBox(models.Model):
     
     # Relationships
     warehouse = models.ForeignKey('Warehouse', on_delete=models.SET_NULL, blank=True, null=True)
+    # Watched by the tracking-code filter refresh (backend.lookup).
+    updated_at = models.DateTimeField(auto_now=True, null=True, db_index=True)
     
     class Meta:
         db_table = 'international_boxes'
+        indexes = [
+            models.Index(fields=['status', 'id']),
+            models.Index(fields=['destination_country', 'id']),
+        ]
     
     def __str__(self):
         return f"Box {self.box_number} - {self.status}"
@@ -41,6 +47,10 @@ class BoxItem(models.Model):
     class Meta:
         db_table = 'box_items'
         unique_together = ['box', 'item']
+        indexes = [
+            # Admin changelist date filter
+            models.Index(fields=['added_at']),
+        ]
     
     def __str__(self):
         return f"BoxItem {self.box.box_number} - {self.item.tracking_number}"
@@ -51,13 +61,8 @@ class DomesticOrder(models.Model):
     shipping_address = models.TextField()
     status = models.CharField(
         max_length=20, 
-        choices=[
-            ('CART', 'Cart'),
-            ('PLACED', 'Placed'), 
-            ('OUT_FOR_DELIVERY', 'Out for Delivery'),
-            ('DELIVERED', 'Delivered')
-        ], 
-        default='CART'
+        choices=DomesticOrderStatus.choices,
+        default=DomesticOrderStatus.CART
     )
     created_at = models.DateTimeField(auto_now_add=True)
     
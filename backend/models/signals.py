@@ -1,13 +1,24 @@
 """backend.models.signals
 
-Signal handlers for automatically creating customer lockers.
+Signal handlers for automatically creating customer lockers, keeping the
+per-status counters in `backend.counters` up to date (and publishing
+single-row status changes to `backend.live`), invalidating the
+tracking-code lookup cache in `backend.lookup`, bumping the collection
+versions in `backend.versions` and logging new marketplace orders (the
+`placed` event the reports in `backend.reports` count).
 """
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 from django.db import transaction
-from backend.models import User, Warehouse, Locker
-from .enums import UserRole
+from backend.counters import COUNTED_MODELS, apply_deltas, apply_transition
+from backend.live import publish_status
+from backend.locker_codes import allocate_locker_codes
+from backend.lookup import CODE_SOURCES, code_deleted, code_saved
+from backend.status_logs import log_status
+from backend.versions import VERSIONED_MODELS, bump, user_key
+from backend.models import InternationalOrder, User, Warehouse, Locker
+from .enums import EntityType, UserRole
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,67 +29,123 @@ def create_customer_lockers(sender, instance, created, **kwargs):
     if created and instance.role == UserRole.CUSTOMER:
         try:
             with transaction.atomic():
-                warehouses = Warehouse.objects.all()
-                for warehouse in warehouses:
-                    locker_code = generate_locker_code(instance, warehouse)
-                    
-                    # Check if locker with this code already exists
-                    if not Locker.objects.filter(code=locker_code).exists():
-                        Locker.objects.create(
-                            code=locker_code,
-                            description=f"Auto-assigned locker for {instance.username}",
-                            customer=instance,
-                            warehouse=warehouse
-                        )
-                        logger.info(f"Created locker {locker_code} for {instance.email}")
-                    else:
-                        # Generate alternative code
-                        alternative_code = generate_alternative_code(instance, warehouse)
-                        Locker.objects.create(
-                            code=alternative_code,
-                            description=f"Auto-assigned locker for {instance.username}",
-                            customer=instance,
-                            warehouse=warehouse
-                        )
-                        logger.info(f"Created alternative locker {alternative_code} for {instance.email}")
+                lockers = [
+                    Locker(
+                        code=allocate_locker_codes(warehouse, [instance])[0],
+                        description=f"Auto-assigned locker for {instance.username or instance.email}",
+                        customer=instance,
+                        warehouse=warehouse
+                    )
+                    for warehouse in Warehouse.objects.all()
+                ]
+                Locker.objects.bulk_create(lockers)
+                for locker in lockers:
+                    logger.info(f"Created locker {locker.code} for {instance.email}")
         except Exception as e:
             logger.error(f"Failed to create lockers for {instance.email}: {str(e)}")
             # Don't raise exception to prevent user creation from failing
 
-def generate_locker_code(user, warehouse):
-    """Generate unique locker code"""
-    if warehouse.city:
-        warehouse_code = warehouse.city[:3].upper().replace(' ', '')
-    else:
-        warehouse_code = warehouse.name[:3].upper().replace(' ', '')
-    
-    if user.username:
-        user_code = user.username.upper()[:5].replace(' ', '')
-    else:
-        user_code = user.email.split('@')[0].upper()[:5].replace(' ', '')
-    
-    existing_count = Locker.objects.filter(
-        warehouse=warehouse,
-        customer=user
-    ).count()
-    
-    next_number = existing_count + 1
-    return f"{warehouse_code}-{user_code}-{next_number:03d}"
-
-def generate_alternative_code(user, warehouse):
-    """Generate alternative locker code if primary exists"""
-    if warehouse.city:
-        warehouse_code = warehouse.city[:3].upper().replace(' ', '')
-    else:
-        warehouse_code = warehouse.name[:3].upper().replace(' ', '')
-    
-    if user.username:
-        user_code = user.username.upper()[:5].replace(' ', '')
+
+# Status counters -------------------------------------------------------------
+
+_UNKNOWN = object()
+
+
+def remember_counted_status(sender, instance, **kwargs):
+    """Snapshot the counted field as loaded, to detect changes on save."""
+    field = COUNTED_MODELS[sender][1]
+    instance._counted_status = instance.__dict__.get(field, _UNKNOWN)
+
+
+def load_counted_status(sender, instance, raw=False, **kwargs):
+    """Fetch the stored status when the instance was loaded with it deferred.
+
+    Runs before saves and deletes, so both adjust the counter of the
+    status the row actually has.
+    """
+    if raw or instance._state.adding or instance._counted_status is not _UNKNOWN:
+        return
+    field = COUNTED_MODELS[sender][1]
+    instance._counted_status = (
+        sender._default_manager.filter(pk=instance.pk).values_list(field, flat=True).first()
+    )
+
+
+def count_saved(sender, instance, created, raw=False, **kwargs):
+    """Move the instance between status counters in the saving transaction."""
+    if raw:
+        return
+    entity, field = COUNTED_MODELS[sender]
+    current = getattr(instance, field)
+    if created or instance._counted_status is None:
+        apply_deltas(entity, {current: 1})
+    elif instance._counted_status != current:
+        apply_transition(entity, [instance._counted_status], current)
     else:
-        user_code = user.email.split('@')[0].upper()[:5].replace(' ', '')
-    
-    # Use timestamp to ensure uniqueness
-    import time
-    timestamp = int(time.time()) % 1000
-    
-    return f"{warehouse_code}-{user_code}-ALT-{timestamp:03d}"
\ No newline at end of file
+        return
+    instance._counted_status = current
+    publish_status(sender, [instance.pk], current)
+
+
+def count_deleted(sender, instance, **kwargs):
+    entity, field = COUNTED_MODELS[sender]
+    status = instance._counted_status
+    if status is not _UNKNOWN and status is not None:
+        apply_deltas(entity, {status: -1})
+
+
+for counted_model in COUNTED_MODELS:
+    post_init.connect(remember_counted_status, sender=counted_model)
+    pre_save.connect(load_counted_status, sender=counted_model)
+    pre_delete.connect(load_counted_status, sender=counted_model)
+    post_save.connect(count_saved, sender=counted_model)
+    post_delete.connect(count_deleted, sender=counted_model)
+
+
+# Tracking-code lookup cache -------------------------------------------------
+
+def lookup_code_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        code_saved(instance)
+
+
+def lookup_code_deleted(sender, instance, **kwargs):
+    code_deleted(instance)
+
+
+for code_model in CODE_SOURCES:
+    post_save.connect(lookup_code_saved, sender=code_model)
+    post_delete.connect(lookup_code_deleted, sender=code_model)
+
+
+# Collection versions ----------------------------------------------------------
+
+def _changed_collections(sender, instance):
+    names = list(VERSIONED_MODELS[sender])
+    if sender is User:
+        names.append(user_key(instance.pk))
+    return names
+
+
+def version_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (sender is User and update_fields == frozenset({'last_login'})):
+        return
+    bump(*_changed_collections(sender, instance))
+
+
+def version_deleted(sender, instance, **kwargs):
+    bump(*_changed_collections(sender, instance))
+
+
+for versioned_model in VERSIONED_MODELS:
+    post_save.connect(version_saved, sender=versioned_model)
+    post_delete.connect(version_deleted, sender=versioned_model)
+
+
+# Order audit trail -------------------------------------------------------------
+
+@receiver(post_save, sender=InternationalOrder)
+def log_order_placed(sender, instance, created, raw=False, **kwargs):
+    """Log the initial status of new orders; later changes go through transitions."""
+    if created and not raw:
+        log_status(EntityType.ORDER, instance.pk, instance.status, note='Order created')
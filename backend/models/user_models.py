@@ -7,6 +7,7 @@ helper methods used across the codebase.
 
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
+from django.db.models.functions import Lower
 from django.utils.translation import gettext_lazy as _
 from .enums import UserRole
 
@@ -40,7 +41,23 @@ class UserManager(BaseUserManager):
         
         return self._create_user(email, password, **extra_fields)
 
-class User(AbstractUser):
+class RoleMixin:
+    """Role checks shared by `User` and the token-backed request user."""
+
+    def is_customer(self):
+        return self.role == UserRole.CUSTOMER
+    
+    def is_employee(self):
+        return self.role in [UserRole.EMPLOYEE, UserRole.ADMIN, UserRole.SUPER_ADMIN]
+    
+    def is_admin(self):
+        return self.role in [UserRole.ADMIN, UserRole.SUPER_ADMIN]
+    
+    def is_super_admin(self):
+        return self.role == UserRole.SUPER_ADMIN
+
+
+class User(RoleMixin, AbstractUser):
     """Custom User model for Shipperd - Email as username"""
     
     username = models.CharField(
@@ -74,6 +91,11 @@ class User(AbstractUser):
     
     class Meta:
         db_table = 'users'
+        indexes = [
+            models.Index(fields=['role', 'id']),
+            # Case-insensitive duplicate checks (backend.customer_import)
+            models.Index(Lower('email'), name='users_email_lower'),
+        ]
     
     def __str__(self):
         return f"{self.email} ({self.role})"
@@ -83,16 +105,4 @@ class User(AbstractUser):
             self.role = UserRole.SUPER_ADMIN
         elif self.is_staff and self.role == UserRole.CUSTOMER:
             self.role = UserRole.EMPLOYEE
-        super().save(*args, **kwargs)
-    
-    def is_customer(self):
-        return self.role == UserRole.CUSTOMER
-    
-    def is_employee(self):
-        return self.role in [UserRole.EMPLOYEE, UserRole.ADMIN, UserRole.SUPER_ADMIN]
-    
-    def is_admin(self):
-        return self.role in [UserRole.ADMIN, UserRole.SUPER_ADMIN]
-    
-    def is_super_admin(self):
-        return self.role == UserRole.SUPER_ADMIN
\ No newline at end of file
+        super().save(*args, **kwargs)
\ No newline at end of file
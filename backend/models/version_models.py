@@ -0,0 +1,21 @@
+"""backend.models.version_models
+
+Per-collection version stamps. One row per collection name (e.g.
+`boxes`, `customers`, `user:42`) is bumped whenever data served by the
+matching endpoint changes, so views can answer conditional GETs from a
+single indexed read. Maintained by `backend.versions`.
+"""
+
+from django.db import models
+
+class CollectionVersion(models.Model):
+    """Version counter and last change time of one cached collection"""
+    name = models.CharField(max_length=100, unique=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'collection_versions'
+    
+    def __str__(self):
+        return f"{self.name} v{self.version}"
@@ -0,0 +1,284 @@
+"""backend.notifications
+
+Customer notifications through a transactional outbox.
+
+Status changes insert `Notification` rows in the transaction that makes
+the change (`enqueue` from `backend.transitions`, the box cascade,
+`backend.scans` and `backend.packing`), so a notification exists exactly
+when its change commits. Nothing is sent from the request path: the
+`send_notifications` worker calls `deliver_pending()`, which
+
+1. claims a batch of pending rows in a short transaction: `SELECT ...
+   FOR UPDATE SKIP LOCKED` (several workers can run side by side), then
+   stamps them with a `claimed_at` lease and commits,
+2. groups them per user into one digest per channel,
+3. honours the user's `email_notifications` / `sms_notifications`
+   preferences, and defers delivery until the end of `QUIET_HOURS` in
+   the user's `timezone`,
+4. sends through the configured email and SMS backends outside any
+   transaction -- no row locks are held while SMTP or the SMS provider
+   is slow -- and records each user's outcome with its own small UPDATE,
+   releasing the lease; failures are retried with backoff up to
+   `MAX_ATTEMPTS`.
+
+Rows whose worker dies mid-batch are claimable again once their lease is
+older than `LEASE_SECONDS`, so delivery is at-least-once: a worker killed
+between sending and recording the outcome sends that digest again.
+
+Rows younger than `DIGEST_SECONDS` are left for the next pass so bursts
+(a box cascade, a scan batch) reach the customer as one digest.
+
+Email goes through Django's mail framework with `EMAIL_BACKEND` (the
+file-based backend or an SMTP debug server locally). SMS backends are
+classes with `send_messages(messages)`; `FileSMSBackend` and
+`ConsoleSMSBackend` are local stand-ins for a real provider.
+"""
+
+import logging
+import os
+import sys
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from backend.models import DomesticOrder, InternationalOrder, Item, Notification, User
+from backend.models.enums import DomesticOrderStatus, EntityType, ItemStatus, SourceOrderStatus
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'SMS_BACKEND': 'backend.notifications.FileSMSBackend',
+    'SMS_FILE_PATH': 'sent_sms',
+    'FROM_EMAIL': None,
+    # Local hours (start, end) during which nothing is sent; equal values disable it.
+    'QUIET_HOURS': (22, 7),
+    'DIGEST_SECONDS': 60,
+    'DIGEST_MAX_LINES': 20,
+    'BATCH_SIZE': 500,
+    'MAX_ATTEMPTS': 5,
+    # How long a claimed batch is reserved for its worker; keep it well
+    # above the time one batch takes to send.
+    'LEASE_SECONDS': 300,
+}
+
+# model -> (entity type, noun, field shown to the customer, status choices)
+NOTIFIED_MODELS = {
+    Item: (EntityType.ITEM, 'Item', 'tracking_number', ItemStatus),
+    InternationalOrder: (EntityType.ORDER, 'Order', 'marketplace_order_ref', SourceOrderStatus),
+    DomesticOrder: (EntityType.DOMESTIC_ORDER, 'Delivery', 'id', DomesticOrderStatus),
+}
+
+SMSMessage = namedtuple('SMSMessage', ['to', 'body'])
+
+
+def notification_settings():
+    return {**DEFAULTS, **getattr(settings, 'NOTIFICATIONS', {})}
+
+
+# Enqueueing -------------------------------------------------------------------
+
+def notification_for(model, pk, user_id, reference, status):
+    """Unsaved `Notification` telling `user_id` that a `model` row moved to `status`."""
+    entity_type, noun, _, choices = NOTIFIED_MODELS[model]
+    label = dict(choices.choices).get(status, status)
+    return Notification(
+        user_id=user_id, entity_type=entity_type, entity_id=str(pk), status=status,
+        message=f'{noun} {reference or pk} is now {label}'[:255],
+    )
+
+
+def enqueue(model, pks, status):
+    """Queue notifications for the owners of `pks`; call inside the changing transaction."""
+    if model not in NOTIFIED_MODELS or not pks:
+        return
+    reference_field = NOTIFIED_MODELS[model][2]
+    batch_size = 2000
+    for start in range(0, len(pks), batch_size):
+        owners = model.objects.filter(pk__in=pks[start:start + batch_size]).values_list(
+            'pk', 'customer_id', reference_field,
+        )
+        Notification.objects.bulk_create(
+            [notification_for(model, pk, user_id, reference, status) for pk, user_id, reference in owners],
+            batch_size=1000,
+        )
+
+
+# Backends ---------------------------------------------------------------------
+
+class BaseSMSBackend:
+    """Sends `SMSMessage`s; subclasses implement `send_messages`."""
+
+    def __init__(self, options):
+        self.options = options
+
+    def send_messages(self, messages):
+        raise NotImplementedError
+
+
+class FileSMSBackend(BaseSMSBackend):
+    """Appends messages to one file per day under `SMS_FILE_PATH`."""
+
+    def send_messages(self, messages):
+        os.makedirs(self.options['SMS_FILE_PATH'], exist_ok=True)
+        path = os.path.join(self.options['SMS_FILE_PATH'], f'{timezone.now():%Y%m%d}.log')
+        with open(path, 'a', encoding='utf-8') as out:
+            for message in messages:
+                out.write(f'To: {message.to}\n{message.body}\n{"-" * 40}\n')
+        return len(messages)
+
+
+class ConsoleSMSBackend(BaseSMSBackend):
+    """Writes messages to stdout."""
+
+    def send_messages(self, messages):
+        for message in messages:
+            sys.stdout.write(f'SMS to {message.to}: {message.body}\n')
+        return len(messages)
+
+
+# Delivery ---------------------------------------------------------------------
+
+def _user_timezone(name):
+    try:
+        return ZoneInfo(name or 'UTC')
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo('UTC')
+
+
+def quiet_until(now, tz_name, quiet_hours):
+    """End of the quiet period containing `now` in `tz_name`, or None if not quiet."""
+    start, end = quiet_hours
+    if start == end:
+        return None
+    local = now.astimezone(_user_timezone(tz_name))
+    hour = local.hour
+    quiet = (hour >= start or hour < end) if start > end else (start <= hour < end)
+    if not quiet:
+        return None
+    until = local.replace(hour=end, minute=0, second=0, microsecond=0)
+    if until <= local:
+        until += timedelta(days=1)
+    return until
+
+
+def _digest(notifications, max_lines):
+    lines = [notification.message for notification in notifications[:max_lines]]
+    if len(notifications) > max_lines:
+        lines.append(f'...and {len(notifications) - max_lines} more.')
+    if len(notifications) == 1:
+        return 'Shipment update', lines[0]
+    return f'{len(notifications)} shipment updates', '\n'.join(lines)
+
+
+def _send(user, channels, notifications, options, email_connection, sms_backend):
+    subject, body = _digest(notifications, options['DIGEST_MAX_LINES'])
+    if 'email' in channels:
+        EmailMessage(
+            subject, body, options['FROM_EMAIL'] or settings.DEFAULT_FROM_EMAIL, [user.email],
+            connection=email_connection,
+        ).send()
+    if 'sms' in channels:
+        sms_backend.send_messages([SMSMessage(user.phone, f'{subject}: {body}' if len(notifications) > 1 else body)])
+
+
+def _claim(now, options, batch_size):
+    """Lease a batch of due notifications to this worker and commit the lease."""
+    lease_expired = now - timedelta(seconds=options['LEASE_SECONDS'])
+    with transaction.atomic():
+        pending = list(
+            Notification.objects.filter(
+                Q(deliver_after__isnull=True) | Q(deliver_after__lte=now),
+                Q(claimed_at__isnull=True) | Q(claimed_at__lt=lease_expired),
+                sent_at__isnull=True,
+                created_at__lte=now - timedelta(seconds=options['DIGEST_SECONDS']),
+            ).order_by('id').select_for_update(skip_locked=True)[:batch_size or options['BATCH_SIZE']]
+        )
+        if pending:
+            Notification.objects.filter(pk__in=[notification.pk for notification in pending]).update(
+                claimed_at=now,
+            )
+    for notification in pending:
+        notification.claimed_at = now
+    return pending
+
+
+def _record(notifications, **fields):
+    """Store the outcome of `notifications` and release their lease.
+
+    Rows whose lease expired and was taken by another worker are left alone.
+    """
+    Notification.objects.filter(
+        pk__in=[notification.pk for notification in notifications],
+        claimed_at=notifications[0].claimed_at,
+    ).update(claimed_at=None, **fields)
+
+
+def _record_failure(notifications, now, options):
+    for notification in notifications:
+        notification.attempts += 1
+        notification.claimed_at = None
+        if notification.attempts >= options['MAX_ATTEMPTS']:
+            notification.sent_at = now
+            notification.channels = 'failed'
+        else:
+            notification.deliver_after = now + timedelta(minutes=2 ** notification.attempts)
+    Notification.objects.bulk_update(
+        notifications, ['sent_at', 'deliver_after', 'channels', 'attempts', 'claimed_at'],
+    )
+
+
+def deliver_pending(batch_size=None):
+    """Deliver one batch of pending notifications; returns counts per outcome."""
+    options = notification_settings()
+    now = timezone.now()
+    stats = {'claimed': 0, 'sent': 0, 'skipped': 0, 'deferred': 0, 'failed': 0}
+    pending = _claim(now, options, batch_size)
+    if not pending:
+        return stats
+    stats['claimed'] = len(pending)
+    by_user = defaultdict(list)
+    for notification in pending:
+        by_user[notification.user_id].append(notification)
+    users = User.objects.only(
+        'email', 'phone', 'is_active', 'email_notifications', 'sms_notifications', 'timezone',
+    ).in_bulk(by_user)
+
+    sms_backend = import_string(options['SMS_BACKEND'])(options)
+    with get_connection() as email_connection:
+        for user_id, notifications in by_user.items():
+            user = users.get(user_id)
+            channels = []
+            if user is not None and user.is_active:
+                if user.email_notifications and user.email:
+                    channels.append('email')
+                if user.sms_notifications and user.phone:
+                    channels.append('sms')
+            if not channels:
+                # Inbox only.
+                _record(notifications, sent_at=now)
+                stats['skipped'] += len(notifications)
+                continue
+
+            until = quiet_until(now, user.timezone, options['QUIET_HOURS'])
+            if until is not None:
+                _record(notifications, deliver_after=until)
+                stats['deferred'] += len(notifications)
+                continue
+
+            try:
+                _send(user, channels, notifications, options, email_connection, sms_backend)
+            except Exception:
+                logger.exception('Sending %d notification(s) to user %s failed', len(notifications), user_id)
+                _record_failure(notifications, now, options)
+                stats['failed'] += len(notifications)
+                continue
+            _record(notifications, sent_at=now, channels=','.join(channels))
+            stats['sent'] += len(notifications)
+    return stats
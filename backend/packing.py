@@ -0,0 +1,264 @@
+"""backend.packing
+
+Box-packing planner for validated items waiting in a warehouse.
+
+Candidates are grouped by destination country (the customer's country)
+and, within a destination, by customer so one customer's consolidation
+travels in as few boxes as possible. Each customer's items form a
+packing unit (split only when it cannot fit a single box) and units are
+placed with best-fit decreasing: heaviest first, into the open box whose
+remaining weight capacity is the smallest that still fits. Open boxes
+are kept sorted by remaining capacity, so each placement is a binary
+search rather than a scan over every box.
+
+`plan_warehouse` proposes boxes without writing anything; `apply_plan`
+creates the `InternationalBox` and `BoxItem` rows in bulk.
+"""
+
+import uuid
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from backend import live, lookup, notifications
+from backend.counters import apply_deltas
+from backend.models import BoxItem, InternationalBox, Item, StatusLog
+from backend.models.enums import BoxStatus, CounterEntity, EntityType, ItemStatus
+from backend.versions import BOXES, bump
+
+DEFAULT_MAX_WEIGHT_KG = 30.0
+DEFAULT_MAX_ITEMS = 50
+
+
+class StalePlanError(Exception):
+    """Raised by `apply_plan` when planned items are no longer packable."""
+
+    def __init__(self, item_ids):
+        self.item_ids = sorted(item_ids)
+        super().__init__(f'{len(self.item_ids)} planned item(s) are no longer available')
+
+
+class _Box:
+    __slots__ = ('weight', 'item_ids', 'customers')
+
+    def __init__(self):
+        self.weight = 0.0
+        self.item_ids = []
+        self.customers = set()
+
+
+def _split_unit(items, max_weight, max_items):
+    """Split one customer's items into chunks that each fit in a box.
+
+    `items` is a list of `(weight, item_id)` sorted heaviest first; items
+    heavier than a whole box are returned separately as unplaceable.
+    Items go best-fit into the open chunks, found by binary search as in
+    `_pack_destination`.
+    """
+    chunks = []
+    oversize = []
+    # (remaining capacity, chunk index) of chunks with room, sorted for bisect.
+    open_chunks = []
+    for weight, item_id in items:
+        if weight > max_weight:
+            oversize.append(item_id)
+            continue
+        position = bisect_left(open_chunks, (weight - 1e-9, -1))
+        if position < len(open_chunks):
+            _, index = open_chunks.pop(position)
+        else:
+            index = len(chunks)
+            chunks.append([0.0, []])
+        chunk = chunks[index]
+        chunk[0] += weight
+        chunk[1].append(item_id)
+        if len(chunk[1]) < max_items:
+            insort(open_chunks, (max_weight - chunk[0], index))
+    return chunks, oversize
+
+
+def _pack_destination(units, max_weight, max_items):
+    """Best-fit decreasing over `(weight, customer_id, item_ids)` units."""
+    boxes = []
+    # (remaining capacity, box index), sorted ascending for bisect.
+    open_boxes = []
+    for weight, customer_id, item_ids in sorted(units, key=lambda unit: -unit[0]):
+        position = bisect_left(open_boxes, (weight - 1e-9, -1))
+        target = None
+        while position < len(open_boxes):
+            remaining, index = open_boxes[position]
+            if len(boxes[index].item_ids) + len(item_ids) <= max_items:
+                target = index
+                del open_boxes[position]
+                break
+            position += 1
+        if target is None:
+            target = len(boxes)
+            boxes.append(_Box())
+        box = boxes[target]
+        box.weight += weight
+        box.item_ids.extend(item_ids)
+        box.customers.add(customer_id)
+        remaining = max_weight - box.weight
+        if remaining > 0 and len(box.item_ids) < max_items:
+            insort(open_boxes, (remaining, target))
+    return boxes
+
+
+def pack_items(candidates, max_weight=DEFAULT_MAX_WEIGHT_KG, max_items=DEFAULT_MAX_ITEMS):
+    """Pack `(item_id, customer_id, destination, weight_kg)` tuples into boxes.
+
+    Missing weights count as zero. Returns `(boxes, unassigned_ids)` where
+    each box is a dict with `destination_country`, `total_weight_kg`,
+    `items_count`, `customer_ids` and `item_ids`.
+    """
+    by_destination = defaultdict(lambda: defaultdict(list))
+    for item_id, customer_id, destination, weight in candidates:
+        by_destination[destination][customer_id].append((weight or 0.0, item_id))
+
+    planned = []
+    unassigned = []
+    for destination, customers in by_destination.items():
+        units = []
+        for customer_id, items in customers.items():
+            items.sort(reverse=True)
+            total = sum(weight for weight, _ in items)
+            if total <= max_weight and len(items) <= max_items:
+                units.append((total, customer_id, [item_id for _, item_id in items]))
+                continue
+            chunks, oversize = _split_unit(items, max_weight, max_items)
+            unassigned.extend(oversize)
+            units.extend((weight, customer_id, item_ids) for weight, item_ids in chunks)
+
+        for box in _pack_destination(units, max_weight, max_items):
+            planned.append({
+                'destination_country': destination,
+                'total_weight_kg': round(box.weight, 3),
+                'items_count': len(box.item_ids),
+                'customer_ids': sorted(box.customers),
+                'item_ids': box.item_ids,
+            })
+    return planned, unassigned
+
+
+def packable_items(warehouse):
+    """Validated items stored at `warehouse` that are not in any box yet."""
+    return Item.objects.filter(
+        status=ItemStatus.VALIDATED,
+        locker__warehouse=warehouse,
+        boxitem__isnull=True,
+    )
+
+
+def plan_warehouse(warehouse, max_weight=DEFAULT_MAX_WEIGHT_KG, max_items=DEFAULT_MAX_ITEMS):
+    """Propose box assignments for every packable item in `warehouse`."""
+    candidates = packable_items(warehouse).values_list(
+        'id', 'customer_id', 'customer__country', 'weight_kg',
+    )
+    boxes, unassigned = pack_items(candidates.iterator(chunk_size=5000), max_weight, max_items)
+    return {
+        'warehouse': warehouse.id,
+        'max_weight_kg': max_weight,
+        'max_items': max_items,
+        'boxes': boxes,
+        'unassigned_item_ids': unassigned,
+    }
+
+
+def _box_number():
+    return f"BOX-{timezone.now():%Y%m%d}-{uuid.uuid4().hex[:8].upper()}"
+
+
+def apply_plan(warehouse, planned_boxes, user=None,
+               max_weight=DEFAULT_MAX_WEIGHT_KG, max_items=DEFAULT_MAX_ITEMS):
+    """Create boxes and `BoxItem` rows for a (possibly edited) plan.
+
+    `planned_boxes` is a list of `{'destination_country', 'item_ids'}`.
+    Every item must still be validated, stored at `warehouse` and unboxed,
+    otherwise `StalePlanError` is raised and nothing is written; an item
+    whose customer lives outside its box's destination, or a box over
+    `max_weight` kg or `max_items` items, raises `ValueError`.
+    Items move to `in_box`; boxes start in `building`.
+    """
+    item_ids = [item_id for box in planned_boxes for item_id in box['item_ids']]
+    if len(item_ids) != len(set(item_ids)):
+        raise ValueError('An item appears in more than one planned box')
+
+    user_id = getattr(user, 'pk', None)
+    with transaction.atomic():
+        rows = (
+            packable_items(warehouse)
+            .filter(id__in=item_ids)
+            .select_for_update(of=('self',))
+            .values_list('id', 'weight_kg', 'customer__country')
+        )
+        weights = {}
+        destinations = {}
+        for item_id, weight, destination in rows:
+            weights[item_id] = weight
+            destinations[item_id] = destination
+        stale = set(item_ids) - set(weights)
+        if stale:
+            raise StalePlanError(stale)
+        misrouted = sorted(
+            item_id
+            for planned in planned_boxes
+            for item_id in planned['item_ids']
+            if destinations[item_id] != planned['destination_country']
+        )
+        if misrouted:
+            raise ValueError(f'Items {misrouted} are not bound for their box destination')
+        for number, planned in enumerate(planned_boxes, 1):
+            weight = sum(weights[item_id] or 0.0 for item_id in planned['item_ids'])
+            if len(planned['item_ids']) > max_items or weight > max_weight + 1e-9:
+                raise ValueError(
+                    f'Box {number} holds {len(planned["item_ids"])} item(s) weighing {weight:.3f} kg; '
+                    f'the limit is {max_items} item(s) and {max_weight} kg'
+                )
+
+        boxes = InternationalBox.objects.bulk_create([
+            InternationalBox(
+                box_number=_box_number(),
+                status=BoxStatus.BUILDING,
+                origin_country=warehouse.country,
+                destination_country=planned['destination_country'],
+                total_weight_kg=sum(weights[item_id] or 0.0 for item_id in planned['item_ids']),
+                items_count=len(planned['item_ids']),
+                warehouse=warehouse,
+            )
+            for planned in planned_boxes
+        ])
+        BoxItem.objects.bulk_create([
+            BoxItem(box=box, item_id=item_id, added_by_id=user_id)
+            for box, planned in zip(boxes, planned_boxes)
+            for item_id in planned['item_ids']
+        ], batch_size=2000)
+        Item.objects.filter(id__in=item_ids).update(status=ItemStatus.IN_BOX)
+        notifications.enqueue(Item, item_ids, ItemStatus.IN_BOX)
+        bump(BOXES)
+        StatusLog.objects.bulk_create(
+            [
+                StatusLog(entity_type=EntityType.BOX, entity_id=str(box.id),
+                          status=BoxStatus.BUILDING, note='Created by packing plan',
+                          changed_by_id=user_id)
+                for box in boxes
+            ] + [
+                StatusLog(entity_type=EntityType.ITEM, entity_id=str(item_id),
+                          status=ItemStatus.IN_BOX, note=f'Packed into {box.box_number}',
+                          changed_by_id=user_id)
+                for box, planned in zip(boxes, planned_boxes)
+                for item_id in planned['item_ids']
+            ],
+            batch_size=2000,
+        )
+        apply_deltas(CounterEntity.ITEM, Counter({
+            ItemStatus.VALIDATED: -len(item_ids),
+            ItemStatus.IN_BOX: len(item_ids),
+        }))
+        apply_deltas(CounterEntity.BOX, {BoxStatus.BUILDING: len(boxes)})
+        live.publish_status(Item, item_ids, ItemStatus.IN_BOX)
+        live.publish_status(InternationalBox, [box.id for box in boxes], BoxStatus.BUILDING)
+    lookup.invalidate('item', item_ids)
+    return boxes
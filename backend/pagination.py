@@ -0,0 +1,67 @@
+"""backend.pagination
+
+Keyset (cursor) pagination used by the list endpoints in
+`backend.views.api_views`. Pages are addressed by an opaque cursor that
+encodes the position of the last row seen, so fetching page N costs the
+same as fetching page 1 and rows inserted while a client is paging do
+not shift or duplicate results.
+"""
+
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+class IdCursorPagination(CursorPagination):
+    """Cursor pagination over the primary key, newest rows first.
+
+    The primary key is unique and never changes, which gives the stable,
+    total ordering keyset pagination needs. Clients follow the `next` and
+    `previous` links returned with every page.
+    """
+    ordering = '-id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """`paginate_queryset` for async views; the page is read with the async ORM.
+
+        Mirrors DRF's implementation step for step, so cursors and links
+        are interchangeable with the sync path.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, current_position = self.cursor or (0, False, None)
+
+        queryset = queryset.order_by(*(_reverse_ordering(self.ordering) if reverse else self.ordering))
+        if current_position is not None:
+            order = self.ordering[0]
+            lookup = 'lt' if self.cursor.reverse != order.startswith('-') else 'gt'
+            queryset = queryset.filter(**{f"{order.lstrip('-')}__{lookup}": current_position})
+
+        # One extra row tells whether a following page exists.
+        results = [row async for row in queryset[offset:offset + self.page_size + 1]]
+        self.page = results[:self.page_size]
+        has_following_position = len(results) > len(self.page)
+        following_position = (
+            self._get_position_from_instance(results[-1], self.ordering) if has_following_position else None
+        )
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None or offset > 0
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+        return self.page
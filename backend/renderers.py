@@ -0,0 +1,54 @@
+"""backend.renderers
+
+`ORJSONRenderer`: a drop-in for DRF's `JSONRenderer` that encodes with
+orjson when it is installed.
+
+The output is byte-for-byte what `JSONRenderer` produces with the default
+`COMPACT_JSON` / `UNICODE_JSON` settings: dates, times, decimals and
+other non-native values still go through DRF's `JSONEncoder`, and
+U+2028/U+2029 are escaped the same way. orjson spells floats below 1e-4
+or from 1e16 up differently from `repr()` (`1e16` vs `1e+16`), so output
+that may contain such a number is re-rendered with `JSONRenderer` (the
+check is a byte scan; a false match only costs the fallback). Indented
+output (the browsable API, `; indent=` in `Accept`), non-default JSON
+settings, values orjson cannot encode and a missing orjson also fall
+back to `JSONRenderer`.
+"""
+
+import re
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+# Float spellings where orjson and `repr()` disagree (`1e16`, `0.00001`).
+_FLOAT_MISMATCH = re.compile(rb'\de[-\d]|0\.0000')
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSON renderer backed by orjson, falling back to the stdlib encoder."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or not api_settings.COMPACT_JSON
+            or not api_settings.UNICODE_JSON
+            or self.get_indent(accepted_media_type or '', renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except (orjson.JSONEncodeError, TypeError):
+            return super().render(data, accepted_media_type, renderer_context)
+        if _FLOAT_MISMATCH.search(ret):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping as JSONRenderer, for JavaScript that embeds the output.
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
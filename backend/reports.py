@@ -0,0 +1,314 @@
+"""backend.reports
+
+Daily reporting rollups built incrementally from `StatusLog`.
+
+Every status change already lands in `StatusLog`, so the rollups are
+derived from it: `update_rollups()` folds the log rows after
+`RollupProgress.last_log_id` into `DailyRollup` rows keyed by (day,
+warehouse, metric, dimension) and advances the high-water mark in the
+same transaction. Catching up costs only the new rows; `rebuild()` (the
+`backfill_rollups` command) replays the whole log.
+
+Metrics (see `RollupMetric`), attributed to the local day of the event:
+
+* arrivals -- an item's intake scan (first move out of
+  `awaiting_arrival`), also split by category and country of origin;
+* shipments -- a box moving to `shipped`; `total` is its weight in kg;
+* deliveries -- an item moving to `delivered`;
+* orders -- a marketplace order being placed, per marketplace; `total`
+  is the order value;
+* dwell -- time an entity spent in a status, recorded when it leaves
+  it; the dimension is `entity_type:status`, `total` is seconds.
+
+Warehouse, category, weight and order values are read from the entities
+when their events are folded in, not from a historical snapshot.
+
+Log ids are assigned before commit, so a transaction still writing could
+commit ids below ones already visible. Only rows older than
+`SETTLE_SECONDS` are folded, and folding stops at the first younger row.
+
+`report()` answers a date range (optionally one warehouse) from the
+rollups alone; its cost depends on the range (at most `MAX_RANGE_DAYS`),
+not on history size.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Sum, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from backend.models import DailyRollup, InternationalBox, InternationalOrder, Item, RollupProgress, StatusLog
+from backend.models.enums import BoxStatus, EntityType, ItemStatus, RollupMetric, SourceOrderStatus
+
+DAILY = 'daily'
+
+DEFAULTS = {
+    'BATCH_SIZE': 10000,
+    'SETTLE_SECONDS': 30,
+    # Fold at most one batch before answering a report request.
+    'REFRESH_ON_READ': True,
+    # Longest range `report()` answers; its daily series is built per day.
+    'MAX_RANGE_DAYS': 731,
+}
+
+INTAKE_STATUSES = {ItemStatus.ARRIVED_WAREHOUSE, ItemStatus.MISMATCHED}
+
+
+def report_settings():
+    return {**DEFAULTS, **getattr(settings, 'REPORTS', {})}
+
+
+# Building ---------------------------------------------------------------------
+
+def _entity_attributes(refs):
+    """`{(entity_type, entity_id): {...}}` for the entities in `refs`."""
+    ids = defaultdict(list)
+    for entity_type, entity_id in refs:
+        if entity_id.isdigit():
+            ids[entity_type].append(int(entity_id))
+
+    attributes = {}
+    for pk, warehouse, category, origin in Item.objects.filter(
+        id__in=ids[EntityType.ITEM],
+    ).values_list('id', 'locker__warehouse_id', 'category', 'country_origin'):
+        attributes[(EntityType.ITEM, str(pk))] = {
+            'warehouse': warehouse, 'category': category or '', 'origin': origin or '',
+        }
+    for pk, warehouse, weight in InternationalBox.objects.filter(
+        id__in=ids[EntityType.BOX],
+    ).values_list('id', 'warehouse_id', 'total_weight_kg'):
+        attributes[(EntityType.BOX, str(pk))] = {'warehouse': warehouse, 'weight': weight or 0.0}
+    for pk, marketplace, amount in InternationalOrder.objects.filter(
+        id__in=ids[EntityType.ORDER],
+    ).values_list('id', 'marketplace', 'total_amount'):
+        attributes[(EntityType.ORDER, str(pk))] = {
+            'warehouse': None, 'marketplace': marketplace, 'amount': float(amount or 0),
+        }
+    return attributes
+
+
+def _refs_filter(refs):
+    by_type = defaultdict(list)
+    for entity_type, entity_id in refs:
+        by_type[entity_type].append(entity_id)
+    condition = Q()
+    for entity_type, entity_ids in by_type.items():
+        condition |= Q(entity_type=entity_type, entity_id__in=entity_ids)
+    return condition
+
+
+def _previous_events(refs, last_log_id):
+    """Latest already-folded event of each entity: `{ref: (status, created_at)}`."""
+    if not refs or not last_log_id:
+        return {}
+    latest = StatusLog.objects.filter(_refs_filter(refs), id__lte=last_log_id).annotate(
+        position=Window(
+            RowNumber(),
+            partition_by=[F('entity_type'), F('entity_id')],
+            order_by=[F('created_at').desc(), F('id').desc()],
+        ),
+    ).filter(position=1).values_list('entity_type', 'entity_id', 'status', 'created_at')
+    return {(entity_type, entity_id): (status, at) for entity_type, entity_id, status, at in latest}
+
+
+def _fold(logs, previous, attributes):
+    """Aggregate log rows into `{(day, warehouse, metric, dimension): [count, total]}`."""
+    buckets = defaultdict(lambda: [0, 0.0])
+
+    def add(day, warehouse, metric, dimension='', total=0.0):
+        bucket = buckets[(day, warehouse, metric, dimension)]
+        bucket[0] += 1
+        bucket[1] += total
+
+    for _, entity_type, entity_id, status, created_at in logs:
+        ref = (entity_type, entity_id)
+        entity = attributes.get(ref, {})
+        warehouse = entity.get('warehouse')
+        day = timezone.localdate(created_at)
+        before = previous.get(ref)
+        if before is not None and before[0] == status:
+            continue
+        if before is not None:
+            seconds = max((created_at - before[1]).total_seconds(), 0.0)
+            add(day, warehouse, RollupMetric.DWELL, f'{entity_type}:{before[0]}', seconds)
+        previous[ref] = (status, created_at)
+
+        if entity_type == EntityType.ITEM:
+            if status in INTAKE_STATUSES and (before is None or before[0] == ItemStatus.AWAITING_ARRIVAL):
+                add(day, warehouse, RollupMetric.ARRIVALS)
+                add(day, warehouse, RollupMetric.ARRIVALS_BY_CATEGORY, entity.get('category', ''))
+                add(day, warehouse, RollupMetric.ARRIVALS_BY_ORIGIN, entity.get('origin', ''))
+            elif status == ItemStatus.DELIVERED:
+                add(day, warehouse, RollupMetric.DELIVERIES)
+        elif entity_type == EntityType.BOX and status == BoxStatus.SHIPPED:
+            add(day, warehouse, RollupMetric.SHIPMENTS, total=entity.get('weight', 0.0))
+        elif entity_type == EntityType.ORDER and status == SourceOrderStatus.PLACED and entity:
+            add(day, None, RollupMetric.ORDERS, entity['marketplace'], entity['amount'])
+    return buckets
+
+
+def _store(buckets):
+    """Add `buckets` onto the rollup rows: one read, one bulk update, one bulk insert."""
+    if not buckets:
+        return
+    days = {day for day, _, _, _ in buckets}
+    existing = {
+        (rollup.day, rollup.warehouse_id, rollup.metric, rollup.dimension): rollup
+        for rollup in DailyRollup.objects.filter(day__in=days)
+    }
+    changed = []
+    created = []
+    for (day, warehouse, metric, dimension), (count, total) in buckets.items():
+        rollup = existing.get((day, warehouse, metric, dimension))
+        if rollup is None:
+            created.append(DailyRollup(
+                day=day, warehouse_id=warehouse, metric=metric, dimension=dimension,
+                count=count, total=total,
+            ))
+        else:
+            rollup.count += count
+            rollup.total += total
+            changed.append(rollup)
+    DailyRollup.objects.bulk_update(changed, ['count', 'total'], batch_size=1000)
+    DailyRollup.objects.bulk_create(created, batch_size=1000)
+
+
+def update_rollups(max_batches=None, wait=True):
+    """Fold new `StatusLog` rows into the rollups; returns how many were folded.
+
+    Each batch runs in its own transaction holding the progress row lock,
+    so concurrent callers never fold the same rows twice. With
+    `wait=False` a caller that finds the lock taken returns at once.
+    """
+    options = report_settings()
+    RollupProgress.objects.get_or_create(name=DAILY)
+    folded = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        batches += 1
+        with transaction.atomic():
+            progress = (
+                RollupProgress.objects.select_for_update(skip_locked=not wait)
+                .filter(name=DAILY).first()
+            )
+            if progress is None:
+                break
+            settled = timezone.now() - timedelta(seconds=options['SETTLE_SECONDS'])
+            logs = list(
+                StatusLog.objects.filter(id__gt=progress.last_log_id).order_by('id')
+                .values_list('id', 'entity_type', 'entity_id', 'status', 'created_at')
+                [:options['BATCH_SIZE']]
+            )
+            fetched = len(logs)
+            for index, log in enumerate(logs):
+                if log[4] >= settled:
+                    del logs[index:]
+                    break
+            if not logs:
+                break
+            refs = {(entity_type, entity_id) for _, entity_type, entity_id, _, _ in logs}
+            previous = _previous_events(refs, progress.last_log_id)
+            _store(_fold(logs, previous, _entity_attributes(refs)))
+            progress.last_log_id = logs[-1][0]
+            progress.save(update_fields=['last_log_id', 'updated_at'])
+        folded += len(logs)
+        if len(logs) < fetched or fetched < options['BATCH_SIZE']:
+            break
+    return folded
+
+
+def rebuild():
+    """Drop every rollup and replay the whole `StatusLog`; returns rows folded.
+
+    Reports read partial totals until the replay finishes.
+    """
+    RollupProgress.objects.get_or_create(name=DAILY)
+    with transaction.atomic():
+        RollupProgress.objects.select_for_update().filter(name=DAILY).update(last_log_id=0)
+        DailyRollup.objects.all().delete()
+    return update_rollups()
+
+
+# Reading ----------------------------------------------------------------------
+
+def report(start, end, warehouse=None, using=None):
+    """Totals, daily series and breakdowns for `start`..`end` (inclusive dates).
+
+    `using` reads the rollups from another database alias, e.g. a replica.
+    """
+    if end < start:
+        raise ValueError('end must not be before start')
+    max_days = report_settings()['MAX_RANGE_DAYS']
+    if (end - start).days >= max_days:
+        raise ValueError(f'date range must not exceed {max_days} days')
+    rollups = DailyRollup.objects.using(using).filter(day__range=(start, end))
+    if warehouse is not None:
+        rollups = rollups.filter(warehouse_id=warehouse)
+    rows = (
+        rollups.order_by().values('day', 'metric', 'dimension')
+        .annotate(events=Sum('count'), amount=Sum('total'))
+    )
+
+    daily = {}
+    day = start
+    while day <= end:
+        daily[day] = {
+            'day': day.isoformat(), 'arrivals': 0, 'shipments': 0,
+            'weight_shipped_kg': 0.0, 'deliveries': 0,
+        }
+        day += timedelta(days=1)
+    by_category = defaultdict(int)
+    by_origin = defaultdict(int)
+    orders = defaultdict(lambda: {'orders': 0, 'value': 0.0})
+    dwell = defaultdict(lambda: [0, 0.0])
+
+    for row in rows:
+        metric, dimension, events, amount = row['metric'], row['dimension'], row['events'], row['amount']
+        entry = daily[row['day']]
+        if metric == RollupMetric.ARRIVALS:
+            entry['arrivals'] += events
+        elif metric == RollupMetric.SHIPMENTS:
+            entry['shipments'] += events
+            entry['weight_shipped_kg'] += amount
+        elif metric == RollupMetric.DELIVERIES:
+            entry['deliveries'] += events
+        elif metric == RollupMetric.ARRIVALS_BY_CATEGORY:
+            by_category[dimension] += events
+        elif metric == RollupMetric.ARRIVALS_BY_ORIGIN:
+            by_origin[dimension] += events
+        elif metric == RollupMetric.ORDERS:
+            orders[dimension]['orders'] += events
+            orders[dimension]['value'] += amount
+        elif metric == RollupMetric.DWELL:
+            dwell[dimension][0] += events
+            dwell[dimension][1] += amount
+
+    series = list(daily.values())
+    for entry in series:
+        entry['weight_shipped_kg'] = round(entry['weight_shipped_kg'], 3)
+    totals = {
+        key: sum(entry[key] for entry in series)
+        for key in ('arrivals', 'shipments', 'weight_shipped_kg', 'deliveries')
+    }
+    totals['weight_shipped_kg'] = round(totals['weight_shipped_kg'], 3)
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'warehouse': warehouse,
+        'totals': totals,
+        'daily': series,
+        'items_by_category': dict(by_category),
+        'items_by_origin': dict(by_origin),
+        'order_value_by_marketplace': {
+            marketplace: {'orders': values['orders'], 'value': round(values['value'], 2)}
+            for marketplace, values in orders.items()
+        },
+        'dwell_hours': {
+            dimension: {'samples': samples, 'avg_hours': round(seconds / samples / 3600, 2)}
+            for dimension, (samples, seconds) in dwell.items()
+        },
+    }
@@ -0,0 +1,129 @@
+"""backend.scans
+
+Batch ingestion of warehouse intake scans.
+
+`ingest_scans` takes hundreds of scanner rows at once, resolves them with
+one `IN` query per lookup table, applies the changes with `bulk_update`
+and writes the audit trail and customer notifications with one
+`bulk_create` each — all in one transaction. Each row gets its own result, so one bad scan is reported
+back to the scanner without failing the rest of the batch.
+"""
+
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+
+from backend import live, lookup
+from backend.notifications import notification_for
+from backend.counters import apply_deltas
+from backend.models import Item, Locker, Notification, StatusLog
+from backend.models.enums import CounterEntity, EntityType, ItemStatus
+
+MAX_BATCH_SIZE = 1000
+
+# Item statuses from which an intake scan is accepted (re-scans included).
+SCANNABLE_STATUSES = {
+    ItemStatus.AWAITING_ARRIVAL,
+    ItemStatus.ARRIVED_WAREHOUSE,
+    ItemStatus.MISMATCHED,
+}
+
+
+def _scan_status(condition):
+    if condition == 'MISMATCHED':
+        return ItemStatus.MISMATCHED
+    return ItemStatus.ARRIVED_WAREHOUSE
+
+
+def ingest_scans(scans, user=None):
+    """Apply a batch of validated scan rows and return per-row results.
+
+    Each scan is a dict with `tracking_number` and optional `weight_kg`,
+    `condition` and `locker_code`. Results keep the input order and look
+    like `{'tracking_number', 'ok', 'status'}` or `{..., 'ok': False,
+    'error'}`.
+    """
+    numbers = [scan['tracking_number'] for scan in scans]
+    codes = {scan['locker_code'] for scan in scans if scan.get('locker_code')}
+    now = timezone.now()
+
+    results = []
+    updated = []
+    logs = []
+    notices = []
+    deltas = Counter()
+    seen = set()
+
+    with transaction.atomic():
+        # Lock in id order so overlapping batches cannot deadlock.
+        items = {
+            item.tracking_number: item
+            for item in Item.objects.select_for_update().filter(tracking_number__in=numbers).order_by('id')
+        }
+        lockers = Locker.objects.in_bulk(codes, field_name='code') if codes else {}
+
+        for scan in scans:
+            number = scan['tracking_number']
+            item = items.get(number)
+            error = None
+            if number in seen:
+                error = 'Duplicate tracking number in batch'
+            elif item is None:
+                error = 'Unknown tracking number'
+            elif item.status not in SCANNABLE_STATUSES:
+                error = f"Item cannot be scanned in status '{item.status}'"
+            locker = None
+            if error is None and scan.get('locker_code'):
+                locker = lockers.get(scan['locker_code'])
+                if locker is None:
+                    error = 'Unknown locker code'
+                elif locker.customer_id != item.customer_id:
+                    error = "Locker does not belong to the item's customer"
+            seen.add(number)
+            if error:
+                results.append({'tracking_number': number, 'ok': False, 'error': error})
+                continue
+
+            previous = item.status
+            condition = scan.get('condition') or item.condition
+            item.condition = condition
+            item.status = _scan_status(condition)
+            item.scanning_date = now
+            if scan.get('weight_kg') is not None:
+                item.weight_kg = scan['weight_kg']
+            if locker is not None:
+                item.locker = locker
+            updated.append(item)
+
+            if item.status != previous:
+                deltas[previous] -= 1
+                deltas[item.status] += 1
+                logs.append(StatusLog(
+                    entity_type=EntityType.ITEM,
+                    entity_id=str(item.id),
+                    status=item.status,
+                    note=f'Intake scan (condition {condition})',
+                    changed_by_id=getattr(user, 'pk', None),
+                ))
+                notices.append(notification_for(Item, item.id, item.customer_id, number, item.status))
+            results.append({'tracking_number': number, 'ok': True, 'status': item.status})
+
+        if updated:
+            Item.objects.bulk_update(
+                updated,
+                ['status', 'condition', 'scanning_date', 'weight_kg', 'locker'],
+                batch_size=500,
+            )
+        if logs:
+            StatusLog.objects.bulk_create(logs)
+            Notification.objects.bulk_create(notices)
+        apply_deltas(CounterEntity.ITEM, deltas)
+        moved = {}
+        for log in logs:
+            moved.setdefault(log.status, []).append(int(log.entity_id))
+        for status, item_ids in moved.items():
+            live.publish_status(Item, item_ids, status)
+
+    lookup.invalidate('item', [item.pk for item in updated])
+    return results
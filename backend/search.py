@@ -0,0 +1,112 @@
+"""backend.search
+
+Ranked substring search across customers, items, lockers and orders.
+
+Staff type fragments of an email, phone number, name, tracking number,
+locker code or marketplace order reference. Plain `icontains` over those
+columns scans every row; instead each backend gets a trigram index
+(created by migration `0012_search_indexes`):
+
+* PostgreSQL: pg_trgm GIN indexes on every searched column. Each source
+  is one `ILIKE '%q%'` query the indexes can answer, ranked by
+  `similarity()`; the sources are combined with `UNION ALL`.
+* SQLite (development and tests): one FTS5 table `search_index` using
+  the trigram tokenizer, kept in sync by triggers on the source tables
+  (bulk writes included) and ranked by `bm25()`.
+
+On SQLite, a migration that rebuilds one of the source tables drops its
+triggers; re-create them when that happens (as 0019 does after 0017).
+Other databases have no index: search logs a warning and finds nothing.
+
+Trigram indexes need at least three characters, so shorter queries are
+rejected. Results are dicts `{'type', 'id', 'reference', 'label',
+'score'}`, best match first; scores are comparable within one backend.
+"""
+
+import logging
+
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+MIN_QUERY_LENGTH = 3
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+SEARCH_TYPES = ('customer', 'item', 'locker', 'order')
+
+# type -> (SELECT list, FROM/WHERE prefix, columns matched with ILIKE)
+_POSTGRES_SOURCES = {
+    'customer': (
+        "id, email, concat_ws(' ', first_name, last_name)",
+        "users WHERE role = 'customer'",
+        ('email', 'phone', 'first_name', 'last_name'),
+    ),
+    'item': ('id, tracking_number, status', 'items WHERE TRUE', ('tracking_number',)),
+    'locker': ('id, code, description', 'lockers WHERE TRUE', ('code',)),
+    'order': (
+        'id, marketplace_order_ref, marketplace',
+        'international_orders WHERE TRUE',
+        ('marketplace_order_ref',),
+    ),
+}
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _search_postgres(query, types, limit):
+    parts = []
+    params = []
+    pattern = f'%{_escape_like(query)}%'
+    for kind in types:
+        select, source, columns = _POSTGRES_SOURCES[kind]
+        score = ', '.join(f"similarity(coalesce({column}, ''), %s)" for column in columns)
+        matches = ' OR '.join(f'{column} ILIKE %s' for column in columns)
+        parts.append(
+            f"(SELECT '{kind}' AS kind, {select}, greatest({score}, 0) AS score "
+            f'FROM {source} AND ({matches}) ORDER BY score DESC LIMIT %s)'
+        )
+        params.extend([query] * len(columns) + [pattern] * len(columns) + [limit])
+    sql = f"SELECT * FROM ({' UNION ALL '.join(parts)}) AS hits ORDER BY score DESC LIMIT %s"
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [*params, limit])
+        return cursor.fetchall()
+
+
+def _search_sqlite(query, types, limit):
+    phrase = '"{}"'.format(query.replace('"', '""'))
+    placeholders = ', '.join(['%s'] * len(types))
+    sql = (
+        'SELECT kind, object_id, reference, label, -bm25(search_index) AS score '
+        f'FROM search_index WHERE search_index MATCH %s AND kind IN ({placeholders}) '
+        'ORDER BY rank LIMIT %s'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [phrase, *types, limit])
+        return cursor.fetchall()
+
+
+def search(query, types=SEARCH_TYPES, limit=DEFAULT_LIMIT):
+    """Return ranked matches for `query` among the given result types."""
+    query = query.strip()
+    if len(query) < MIN_QUERY_LENGTH:
+        raise ValueError(f'Search needs at least {MIN_QUERY_LENGTH} characters')
+    unknown = [kind for kind in types if kind not in SEARCH_TYPES]
+    if unknown:
+        raise ValueError(f"Unknown search type(s): {', '.join(unknown)}")
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    if connection.vendor == 'postgresql':
+        rows = _search_postgres(query, types, limit)
+    elif connection.vendor == 'sqlite':
+        rows = _search_sqlite(query, types, limit)
+    else:
+        logger.warning('Search is not available on %s', connection.vendor)
+        rows = []
+    return [
+        {'type': kind, 'id': pk, 'reference': reference, 'label': label or None,
+         'score': round(score, 4)}
+        for kind, pk, reference, label, score in rows
+    ]
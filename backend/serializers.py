@@ -9,10 +9,29 @@ Serializers = The translator that converts between these languages
 """
 
 from rest_framework import serializers
-from .models import InternationalBox, Item, User, Warehouse
+from .models import InternationalBox, Item, Notification, StatusLog, User, Warehouse
 from django.contrib.auth.models import User as DjangoUser
 
 
+class SparseFieldsMixin:
+    """Render only the `fields` passed in (see `backend.fieldsets`).
+
+    Nested serializers that are kept but not listed in `expand` render as
+    the related primary key.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None:
+            return
+        expand = set(expand or ())
+        for name in list(self.fields):
+            if name not in fields:
+                self.fields.pop(name)
+            elif isinstance(self.fields[name], serializers.BaseSerializer) and name not in expand:
+                self.fields[name] = serializers.PrimaryKeyRelatedField(read_only=True)
+
+
 class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -36,17 +55,29 @@ class WarehouseSerializer(serializers.ModelSerializer):
         model = Warehouse
         fields = ['name', 'country']
 
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email']
 
-class ItemSerializer(serializers.ModelSerializer):
+class ItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Item
-        fields = ['item_id', 'name', 'status', 'category', 'price']
+        fields = [
+            'id',
+            'tracking_number',
+            'status',
+            'condition',
+            'category',
+            'country_origin',
+            'weight_kg',
+            'quantity',
+            'scanning_date',
+            'customer',
+            'locker',
+        ]
 
-class InternationalBoxSerializer(serializers.ModelSerializer):
+class InternationalBoxSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     warehouse = WarehouseSerializer(read_only=True)
 
     
@@ -60,4 +91,35 @@ class InternationalBoxSerializer(serializers.ModelSerializer):
             'total_weight_kg', 
             'items_count',
             'warehouse'
-        ]
\ No newline at end of file
+        ]
+
+class StatusLogSerializer(serializers.ModelSerializer):
+    """One status change, as returned by `/api/timeline/` (see `backend.timeline`)."""
+
+    class Meta:
+        model = StatusLog
+        fields = ['id', 'entity_type', 'entity_id', 'status', 'note', 'changed_by', 'created_at']
+
+class NotificationSerializer(serializers.ModelSerializer):
+    """Inbox entry returned by `/api/notifications/` (see `backend.notifications`)."""
+
+    class Meta:
+        model = Notification
+        fields = ['id', 'entity_type', 'entity_id', 'status', 'message', 'created_at', 'read_at']
+
+class ScanSerializer(serializers.Serializer):
+    """One row of a warehouse intake batch (see `backend.scans`)."""
+    tracking_number = serializers.CharField(max_length=255)
+    weight_kg = serializers.FloatField(required=False, allow_null=True, min_value=0)
+    condition = serializers.ChoiceField(
+        choices=Item._meta.get_field('condition').choices,
+        required=False
+    )
+    locker_code = serializers.CharField(max_length=50, required=False, allow_blank=True)
+
+
+class PlannedBoxSerializer(serializers.Serializer):
+    """One box of a packing plan sent back to be applied (see `backend.packing`)."""
+    # Null for customers without a country, as `plan_warehouse` reports them.
+    destination_country = serializers.CharField(max_length=100, allow_null=True)
+    item_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False)
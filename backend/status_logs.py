@@ -0,0 +1,226 @@
+"""backend.status_logs
+
+Buffered, batched writer for `StatusLog` audit entries.
+
+Call `log_status()` wherever a single status changes. Inside `atomic()`
+entries are collected in memory and written with one `bulk_create` as
+the last statement before COMMIT, instead of one INSERT per change, so
+the audit rows commit or roll back together with the change:
+
+    with status_logs.atomic():
+        box.status = BoxStatus.SHIPPED
+        box.save()
+        status_logs.log_status(EntityType.BOX, box.id, box.status, changed_by=user)
+
+Nested `atomic()` blocks are savepoints sharing the outermost buffer; one
+that raises discards the entries it added. A plain `transaction.atomic()`
+savepoint is invisible to the buffer, so wrap nested blocks that may roll
+back in `status_logs.atomic()`.
+
+The set-based status paths (`backend.transitions`, `backend.scans`,
+`backend.packing`) already build their entries in bulk and write them
+with their own `bulk_create` in the same transaction.
+
+Outside `atomic()` each entry is written at once. With
+`STATUS_LOG_WRITER['BACKGROUND']` enabled it is instead handed, after
+COMMIT, to a background thread that coalesces entries from many requests
+and writes them every `FLUSH_INTERVAL_MS`. That trades durability
+(entries still queued are lost if the process is killed) for fewer,
+larger INSERTs; queued entries are always flushed on a normal interpreter
+shutdown, and a failed INSERT is retried on the next interval rather than
+dropped. `created_at` is stamped by `log_status()`, so queued entries
+keep the time of the change. See the `bench_status_log` command for
+measured throughput.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from backend.models import StatusLog
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'BACKGROUND': False,
+    'FLUSH_INTERVAL_MS': 200,
+    'MAX_BATCH': 1000,
+}
+
+_active_buffer = ContextVar('status_log_buffer', default=None)
+
+
+def writer_settings():
+    return {**DEFAULTS, **getattr(settings, 'STATUS_LOG_WRITER', {})}
+
+
+def log_status(entity_type, entity_id, status, note=None, changed_by=None):
+    """Record a status change; buffered inside `atomic()`."""
+    entry = StatusLog(
+        entity_type=entity_type,
+        entity_id=str(entity_id),
+        status=status,
+        note=note,
+        changed_by_id=getattr(changed_by, 'pk', None),
+        created_at=timezone.now(),
+    )
+    buffer = _active_buffer.get()
+    if buffer is None:
+        write([entry])
+    else:
+        buffer.append(entry)
+    return entry
+
+
+def write(entries, background=None):
+    """Persist `entries` now, or queue them for the background writer.
+
+    Queued entries are handed over only once the current transaction (if
+    any) commits.
+    """
+    if not entries:
+        return
+    options = writer_settings()
+    if options['BACKGROUND'] if background is None else background:
+        transaction.on_commit(partial(background_writer().submit, entries))
+    else:
+        StatusLog.objects.bulk_create(entries, batch_size=options['MAX_BATCH'])
+
+
+@contextmanager
+def atomic(using=None):
+    """`transaction.atomic()` whose status logs are written inside it.
+
+    The outermost block writes its buffer directly -- not through the
+    background writer -- as the last statement of the transaction.
+    """
+    outer = _active_buffer.get()
+    if outer is not None:
+        start = len(outer)
+        try:
+            with transaction.atomic(using=using):
+                yield outer
+        except BaseException:
+            del outer[start:]
+            raise
+        return
+
+    entries = []
+    with transaction.atomic(using=using):
+        token = _active_buffer.set(entries)
+        try:
+            yield entries
+        finally:
+            _active_buffer.reset(token)
+        write(entries, background=False)
+
+
+class BackgroundStatusLogWriter:
+    """Coalesce status logs from many requests and write them periodically.
+
+    Runs one daemon thread per process, started on first use. `stop()` is
+    registered with `atexit` so queued entries are flushed at shutdown.
+    A batch whose INSERT fails is kept and retried first on the next
+    flush; only entries still unwritten when `stop()` gives up are lost,
+    and those are counted in `lost` and logged.
+    """
+
+    def __init__(self, flush_interval_ms=200, max_batch=1000):
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch = max_batch
+        self.written = 0
+        self.lost = 0
+        self._queue = queue.SimpleQueue()
+        self._retry = []
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name='status-log-writer', daemon=True
+            )
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def submit(self, entries):
+        self.start()
+        self._queue.put(list(entries))
+
+    def flush(self):
+        """Write everything queued so far from the calling thread.
+
+        Returns False if an INSERT failed; its batch stays queued.
+        """
+        with self._flush_lock:
+            while True:
+                batch, self._retry = self._retry, []
+                while len(batch) < self.max_batch:
+                    try:
+                        batch.extend(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return True
+                try:
+                    StatusLog.objects.bulk_create(batch, batch_size=self.max_batch)
+                    self.written += len(batch)
+                except Exception:
+                    logger.exception(f'Failed to write {len(batch)} status log entries, will retry')
+                    self._retry = batch
+                    # The connection may be what broke; reconnect next time.
+                    connection.close()
+                    return False
+
+    def stop(self, timeout=10):
+        """Stop the thread after a final flush."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        atexit.unregister(self.stop)
+
+    def _run(self):
+        try:
+            while not self._stop.wait(self.flush_interval):
+                self.flush()
+            if not self.flush():
+                with self._flush_lock:
+                    lost, self._retry = self._retry, []
+                    while True:
+                        try:
+                            lost.extend(self._queue.get_nowait())
+                        except queue.Empty:
+                            break
+                    self.lost += len(lost)
+                logger.error(f'Lost {len(lost)} status log entries at shutdown')
+        finally:
+            connection.close()
+
+
+_background_writer = None
+_background_lock = threading.Lock()
+
+
+def background_writer():
+    """Return the process-wide background writer, creating it on first use."""
+    global _background_writer
+    with _background_lock:
+        if _background_writer is None:
+            options = writer_settings()
+            _background_writer = BackgroundStatusLogWriter(
+                options['FLUSH_INTERVAL_MS'], options['MAX_BATCH']
+            )
+        return _background_writer
@@ -5,6 +5,934 @@ for models, serializers, views, and management commands here. For larger
 test suites consider creating a `tests/` package with focused modules.
 """
 
-from django.test import TestCase
+import base64
+import json
+from datetime import timedelta
+from itertools import count
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import make_password
+from django.core import mail
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connection, transaction
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from backend import customer_import, db_routing, status_logs
+from backend.admin_utils import item_categories
+from backend.authentication import RoleClaimsRefreshToken
+from backend.counters import read_counters
+from backend.customer_import import import_customers
+from backend.db_routing import (
+    ReplicaRouter, ReplicaRoutingMiddleware, is_pinned, pin, reads_from_replica, replica_alias,
+)
+from backend.models import (
+    BoxItem, DailyRollup, InternationalBox, Item, Locker, Notification, StatusLog, User, Warehouse,
+)
+from backend.models.enums import BoxStatus, CounterEntity, EntityType, ItemStatus, RollupMetric, UserRole
+from backend.packing import pack_items
+from backend.lookup import BloomFilter, KnownCodes
+from backend.notifications import deliver_pending, notification_for
+from backend.reports import rebuild, report, update_rollups
+from backend.search import search
+from backend.token_blacklist import BlacklistCache, CachedBlacklistRefreshToken
+from backend.transitions import transition
+
+
+# Helpers ----------------------------------------------------------------------
+
+_sequence = count(1)
+
+
+def make_warehouse(name='Main', country='US'):
+    return Warehouse.objects.create(name=name, city='City', country=country)
+
+
+def make_user(role=UserRole.CUSTOMER, country='AE', **fields):
+    n = next(_sequence)
+    fields.setdefault('email', f'user{n}@example.com')
+    return User.objects.create_user(
+        password='secret-pass-1', role=role, country=country,
+        first_name='Test', last_name=f'User {n}', **fields,
+    )
+
+
+def make_item(customer, status=ItemStatus.AWAITING_ARRIVAL, locker=None, **fields):
+    """An item stored in the customer's (auto-created) locker."""
+    if locker is None:
+        locker = Locker.objects.filter(customer=customer).first()
+    fields.setdefault('tracking_number', f'TRK{next(_sequence):06d}')
+    return Item.objects.create(customer=customer, locker=locker, status=status, **fields)
+
+
+def access_token(user):
+    return str(RoleClaimsRefreshToken.for_user(user).access_token)
+
+
+def counter(entity, status):
+    return read_counters().get(entity, {}).get(status, 0)
+
+
+@override_settings(DB_ROUTING={'REPLICAS': ()})
+class APITestCase(TestCase):
+    """`TestCase` with a DRF `APIClient` as `self.client`.
+
+    Views read from the primary only (replica routing has its own tests).
+    The token blacklist filter is not built: its background thread cannot
+    see the test transaction, so blacklist checks query the database.
+    The first authentication class is `SessionAuthentication`, which sends
+    no `WWW-Authenticate` challenge, so DRF answers a missing or bad login
+    with 403.
+    """
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(BlacklistCache, 'warm')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+
+    def login(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access_token(user)}')
+
+
+# Status transitions -----------------------------------------------------------
+
+class TransitionTests(TestCase):
+    def setUp(self):
+        self.warehouse = make_warehouse()
+        self.customer = make_user()
+        self.staff = make_user(role=UserRole.EMPLOYEE)
+
+    def test_moves_allowed_rows_and_rejects_the_rest(self):
+        waiting = [make_item(self.customer) for _ in range(3)]
+        shipped = make_item(self.customer, status=ItemStatus.SHIPPED)
+        ids = [item.id for item in waiting] + [shipped.id]
+        before_waiting = counter(CounterEntity.ITEM, ItemStatus.AWAITING_ARRIVAL)
+        before_arrived = counter(CounterEntity.ITEM, ItemStatus.ARRIVED_WAREHOUSE)
+
+        result = transition(Item.objects.filter(id__in=ids), ItemStatus.ARRIVED_WAREHOUSE, by=self.staff)
+
+        self.assertCountEqual(result.changed, [item.id for item in waiting])
+        self.assertEqual(result.rejected, {shipped.id: ItemStatus.SHIPPED})
+        self.assertEqual(result.cascaded, [])
+        self.assertEqual(
+            set(Item.objects.filter(id__in=ids).values_list('status', flat=True)),
+            {ItemStatus.ARRIVED_WAREHOUSE, ItemStatus.SHIPPED},
+        )
+        self.assertEqual(counter(CounterEntity.ITEM, ItemStatus.AWAITING_ARRIVAL), before_waiting - 3)
+        self.assertEqual(counter(CounterEntity.ITEM, ItemStatus.ARRIVED_WAREHOUSE), before_arrived + 3)
+        logs = StatusLog.objects.filter(entity_type=EntityType.ITEM, status=ItemStatus.ARRIVED_WAREHOUSE)
+        self.assertCountEqual(logs.values_list('entity_id', flat=True), [str(item.id) for item in waiting])
+        self.assertEqual(set(logs.values_list('changed_by_id', flat=True)), {self.staff.id})
+
+    def test_rows_already_in_the_status_are_rejected(self):
+        item = make_item(self.customer, status=ItemStatus.ARRIVED_WAREHOUSE)
+        before = counter(CounterEntity.ITEM, ItemStatus.ARRIVED_WAREHOUSE)
+        logs = StatusLog.objects.count()
+
+        result = transition(Item.objects.filter(id=item.id), ItemStatus.ARRIVED_WAREHOUSE)
+
+        self.assertEqual(result.changed, [])
+        self.assertEqual(result.rejected, {item.id: ItemStatus.ARRIVED_WAREHOUSE})
+        self.assertEqual(counter(CounterEntity.ITEM, ItemStatus.ARRIVED_WAREHOUSE), before)
+        self.assertEqual(StatusLog.objects.count(), logs)
+
+    def test_unknown_status_raises(self):
+        with self.assertRaises(ValueError):
+            transition(Item.objects.all(), 'teleported')
+
+    def test_rows_are_locked_in_primary_key_order(self):
+        items = [make_item(self.customer) for _ in range(3)]
+        queryset = Item.objects.filter(id__in=[item.id for item in items]).order_by('-id')
+        with mock.patch.object(type(queryset), 'select_for_update', autospec=True,
+                               side_effect=type(queryset).select_for_update) as locked:
+            transition(queryset, ItemStatus.ARRIVED_WAREHOUSE)
+        self.assertEqual(locked.call_args.args[0].query.order_by, ('pk',))
+
+
+class CascadeBoxItemsTests(TestCase):
+    def setUp(self):
+        self.warehouse = make_warehouse()
+        self.customer = make_user()
+        self.box = InternationalBox.objects.create(
+            box_number='BOX-1', status=BoxStatus.READY_TO_SHIP, warehouse=self.warehouse,
+        )
+        self.packed = [make_item(self.customer, status=ItemStatus.IN_BOX) for _ in range(2)]
+        self.returned = make_item(self.customer, status=ItemStatus.RETURNED)
+        for item in [*self.packed, self.returned]:
+            BoxItem.objects.create(box=self.box, item=item)
+
+    def test_shipping_a_box_moves_its_packed_items(self):
+        before_in_box = counter(CounterEntity.ITEM, ItemStatus.IN_BOX)
+        before_shipped = counter(CounterEntity.ITEM, ItemStatus.SHIPPED)
+        before_returned = counter(CounterEntity.ITEM, ItemStatus.RETURNED)
+
+        result = transition(InternationalBox.objects.filter(id=self.box.id), BoxStatus.SHIPPED)
+
+        self.assertEqual(result.changed, [self.box.id])
+        self.assertCountEqual(result.cascaded, [item.id for item in self.packed])
+        self.assertEqual(
+            dict(Item.objects.filter(boxitem__box=self.box).values_list('id', 'status')),
+            {
+                self.packed[0].id: ItemStatus.SHIPPED,
+                self.packed[1].id: ItemStatus.SHIPPED,
+                self.returned.id: ItemStatus.RETURNED,
+            },
+        )
+        self.assertEqual(counter(CounterEntity.ITEM, ItemStatus.IN_BOX), before_in_box - 2)
+        self.assertEqual(counter(CounterEntity.ITEM, ItemStatus.SHIPPED), before_shipped + 2)
+        self.assertEqual(counter(CounterEntity.ITEM, ItemStatus.RETURNED), before_returned)
+
+        item_logs = StatusLog.objects.filter(entity_type=EntityType.ITEM, status=ItemStatus.SHIPPED)
+        self.assertCountEqual(item_logs.values_list('entity_id', flat=True), [str(item.id) for item in self.packed])
+        self.assertEqual(set(item_logs.values_list('note', flat=True)), {'Box moved to shipped'})
+        self.assertTrue(
+            StatusLog.objects.filter(entity_type=EntityType.BOX, entity_id=str(self.box.id),
+                                     status=BoxStatus.SHIPPED).exists()
+        )
+
+    def test_non_cascading_box_status_leaves_items_alone(self):
+        result = transition(InternationalBox.objects.filter(id=self.box.id), BoxStatus.BUILDING)
+
+        self.assertEqual(result.changed, [self.box.id])
+        self.assertEqual(result.cascaded, [])
+        self.assertEqual(
+            set(Item.objects.filter(id__in=[item.id for item in self.packed]).values_list('status', flat=True)),
+            {ItemStatus.IN_BOX},
+        )
+
+
+# Batch scans ------------------------------------------------------------------
+
+class BatchScansTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.warehouse = make_warehouse()
+        self.customer = make_user()
+        self.other = make_user()
+        self.login(make_user(role=UserRole.EMPLOYEE))
+
+    def scan(self, payload):
+        return self.client.post('/api/scans/batch/', payload, format='json')
+
+    def test_scanning_needs_an_employee(self):
+        self.client.credentials()
+        self.assertEqual(self.scan({}).status_code, 403)
+        self.login(self.customer)
+        self.assertEqual(self.scan({'scans': []}).status_code, 403)
+
+    def test_batch_must_be_a_non_empty_list(self):
+        for payload in ({}, {'scans': []}, {'scans': 'TRK1'}, [{'tracking_number': 'TRK1'}]):
+            with self.subTest(payload=payload):
+                self.assertEqual(self.scan(payload).status_code, 400)
+
+    def test_each_row_gets_its_own_result(self):
+        item = make_item(self.customer)
+        shipped = make_item(self.customer, status=ItemStatus.SHIPPED)
+        other_locker = Locker.objects.get(customer=self.other)
+        before = counter(CounterEntity.ITEM, ItemStatus.ARRIVED_WAREHOUSE)
+
+        response = self.scan({'scans': [
+            {'tracking_number': item.tracking_number, 'weight_kg': 2.5},
+            {'tracking_number': item.tracking_number},
+            {'tracking_number': 'UNKNOWN'},
+            {'tracking_number': shipped.tracking_number},
+            {'weight_kg': 1},
+            'not-a-row',
+            {'tracking_number': make_item(self.customer).tracking_number, 'locker_code': other_locker.code},
+            {'tracking_number': make_item(self.customer).tracking_number, 'condition': 'MISMATCHED'},
+        ]})
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body['processed'], body['succeeded'], body['failed']), (8, 2, 6))
+        results = body['results']
+        self.assertEqual(results[0], {
+            'tracking_number': item.tracking_number, 'ok': True, 'status': ItemStatus.ARRIVED_WAREHOUSE,
+        })
+        self.assertEqual(results[1]['error'], 'Duplicate tracking number in batch')
+        self.assertEqual(results[2]['error'], 'Unknown tracking number')
+        self.assertEqual(results[3]['error'], "Item cannot be scanned in status 'shipped'")
+        self.assertTrue(results[4]['error'].startswith('tracking_number: '))
+        self.assertIsNone(results[5]['tracking_number'])
+        self.assertIsInstance(results[5]['error'], str)
+        self.assertEqual(results[6]['error'], "Locker does not belong to the item's customer")
+        self.assertEqual(results[7]['status'], ItemStatus.MISMATCHED)
+
+        item.refresh_from_db()
+        self.assertEqual((item.status, item.weight_kg), (ItemStatus.ARRIVED_WAREHOUSE, 2.5))
+        self.assertIsNotNone(item.scanning_date)
+        self.assertEqual(counter(CounterEntity.ITEM, ItemStatus.ARRIVED_WAREHOUSE), before + 1)
+
+
+# Box packing ------------------------------------------------------------------
+
+class PackingApplyTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.warehouse = make_warehouse()
+        self.customer = make_user(country='AE')
+        self.items = [make_item(self.customer, status=ItemStatus.VALIDATED, weight_kg=1.5) for _ in range(2)]
+        self.login(make_user(role=UserRole.EMPLOYEE))
+
+    def apply(self, boxes, **limits):
+        payload = {'warehouse': self.warehouse.id, 'boxes': boxes, **limits}
+        return self.client.post('/api/packing/apply/', payload, format='json')
+
+    def box(self, items=None, destination='AE'):
+        return {'destination_country': destination, 'item_ids': [item.id for item in items or self.items]}
+
+    def test_request_shape_is_validated(self):
+        cases = [
+            ({'warehouse': 'x', 'boxes': [self.box()]}, 'warehouse'),
+            ({'warehouse': self.warehouse.id, 'boxes': []}, 'empty'),
+            ({'warehouse': self.warehouse.id, 'boxes': [{'item_ids': [self.items[0].id]}]}, 'no destination'),
+            ({'warehouse': self.warehouse.id, 'boxes': [{'destination_country': 'AE', 'item_ids': []}]}, 'no items'),
+            ({'warehouse': self.warehouse.id, 'boxes': [{'destination_country': 'AE', 'item_ids': ['a']}]}, 'bad id'),
+            ({'warehouse': self.warehouse.id, 'boxes': [self.box(), self.box()]}, 'repeated item'),
+        ]
+        for payload, case in cases:
+            with self.subTest(case):
+                response = self.client.post('/api/packing/apply/', payload, format='json')
+                self.assertEqual(response.status_code, 400)
+        self.assertFalse(BoxItem.objects.exists())
+
+    def test_items_bound_elsewhere_are_refused(self):
+        response = self.apply([self.box(destination='US')])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('not bound for their box destination', response.json()['error'])
+        self.assertFalse(BoxItem.objects.exists())
+
+    def test_stale_plan_is_a_conflict(self):
+        Item.objects.filter(id=self.items[0].id).update(status=ItemStatus.RETURNED)
+        response = self.apply([self.box()])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['stale_item_ids'], [self.items[0].id])
+
+    def test_valid_plan_creates_boxes(self):
+        before = counter(CounterEntity.ITEM, ItemStatus.IN_BOX)
+        response = self.apply([self.box()])
+        self.assertEqual(response.status_code, 201)
+        box = response.json()[0]
+        self.assertEqual((box['items_count'], box['total_weight_kg']), (2, 3.0))
+        self.assertEqual(
+            set(Item.objects.filter(id__in=[item.id for item in self.items]).values_list('status', flat=True)),
+            {ItemStatus.IN_BOX},
+        )
+        self.assertEqual(counter(CounterEntity.ITEM, ItemStatus.IN_BOX), before + 2)
+        self.assertEqual(self.apply([self.box()]).status_code, 409)
+
+    def test_boxes_over_the_limits_are_refused(self):
+        for limits in ({'max_items': 1}, {'max_weight_kg': 2}):
+            with self.subTest(**limits):
+                response = self.apply([self.box()], **limits)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('the limit is', response.json()['error'])
+        self.assertEqual(self.apply([self.box()], max_items=0).status_code, 400)
+        self.assertFalse(BoxItem.objects.exists())
+
+
+class PackItemsTests(TestCase):
+    def test_one_customer_is_split_into_boxes_within_the_limits(self):
+        candidates = [(pk, 1, 'AE', 1.0 + pk % 7) for pk in range(1, 2001)]
+        boxes, unassigned = pack_items(candidates, max_weight=30.0, max_items=20)
+
+        self.assertEqual(unassigned, [])
+        self.assertEqual(sorted(pk for box in boxes for pk in box['item_ids']), list(range(1, 2001)))
+        for box in boxes:
+            self.assertLessEqual(box['items_count'], 20)
+            self.assertLessEqual(box['total_weight_kg'], 30.0)
+        # Best-fit decreasing stays close to the weight lower bound.
+        self.assertLess(len(boxes), 1.1 * sum(weight for *_, weight in candidates) / 30)
+
+    def test_items_heavier_than_a_box_are_unassigned(self):
+        boxes, unassigned = pack_items([(1, 1, 'AE', 40.0), (2, 1, 'AE', 5.0)], max_weight=30.0)
+        self.assertEqual(unassigned, [1])
+        self.assertEqual([box['item_ids'] for box in boxes], [[2]])
+
+
+# Customer import --------------------------------------------------------------
+
+class ImportCustomersTests(TestCase):
+    def setUp(self):
+        self.warehouses = [make_warehouse('Dubai', 'AE'), make_warehouse('Miami', 'US')]
+        self.existing = make_user(email='taken@example.com')
+
+    def test_creates_customers_with_a_locker_per_warehouse(self):
+        before = counter(CounterEntity.USER, UserRole.CUSTOMER)
+
+        summary = import_customers([
+            {'email': 'a@example.com', 'first_name': 'A'},
+            {'email': 'b@example.com', 'password': 'plain-pass-1'},
+        ], allow_plaintext=True)
+
+        self.assertEqual(summary['created'], 2)
+        self.assertEqual(summary['lockers_created'], 4)
+        self.assertEqual(summary['errors'], [])
+        created = User.objects.filter(email__in=['a@example.com', 'b@example.com'])
+        self.assertEqual(set(created.values_list('role', flat=True)), {UserRole.CUSTOMER})
+        self.assertEqual(Locker.objects.filter(customer__in=created).count(), 4)
+        self.assertTrue(created.get(email='b@example.com').check_password('plain-pass-1'))
+        self.assertFalse(created.get(email='a@example.com').has_usable_password())
+        self.assertEqual(counter(CounterEntity.USER, UserRole.CUSTOMER), before + 2)
+
+    def test_duplicates_are_reported_per_row(self):
+        summary = import_customers([
+            {'email': 'new@example.com'},
+            {'email': 'NEW@example.com'},
+            {'email': 'Taken@Example.com'},
+            {'email': 'not-an-email'},
+            {'email': ''},
+        ])
+
+        self.assertEqual(summary['created'], 1)
+        self.assertEqual(
+            [(error['row'], error['error']) for error in summary['errors']],
+            [
+                (1, 'Duplicate email in import'),
+                (2, 'A user with this email already exists'),
+                (3, 'Enter a valid email address.'),
+                (4, 'email is required'),
+            ],
+        )
+        self.assertEqual(User.objects.filter(email__iexact='new@example.com').count(), 1)
+
+    def test_plaintext_passwords_are_refused_unless_allowed(self):
+        summary = import_customers([
+            {'email': 'plain@example.com', 'password': 'plain-pass-1'},
+            {'email': 'hashed@example.com', 'password_hash': make_password('plain-pass-1')},
+        ])
+
+        self.assertEqual(summary['created'], 1)
+        self.assertEqual(
+            summary['errors'],
+            [{
+                'row': 0, 'email': 'plain@example.com',
+                'error': 'Plaintext passwords are not accepted here; provide password_hash',
+            }],
+        )
+        self.assertTrue(User.objects.get(email='hashed@example.com').check_password('plain-pass-1'))
+
+    def test_dry_run_writes_nothing(self):
+        users = User.objects.count()
+        summary = import_customers([{'email': 'dry@example.com'}], dry_run=True)
+        self.assertEqual(summary['valid'], 1)
+        self.assertEqual(summary['created'], 0)
+        self.assertEqual(User.objects.count(), users)
+
+    def test_user_created_during_the_import_is_reported_and_the_rest_imported(self):
+        validate = customer_import._validate
+
+        def validate_then_race(*args):
+            result = validate(*args)
+            make_user(email='racer@example.com')
+            return result
+
+        with mock.patch.object(customer_import, '_validate', validate_then_race):
+            summary = import_customers([
+                {'email': 'first@example.com'},
+                {'email': 'racer@example.com'},
+                {'email': 'last@example.com'},
+            ])
+
+        self.assertEqual(summary['created'], 2)
+        self.assertEqual(
+            summary['errors'],
+            [{'row': 1, 'email': 'racer@example.com', 'error': 'A user with this email already exists'}],
+        )
+        self.assertTrue(User.objects.filter(email='first@example.com').exists())
+        self.assertTrue(User.objects.filter(email='last@example.com').exists())
+        self.assertEqual(Locker.objects.filter(customer__email='last@example.com').count(), 2)
+
+
+# JWT role claims --------------------------------------------------------------
+
+class RoleClaimsAuthenticationTests(APITestCase):
+    def test_invalid_bearer_token_is_refused(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer not-a-token')
+        self.assertEqual(self.client.get('/api/statistics/').status_code, 403)
+        self.assertEqual(self.client.get('/api/auth/me/').status_code, 403)
+
+
+# Token blacklist --------------------------------------------------------------
+
+class RefreshTokenTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = make_user(role=UserRole.EMPLOYEE)
+
+    def refresh(self, token):
+        return self.client.post('/api/auth/refresh/', {'refresh': token}, format='json')
+
+    def test_invalid_refresh_token_is_401(self):
+        self.assertEqual(self.refresh('garbage').status_code, 401)
+
+    def test_refresh_token_can_be_used_once(self):
+        token = str(CachedBlacklistRefreshToken.for_user(self.user))
+        first = self.refresh(token)
+        self.assertEqual(first.status_code, 200)
+        self.assertIn('refresh', first.json())
+        self.assertEqual(self.refresh(token).status_code, 401)
+        self.assertEqual(self.refresh(first.json()['refresh']).status_code, 200)
+
+    def test_second_blacklisting_of_a_token_does_not_create_a_row(self):
+        # What a concurrent refresh with the same token sees after losing the race.
+        token = CachedBlacklistRefreshToken.for_user(self.user)
+        _, created = token.blacklist()
+        self.assertTrue(created)
+        _, created = token.blacklist()
+        self.assertFalse(created)
+
+
+# Reporting rollups ------------------------------------------------------------
+
+def rollup_rows():
+    return sorted(DailyRollup.objects.values_list('day', 'warehouse_id', 'metric', 'dimension', 'count', 'total'))
+
+
+@override_settings(REPORTS={'SETTLE_SECONDS': 0})
+class UpdateRollupsTests(TestCase):
+    def setUp(self):
+        self.warehouse = make_warehouse()
+        customer = make_user()
+        self.items = [make_item(customer, category='Books') for _ in range(3)]
+        transition(Item.objects.filter(id__in=[item.id for item in self.items]), ItemStatus.ARRIVED_WAREHOUSE)
+
+    def test_second_run_folds_nothing(self):
+        folded = update_rollups()
+        self.assertEqual(folded, StatusLog.objects.count())
+        rows = rollup_rows()
+
+        self.assertEqual(update_rollups(), 0)
+        self.assertEqual(rollup_rows(), rows)
+
+    def test_repeated_status_is_not_counted_twice(self):
+        update_rollups()
+        StatusLog.objects.create(entity_type='item', entity_id=str(self.items[0].id),
+                                 status=ItemStatus.ARRIVED_WAREHOUSE)
+        update_rollups()
+
+        arrivals = DailyRollup.objects.get(metric=RollupMetric.ARRIVALS)
+        self.assertEqual(arrivals.count, 3)
+        by_category = DailyRollup.objects.get(metric=RollupMetric.ARRIVALS_BY_CATEGORY)
+        self.assertEqual((by_category.dimension, by_category.count), ('Books', 3))
+
+    def test_incremental_folding_matches_a_rebuild(self):
+        update_rollups()
+        transition(Item.objects.filter(id=self.items[0].id), ItemStatus.VALIDATED)
+        update_rollups()
+        incremental = rollup_rows()
+
+        rebuild()
+        self.assertEqual(rollup_rows(), incremental)
+
+    def test_report_reads_the_rollups(self):
+        update_rollups()
+        today = timezone.localdate()
+        data = report(today - timedelta(days=6), today)
+        self.assertEqual(data['items_by_category'], {'Books': 3})
+
+    def test_report_range_is_capped(self):
+        today = timezone.localdate()
+        with self.assertRaises(ValueError):
+            report(today - timedelta(days=731), today)
+
+
+class StatisticsViewTests(APITestCase):
+    def test_statistics_need_an_admin(self):
+        self.assertEqual(self.client.get('/api/statistics/').status_code, 403)
+        for role, expected in ((UserRole.CUSTOMER, 403), (UserRole.EMPLOYEE, 403), (UserRole.ADMIN, 200)):
+            with self.subTest(role=role):
+                self.login(make_user(role=role))
+                self.assertEqual(self.client.get('/api/statistics/').status_code, expected)
+
+
+# Async views ------------------------------------------------------------------
+
+class AsyncViewAuthenticationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.employee = make_user(role=UserRole.EMPLOYEE)
+
+    def test_anonymous_requests_are_refused(self):
+        for path in ('/api/auth/me/', '/api/stats/'):
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 403)
+
+    def test_basic_auth_is_accepted(self):
+        credentials = base64.b64encode(f'{self.employee.email}:secret-pass-1'.encode()).decode()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Basic {credentials}')
+        response = self.client.get('/api/auth/me/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['email'], self.employee.email)
+
+        wrong = base64.b64encode(f'{self.employee.email}:wrong'.encode()).decode()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Basic {wrong}')
+        self.assertEqual(self.client.get('/api/auth/me/').status_code, 403)
+
+
+# Connection stats -------------------------------------------------------------
+
+class ConnectionStatsViewTests(APITestCase):
+    def test_connection_stats_need_an_admin(self):
+        self.assertEqual(self.client.get('/api/db/connections/').status_code, 403)
+        for role, expected in ((UserRole.CUSTOMER, 403), (UserRole.EMPLOYEE, 403), (UserRole.ADMIN, 200)):
+            with self.subTest(role=role):
+                self.login(make_user(role=role))
+                self.assertEqual(self.client.get('/api/db/connections/').status_code, expected)
+
+
+# Replica routing --------------------------------------------------------------
+# The test settings may have no replica, so these tests route to a stand-in
+# alias whose connection is faked.
+
+REPLICA = 'replica'
+
+
+class FakeConnection:
+    def __init__(self, fails=False):
+        self.connection = None
+        self.fails = fails
+
+    def ensure_connection(self):
+        if self.fails:
+            raise DatabaseError('connection refused')
+        self.connection = object()
+
+
+@override_settings(DB_ROUTING={'REPLICAS': (REPLICA,), 'PIN_SECONDS': 10, 'RETRY_SECONDS': 30})
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.user = make_user()
+        self.replica = FakeConnection()
+        for patcher in (
+            mock.patch.object(db_routing, 'replica_aliases', lambda: [REPLICA]),
+            mock.patch.object(db_routing, 'connections', {REPLICA: self.replica}),
+            mock.patch.dict(db_routing._down_until, clear=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_reads_use_the_replica_only_inside_the_scope(self):
+        self.assertIsNone(self.router.db_for_read(Item))
+        with reads_from_replica(self.user):
+            self.assertEqual(self.router.db_for_read(Item), REPLICA)
+            self.assertEqual(replica_alias(self.user), REPLICA)
+        self.assertIsNone(self.router.db_for_read(Item))
+
+    def test_a_write_sends_later_reads_to_the_primary(self):
+        with reads_from_replica(self.user):
+            self.assertEqual(self.router.db_for_write(Item), DEFAULT_DB_ALIAS)
+            self.assertIsNone(self.router.db_for_read(Item))
+            self.assertEqual(replica_alias(self.user), DEFAULT_DB_ALIAS)
+
+    def test_pinned_user_reads_from_the_primary(self):
+        pin(self.user)
+        self.assertTrue(is_pinned(self.user))
+        with reads_from_replica(self.user):
+            self.assertIsNone(self.router.db_for_read(Item))
+        self.assertEqual(replica_alias(self.user), DEFAULT_DB_ALIAS)
+        self.assertEqual(replica_alias(make_user()), REPLICA)
+
+    def test_middleware_pins_users_whose_request_wrote(self):
+        def view(request):
+            if request.method == 'POST':
+                self.router.db_for_write(Item)
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(view)
+        factory = RequestFactory()
+        for method, user in (('get', self.user), ('post', make_user())):
+            request = getattr(factory, method)('/')
+            request.user = user
+            middleware(request)
+        self.assertFalse(is_pinned(self.user))
+        self.assertTrue(is_pinned(request.user))
+
+    def test_unreachable_replica_falls_back_to_the_primary(self):
+        self.replica.fails = True
+        with self.assertLogs('backend.db_routing', 'WARNING'):
+            with reads_from_replica(self.user):
+                self.assertIsNone(self.router.db_for_read(Item))
+        self.assertTrue(db_routing.is_down(REPLICA))
+
+        # Skipped without another connection attempt until RETRY_SECONDS pass.
+        self.replica.fails = False
+        with reads_from_replica(self.user):
+            self.assertIsNone(self.router.db_for_read(Item))
+        self.assertIsNone(self.replica.connection)
+        self.assertEqual(replica_alias(self.user), DEFAULT_DB_ALIAS)
+
+
+@override_settings(DB_ROUTING={'REPLICAS': (REPLICA,), 'PIN_SECONDS': 10, 'RETRY_SECONDS': 30})
+class ReplicaViewTests(APITestCase):
+    """List endpoints route their reads to the replica.
+
+    The router's answers are recorded, but the queries still run on the
+    primary: the stand-in alias has no real database behind it.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.routed = []
+        router_read = ReplicaRouter.db_for_read
+
+        def record_read(router, model, **hints):
+            self.routed.append((model, router_read(router, model, **hints)))
+            return None
+
+        for patcher in (
+            mock.patch.object(db_routing, 'replica_aliases', lambda: [REPLICA]),
+            mock.patch.object(db_routing, 'connections', {REPLICA: FakeConnection()}),
+            mock.patch.dict(db_routing._down_until, clear=True),
+            mock.patch.object(ReplicaRouter, 'db_for_read', record_read),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.login(make_user(role=UserRole.ADMIN))
+
+    def test_list_endpoints_read_from_the_replica(self):
+        for path, model in (('/api/items/', Item), ('/api/boxes/', InternationalBox), ('/api/customers/', User)):
+            with self.subTest(path=path):
+                self.routed.clear()
+                self.assertEqual(self.client.get(path).status_code, 200)
+                self.assertIn((model, REPLICA), self.routed)
+
+
+# Exports ----------------------------------------------------------------------
+
+class ExportViewTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        make_warehouse()
+        self.admin = make_user(role=UserRole.ADMIN)
+        customer = make_user()
+        self.items = [make_item(customer) for _ in range(5)]
+
+    def test_exports_need_an_admin(self):
+        self.assertEqual(self.client.get('/api/exports/items/').status_code, 403)
+        self.login(make_user(role=UserRole.EMPLOYEE))
+        self.assertEqual(self.client.get('/api/exports/items/').status_code, 403)
+
+    def test_wsgi_export_streams_csv(self):
+        self.login(self.admin)
+        response = self.client.get('/api/exports/items/?output=csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.is_async)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:2], ['id', 'tracking_number'])
+        self.assertEqual([line.split(',')[1] for line in lines[1:]], [item.tracking_number for item in self.items])
+
+    async def test_asgi_export_streams_asynchronously(self):
+        token = await sync_to_async(access_token)(self.admin)
+        response = await AsyncClient().get('/api/exports/items/', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        rows = [json.loads(line) for chunk in chunks for line in chunk.decode().splitlines()]
+        self.assertEqual([row['tracking_number'] for row in rows], [item.tracking_number for item in self.items])
+
+
+# Search -----------------------------------------------------------------------
+
+class SearchTests(TestCase):
+    def setUp(self):
+        make_warehouse()
+        self.customer = make_user()
+
+    def test_finds_rows_written_after_migrating(self):
+        # Rebuilt tables lose their SQLite triggers unless re-created (0019).
+        item = make_item(self.customer, tracking_number='QWERTY123')
+        locker = Locker.objects.get(customer=self.customer)
+
+        self.assertIn(('item', item.id), [(hit['type'], hit['id']) for hit in search('QWERTY')])
+        self.assertIn(('locker', locker.id), [(hit['type'], hit['id']) for hit in search(locker.code)])
+
+    def test_updates_and_deletes_are_reindexed(self):
+        item = make_item(self.customer, tracking_number='QWERTY123')
+        Item.objects.filter(id=item.id).update(tracking_number='ASDFGH456')
+        self.assertEqual(search('QWERTY', types=('item',)), [])
+        self.assertEqual([hit['id'] for hit in search('ASDFGH', types=('item',))], [item.id])
+
+        item.delete()
+        self.assertEqual(search('ASDFGH', types=('item',)), [])
+
+
+# Status log writer ------------------------------------------------------------
+
+def log_item(item_id, status=ItemStatus.ARRIVED_WAREHOUSE):
+    return status_logs.log_status(EntityType.ITEM, item_id, status)
+
+
+def logged_ids():
+    return sorted(StatusLog.objects.values_list('entity_id', flat=True))
+
+
+class StatusLogWriterTests(TestCase):
+    def test_atomic_writes_its_entries_in_one_insert_on_commit(self):
+        with CaptureQueriesContext(connection) as queries:
+            with status_logs.atomic():
+                for item_id in (1, 2, 3):
+                    log_item(item_id)
+                self.assertEqual(StatusLog.objects.count(), 0)
+        self.assertEqual(logged_ids(), ['1', '2', '3'])
+        inserts = [query for query in queries if query['sql'].startswith('INSERT INTO "status_logs"')]
+        self.assertEqual(len(inserts), 1)
+
+    def test_rolled_back_atomic_writes_nothing(self):
+        with self.assertRaises(ZeroDivisionError):
+            with status_logs.atomic():
+                log_item(1)
+                1 / 0
+        self.assertEqual(StatusLog.objects.count(), 0)
+
+    def test_rolled_back_savepoint_discards_only_its_entries(self):
+        with status_logs.atomic():
+            log_item(1)
+            try:
+                with status_logs.atomic():
+                    log_item(2)
+                    1 / 0
+            except ZeroDivisionError:
+                pass
+            with status_logs.atomic():
+                log_item(3)
+        self.assertEqual(logged_ids(), ['1', '3'])
+
+    def test_entries_outside_atomic_are_written_at_once(self):
+        log_item(1)
+        self.assertEqual(logged_ids(), ['1'])
+
+    @override_settings(STATUS_LOG_WRITER={'BACKGROUND': True})
+    def test_background_entries_are_queued_on_commit_with_their_log_time(self):
+        writer = status_logs.BackgroundStatusLogWriter()
+        with mock.patch.object(status_logs, 'background_writer', lambda: writer), \
+                mock.patch.object(writer, 'start'):
+            with self.captureOnCommitCallbacks(execute=True):
+                logged = log_item(1)
+                try:
+                    with transaction.atomic():
+                        log_item(2)
+                        1 / 0
+                except ZeroDivisionError:
+                    pass
+                self.assertEqual(StatusLog.objects.count(), 0)
+            flushed_at = timezone.now()
+            writer.flush()
+
+        stored = StatusLog.objects.get()
+        self.assertEqual(stored.entity_id, '1')
+        self.assertEqual(stored.created_at, logged.created_at)
+        self.assertLess(stored.created_at, flushed_at)
+
+
+# Notifications ----------------------------------------------------------------
+
+@override_settings(NOTIFICATIONS={'QUIET_HOURS': (0, 0), 'DIGEST_SECONDS': 0, 'LEASE_SECONDS': 300})
+class DeliverPendingTests(TestCase):
+    def setUp(self):
+        make_warehouse()
+        self.customer = make_user()
+        self.items = [make_item(self.customer) for _ in range(2)]
+        Notification.objects.bulk_create([
+            notification_for(Item, item.id, self.customer.id, item.tracking_number, ItemStatus.ARRIVED_WAREHOUSE)
+            for item in self.items
+        ])
+
+    def test_sends_one_digest_and_marks_the_rows_sent(self):
+        stats = deliver_pending()
+
+        self.assertEqual((stats['claimed'], stats['sent']), (2, 2))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.customer.email])
+        self.assertFalse(Notification.objects.filter(sent_at__isnull=True).exists())
+        self.assertFalse(Notification.objects.filter(claimed_at__isnull=False).exists())
+        self.assertEqual(deliver_pending()['claimed'], 0)
+
+    def test_sends_after_the_lease_is_stored(self):
+        def send(*args):
+            # What another worker would see while this one talks to SMTP.
+            self.assertEqual(Notification.objects.filter(claimed_at__isnull=True).count(), 0)
+
+        with mock.patch('backend.notifications._send', side_effect=send):
+            self.assertEqual(deliver_pending()['sent'], 2)
+
+    def test_leased_rows_are_skipped_until_the_lease_expires(self):
+        Notification.objects.update(claimed_at=timezone.now())
+        self.assertEqual(deliver_pending()['claimed'], 0)
+
+        Notification.objects.update(claimed_at=timezone.now() - timedelta(seconds=301))
+        self.assertEqual(deliver_pending()['sent'], 2)
+
+    def test_failed_sends_are_retried_later(self):
+        with mock.patch('backend.notifications._send', side_effect=OSError('SMTP down')), \
+                self.assertLogs('backend.notifications', 'ERROR'):
+            self.assertEqual(deliver_pending()['failed'], 2)
+
+        self.assertEqual(set(Notification.objects.values_list('attempts', flat=True)), {1})
+        self.assertFalse(Notification.objects.filter(claimed_at__isnull=False).exists())
+        self.assertFalse(Notification.objects.filter(deliver_after__lte=timezone.now()).exists())
+        self.assertEqual(deliver_pending()['claimed'], 0)
+
+
+# Tracking-code lookup ---------------------------------------------------------
+
+class KnownCodesTests(TestCase):
+    def setUp(self):
+        make_warehouse()
+        # Built in the test thread: `_build` closes its connection.
+        self.known = KnownCodes(capacity=1000, error_rate=0.01, refresh_seconds=0, overlap_seconds=30)
+        self.known._filter = BloomFilter(1000, 0.01)
+        self.known._since = self.known._load(self.known._filter)
+
+    def test_refresh_picks_up_codes_saved_elsewhere(self):
+        # Not added to this filter, as if saved by another process.
+        make_item(make_user(), tracking_number='ELSEWHERE1')
+        self.assertTrue(self.known.might_contain('ELSEWHERE1'))
+        self.assertFalse(self.known.might_contain('NOWHERE1'))
+
+    def test_refresh_queries_without_holding_the_filter_lock(self):
+        previous = self.known._since
+        load = self.known._load
+
+        def checked_load(bloom, changed_since):
+            self.assertEqual(changed_since, previous - timedelta(seconds=30))
+            self.assertTrue(self.known._lock.acquire(blocking=False))
+            self.known._lock.release()
+            return load(bloom, changed_since)
+
+        with mock.patch.object(self.known, '_load', side_effect=checked_load):
+            self.known.refresh()
+        self.assertGreater(self.known._since, previous)
+
+
+# Admin ------------------------------------------------------------------------
+
+class ItemCategoriesTests(TestCase):
+    def setUp(self):
+        make_warehouse()
+        self.customer = make_user()
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_lists_distinct_categories_of_items_without_rollups(self):
+        for category in ('Toys', 'Books', 'Books', '', None):
+            make_item(self.customer, category=category)
+        self.assertEqual(item_categories(), ['Books', 'Toys'])
+
+    def test_categories_are_cached(self):
+        make_item(self.customer, category='Books')
+        item_categories()
+        make_item(self.customer, category='Toys')
+        with self.assertNumQueries(0):
+            self.assertEqual(item_categories(), ['Books'])
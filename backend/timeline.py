@@ -0,0 +1,141 @@
+"""backend.timeline
+
+Status timelines for many entities at once, read from `StatusLog`.
+
+Entities are addressed by refs such as `item:42` or `box:7`. All
+requested refs are fetched with one query that the
+`(entity_type, entity_id, created_at)` index answers: one
+`entity_type = ... AND entity_id IN (...)` branch per entity type.
+
+* `timelines` returns every event, ordered by entity and then
+  chronologically, with keyset pagination over
+  `(entity_type, entity_id, created_at, id)` so long histories are read
+  page by page without `OFFSET`. The cursor is opaque to clients.
+* `latest_statuses` returns the most recent event per entity with
+  `DISTINCT ON` on PostgreSQL and a `ROW_NUMBER()` window elsewhere,
+  instead of one lookup per entity.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from functools import reduce
+from operator import or_
+
+from django.db import connection
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from backend.fast_serializers import FastSerializer
+from backend.models import StatusLog
+from backend.models.enums import EntityType
+from backend.serializers import StatusLogSerializer
+
+MAX_ENTITIES = 500
+DEFAULT_LIMIT = 200
+MAX_LIMIT = 1000
+
+
+def parse_refs(values):
+    """Parse `type:id` refs (comma-separated strings) into unique `(type, id)` pairs.
+
+    Order is preserved; raises ValueError on malformed refs or unknown
+    entity types.
+    """
+    refs = {}
+    for value in values:
+        for ref in value.split(','):
+            ref = ref.strip()
+            if not ref:
+                continue
+            entity_type, _, entity_id = ref.partition(':')
+            if not entity_id:
+                raise ValueError(f"Entity refs look like 'item:42', got '{ref}'")
+            if entity_type not in EntityType.values:
+                raise ValueError(f"Unknown entity type '{entity_type}'")
+            refs[(entity_type, entity_id)] = None
+    if not refs:
+        raise ValueError('At least one entity ref is required')
+    if len(refs) > MAX_ENTITIES:
+        raise ValueError(f'At most {MAX_ENTITIES} entities per request')
+    return list(refs)
+
+
+def _refs_filter(refs):
+    by_type = {}
+    for entity_type, entity_id in refs:
+        by_type.setdefault(entity_type, []).append(entity_id)
+    return reduce(or_, (
+        Q(entity_type=entity_type, entity_id__in=entity_ids)
+        for entity_type, entity_ids in by_type.items()
+    ))
+
+
+def encode_cursor(row):
+    position = [row['entity_type'], row['entity_id'], row['created_at'].isoformat(), row['id']]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def _after_cursor(cursor):
+    """Rows strictly after the cursor in timeline order."""
+    try:
+        entity_type, entity_id, created_at, pk = json.loads(base64.urlsafe_b64decode(cursor))
+        created_at = datetime.fromisoformat(created_at)
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+    same_entity = Q(entity_type=entity_type, entity_id=entity_id)
+    return (
+        Q(entity_type__gt=entity_type)
+        | Q(entity_type=entity_type, entity_id__gt=entity_id)
+        | same_entity & Q(created_at__gt=created_at)
+        | same_entity & Q(created_at=created_at, id__gt=pk)
+    )
+
+
+def timelines(refs, limit=DEFAULT_LIMIT, cursor=None):
+    """Events for `refs`, grouped per entity, and the cursor of the next page.
+
+    Returns `(groups, next_cursor)` where each group is
+    `{'entity_type', 'entity_id', 'events'}`; an entity whose history
+    spans pages appears at the end of one page and the start of the
+    next. `next_cursor` is None on the last page.
+    """
+    limit = max(1, min(limit, MAX_LIMIT))
+    logs = StatusLog.objects.filter(_refs_filter(refs))
+    if cursor:
+        logs = logs.filter(_after_cursor(cursor))
+    serializer = FastSerializer(StatusLogSerializer())
+    rows = list(
+        serializer.values(logs).order_by('entity_type', 'entity_id', 'created_at', 'id')[:limit + 1]
+    )
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+
+    groups = []
+    for event in serializer.serialize(rows[:limit]):
+        key = (event.pop('entity_type'), event.pop('entity_id'))
+        if not groups or (groups[-1]['entity_type'], groups[-1]['entity_id']) != key:
+            groups.append({'entity_type': key[0], 'entity_id': key[1], 'events': []})
+        groups[-1]['events'].append(event)
+    return groups, next_cursor
+
+
+def latest_statuses(refs):
+    """The most recent event of each entity in `refs` that has any, in `refs` order."""
+    logs = StatusLog.objects.filter(_refs_filter(refs))
+    if connection.vendor == 'postgresql':
+        logs = logs.order_by('entity_type', 'entity_id', '-created_at', '-id').distinct(
+            'entity_type', 'entity_id',
+        )
+    else:
+        logs = logs.annotate(position=Window(
+            RowNumber(),
+            partition_by=[F('entity_type'), F('entity_id')],
+            order_by=[F('created_at').desc(), F('id').desc()],
+        )).filter(position=1)
+    serializer = FastSerializer(StatusLogSerializer())
+    latest = {
+        (event['entity_type'], event['entity_id']): event
+        for event in serializer.serialize(serializer.values(logs))
+    }
+    return [latest[ref] for ref in refs if ref in latest]
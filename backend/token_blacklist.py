@@ -0,0 +1,261 @@
+"""backend.token_blacklist
+
+In-process cache in front of simplejwt's `token_blacklist` tables.
+
+Every refresh and logout asks "is this `jti` blacklisted?". `BlacklistCache`
+answers that from memory:
+
+1. A Bloom filter over every blacklisted `jti` answers "not blacklisted"
+   without touching the database. Tokens blacklisted in this process are
+   added immediately; ones blacklisted by other workers are picked up by
+   an incremental sync (one primary-key range query) at most every
+   `SYNC_SECONDS` before a negative answer is trusted. Ids are handed out
+   before commit, so a row can become visible after a higher id was
+   already synced; each sync re-reads from the high-water mark of the
+   last sync at least `SYNC_OVERLAP_SECONDS` old to pick such rows up.
+   There is no such sync for that long after the filter is built, so
+   until then a negative answer is confirmed in the database.
+2. A bounded TTL map of recently blacklisted `jti -> expiry` confirms a
+   positive answer. Entries leave the map when the token expires, since
+   an expired token is rejected before the blacklist is consulted.
+3. Only a Bloom hit missing from the map (an old entry or a false
+   positive) falls through to the database.
+
+The filter is built in a background thread when the first request
+arrives (see `BackendConfig.ready`); until it is ready every check
+queries the database. `purge_expired()` (the `purge_tokens` command) keeps the tables
+bounded.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from backend.authentication import RoleClaimsRefreshToken
+from backend.lookup import BloomFilter
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'FILTER_CAPACITY': 1000000,
+    'FILTER_ERROR_RATE': 0.001,
+    'RECENT_SIZE': 50000,
+    'SYNC_SECONDS': 2,
+    'SYNC_OVERLAP_SECONDS': 60,
+}
+
+
+def blacklist_settings():
+    return {**DEFAULTS, **getattr(settings, 'TOKEN_BLACKLIST_CACHE', {})}
+
+
+class BlacklistCache:
+    """Bloom filter plus TTL map of blacklisted token ids."""
+
+    def __init__(self, capacity, error_rate, recent_size, sync_seconds, overlap_seconds=60):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.recent_size = recent_size
+        self.sync_seconds = sync_seconds
+        self.overlap_seconds = overlap_seconds
+        self._filter = None
+        self._recent = OrderedDict()
+        self._high_water = 0
+        # (monotonic time a load started, high-water mark it reached)
+        self._marks = deque()
+        self._synced_at = 0.0
+        self._exact_until = 0.0
+        self._pending = []
+        self._building = False
+        self._lock = threading.Lock()
+
+    def add(self, jti, expires_at):
+        """Record a token blacklisted by this process."""
+        with self._lock:
+            if self._building:
+                self._pending.append(jti)
+            if self._filter is not None:
+                self._filter.add(jti)
+            self._remember(jti, expires_at)
+
+    def is_blacklisted(self, jti):
+        bloom = self._filter
+        if bloom is None:
+            self.warm()
+            return self._query(jti)
+        if jti not in bloom:
+            if time.monotonic() < self._exact_until:
+                return self._query(jti)
+            if time.monotonic() - self._synced_at <= self.sync_seconds:
+                return False
+            self.sync()
+            if jti not in self._filter:
+                return False
+        with self._lock:
+            expires_at = self._recent.get(jti)
+        if expires_at is not None and expires_at > time.time():
+            return True
+        return self._query(jti)
+
+    def warm(self):
+        """Start building the filter in the background if not built yet."""
+        with self._lock:
+            if self._filter is not None or self._building:
+                return
+            self._building = True
+        threading.Thread(target=self._build, name='token-blacklist', daemon=True).start()
+
+    def sync(self):
+        """Add tokens blacklisted by other processes since the last sync."""
+        with self._lock:
+            started = time.monotonic()
+            if started - self._synced_at <= self.sync_seconds:
+                return
+            high_water, loaded = self._load(self._filter, self._rescan_from(started))
+            self._high_water = max(self._high_water, high_water)
+            self._marks.append((started, self._high_water))
+            for jti, expires_at in loaded:
+                self._remember(jti, expires_at)
+            self._synced_at = time.monotonic()
+            if self._filter.count > self.capacity and not self._building:
+                # Past capacity the false-positive rate climbs; rebuild larger
+                # (the rebuild also drops tokens that have expired since).
+                self.capacity *= 2
+                self._building = True
+                threading.Thread(target=self._build, name='token-blacklist', daemon=True).start()
+
+    def _build(self):
+        try:
+            bloom = BloomFilter(self.capacity, self.error_rate)
+            started = time.monotonic()
+            high_water, loaded = self._load(bloom, 0)
+            with self._lock:
+                for jti in self._pending:
+                    bloom.add(jti)
+                for jti, expires_at in loaded:
+                    self._remember(jti, expires_at)
+                self._filter = bloom
+                # Rows in flight during the build may commit below its mark.
+                self._high_water = high_water
+                self._marks = deque([(started, high_water)])
+                self._exact_until = started + self.overlap_seconds
+                self._synced_at = time.monotonic()
+        except Exception:
+            logger.exception('Failed to build the token blacklist filter')
+        finally:
+            with self._lock:
+                self._pending = []
+                self._building = False
+            connection.close()
+
+    def _rescan_from(self, now):
+        """High-water mark of the newest load started `overlap_seconds` ago.
+
+        An id issued after that load began is above its mark, so as long
+        as blacklisting transactions commit within the overlap, no row is
+        missed. Until such a load exists (misses are then checked in the
+        database), re-read from the oldest mark.
+        """
+        marks = self._marks
+        cutoff = now - self.overlap_seconds
+        while len(marks) > 1 and marks[1][0] <= cutoff:
+            marks.popleft()
+        return marks[0][1] if marks else self._high_water
+
+    def _load(self, bloom, high_water):
+        """Add unexpired blacklist rows past `high_water` to `bloom`.
+
+        Returns the new high-water mark and the most recent rows as
+        `(jti, expiry timestamp)` pairs for the TTL map.
+        """
+        loaded = deque(maxlen=self.recent_size)
+        rows = (
+            BlacklistedToken.objects.filter(id__gt=high_water, token__expires_at__gt=timezone.now())
+            .order_by('id')
+            .values_list('id', 'token__jti', 'token__expires_at')
+            .iterator(chunk_size=10000)
+        )
+        for pk, jti, expires_at in rows:
+            bloom.add(jti)
+            loaded.append((jti, expires_at.timestamp()))
+            high_water = pk
+        return high_water, loaded
+
+    def _remember(self, jti, expires_at):
+        recent = self._recent
+        recent[jti] = expires_at
+        recent.move_to_end(jti)
+        now = time.time()
+        while recent and (len(recent) > self.recent_size or next(iter(recent.values())) <= now):
+            recent.popitem(last=False)
+
+    def _query(self, jti):
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the process-wide blacklist cache, creating it on first use."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            options = blacklist_settings()
+            _cache = BlacklistCache(
+                options['FILTER_CAPACITY'],
+                options['FILTER_ERROR_RATE'],
+                options['RECENT_SIZE'],
+                options['SYNC_SECONDS'],
+                options['SYNC_OVERLAP_SECONDS'],
+            )
+        return _cache
+
+
+def warm_on_first_request(sender, **kwargs):
+    """`request_started` receiver that starts the filter build once."""
+    request_started.disconnect(warm_on_first_request)
+    get_cache().warm()
+
+
+class CachedBlacklistRefreshToken(RoleClaimsRefreshToken):
+    """Refresh token that checks and updates the blacklist through the cache."""
+
+    def check_blacklist(self):
+        if get_cache().is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError('Token is blacklisted')
+
+    def blacklist(self):
+        blacklisted = super().blacklist()
+        get_cache().add(self.payload[api_settings.JTI_CLAIM], self.payload['exp'])
+        return blacklisted
+
+
+def purge_expired(chunk_size=5000):
+    """Delete expired outstanding tokens (and their blacklist rows) in chunks.
+
+    Each chunk is its own short transaction, so the purge never holds
+    long locks on the tables refresh and logout write to. Returns
+    `(outstanding, blacklisted)` deleted counts.
+    """
+    outstanding = blacklisted = 0
+    now = timezone.now()
+    expired = OutstandingToken.objects.filter(expires_at__lte=now).order_by('expires_at')
+    while True:
+        ids = list(expired.values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            return outstanding, blacklisted
+        with transaction.atomic():
+            _, deleted = OutstandingToken.objects.filter(id__in=ids).delete()
+        outstanding += deleted.get(OutstandingToken._meta.label, 0)
+        blacklisted += deleted.get(BlacklistedToken._meta.label, 0)
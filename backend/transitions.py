@@ -0,0 +1,294 @@
+"""backend.transitions
+
+Status state machines for items, boxes, marketplace orders and domestic
+orders, and a set-based way to move rows between states.
+
+`TRANSITIONS` declares, per model, which statuses each status may move
+to. `transition(queryset, to_status, by=user)` applies one such move to
+every row of a queryset at once:
+
+1. one `SELECT ... FOR UPDATE` reads and locks the current statuses
+   (in primary-key order, so overlapping moves queue instead of
+   deadlocking),
+2. one `UPDATE ... WHERE id IN (...) AND status IN (allowed
+   predecessors)` moves the accepted rows,
+3. one `StatusLog` bulk insert records them,
+
+followed by the counter, version and lookup-cache maintenance that
+`QuerySet.update()` would otherwise skip, and the customer notifications
+(queued in `backend.notifications`' outbox). Rows whose current status
+cannot reach `to_status` (including rows already in it) are left alone
+and reported back. On SQLite the `UPDATE` and `INSERT` are split into
+batches that fit its parameter limit; PostgreSQL runs each as a single
+statement.
+
+Moving boxes to a status in `BOX_ITEM_CASCADE` also moves the items
+packed in them (through `BoxItem`), in the same transaction and without
+loading the items: see `cascade_box_items`.
+
+Plain `save()` calls are not checked against the state machine; code
+that changes statuses should go through `transition`.
+"""
+
+from collections import Counter, namedtuple
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from backend import live, lookup, notifications
+from backend.counters import COUNTED_MODELS, apply_deltas, apply_transition
+from backend.models import (
+    BoxItem, DomesticOrder, InternationalBox, InternationalOrder, Item, StatusLog,
+)
+from backend.models.enums import (
+    BoxStatus, CounterEntity, DomesticOrderStatus, EntityType, ItemStatus, SourceOrderStatus,
+)
+from backend.versions import VERSIONED_MODELS, bump
+
+# model -> {status: statuses it may move to}
+TRANSITIONS = {
+    Item: {
+        ItemStatus.AWAITING_ARRIVAL: {ItemStatus.ARRIVED_WAREHOUSE, ItemStatus.MISMATCHED},
+        ItemStatus.ARRIVED_WAREHOUSE: {
+            ItemStatus.VALIDATED, ItemStatus.MISMATCHED, ItemStatus.RETURNED,
+        },
+        ItemStatus.MISMATCHED: {
+            ItemStatus.ARRIVED_WAREHOUSE, ItemStatus.VALIDATED,
+            ItemStatus.RETURNED, ItemStatus.REFUNDED,
+        },
+        ItemStatus.VALIDATED: {ItemStatus.IN_BOX, ItemStatus.RETURNED},
+        ItemStatus.IN_BOX: {ItemStatus.VALIDATED, ItemStatus.SHIPPED},
+        ItemStatus.SHIPPED: {ItemStatus.IN_TRANSIT},
+        ItemStatus.IN_TRANSIT: {ItemStatus.ARRIVED_DESTINATION_WAREHOUSE, ItemStatus.AT_CUSTOMS},
+        ItemStatus.ARRIVED_DESTINATION_WAREHOUSE: {
+            ItemStatus.AT_CUSTOMS, ItemStatus.OUT_FOR_DELIVERY,
+        },
+        ItemStatus.AT_CUSTOMS: {ItemStatus.RELEASED_CUSTOMS, ItemStatus.RETURNED},
+        ItemStatus.RELEASED_CUSTOMS: {
+            ItemStatus.ARRIVED_DESTINATION_WAREHOUSE, ItemStatus.OUT_FOR_DELIVERY,
+        },
+        ItemStatus.OUT_FOR_DELIVERY: {ItemStatus.DELIVERED, ItemStatus.RETURNED},
+        ItemStatus.DELIVERED: {ItemStatus.RETURNED},
+        ItemStatus.RETURNED: {ItemStatus.REFUNDED},
+        ItemStatus.REFUNDED: set(),
+    },
+    InternationalBox: {
+        BoxStatus.BUILDING: {BoxStatus.READY_TO_SHIP},
+        BoxStatus.READY_TO_SHIP: {BoxStatus.BUILDING, BoxStatus.SHIPPED},
+        BoxStatus.SHIPPED: {BoxStatus.IN_TRANSIT},
+        BoxStatus.IN_TRANSIT: {BoxStatus.ARRIVED, BoxStatus.AT_CUSTOMS},
+        BoxStatus.ARRIVED: {BoxStatus.AT_CUSTOMS, BoxStatus.OUT_FOR_DELIVERY},
+        BoxStatus.AT_CUSTOMS: {BoxStatus.RELEASED_CUSTOMS, BoxStatus.RETURNED},
+        BoxStatus.RELEASED_CUSTOMS: {BoxStatus.ARRIVED, BoxStatus.OUT_FOR_DELIVERY},
+        BoxStatus.OUT_FOR_DELIVERY: {BoxStatus.DELIVERED, BoxStatus.RETURNED},
+        BoxStatus.DELIVERED: {BoxStatus.RETURNED},
+        BoxStatus.RETURNED: {BoxStatus.REFUNDED},
+        BoxStatus.REFUNDED: set(),
+    },
+    InternationalOrder: {
+        SourceOrderStatus.PLACED: {
+            SourceOrderStatus.SHIPPED_TO_WAREHOUSE, SourceOrderStatus.ARRIVED_WAREHOUSE,
+            SourceOrderStatus.CANCELLED,
+        },
+        SourceOrderStatus.SHIPPED_TO_WAREHOUSE: {
+            SourceOrderStatus.ARRIVED_WAREHOUSE, SourceOrderStatus.CANCELLED,
+        },
+        SourceOrderStatus.ARRIVED_WAREHOUSE: {SourceOrderStatus.REFUNDED},
+        SourceOrderStatus.CANCELLED: {SourceOrderStatus.REFUNDED},
+        SourceOrderStatus.REFUNDED: set(),
+    },
+    DomesticOrder: {
+        DomesticOrderStatus.CART: {DomesticOrderStatus.PLACED},
+        DomesticOrderStatus.PLACED: {DomesticOrderStatus.OUT_FOR_DELIVERY},
+        # A failed delivery attempt goes back to the dispatch queue.
+        DomesticOrderStatus.OUT_FOR_DELIVERY: {
+            DomesticOrderStatus.DELIVERED, DomesticOrderStatus.PLACED,
+        },
+        DomesticOrderStatus.DELIVERED: set(),
+    },
+}
+
+STATUS_LOG_ENTITIES = {
+    Item: EntityType.ITEM,
+    InternationalBox: EntityType.BOX,
+    InternationalOrder: EntityType.ORDER,
+    DomesticOrder: EntityType.DOMESTIC_ORDER,
+}
+
+# box status -> (item status, item statuses that follow the box into it).
+# Items follow their box along its journey even where the box skips a
+# step the item machine has (arrived, out for delivery); items that were
+# pulled out of the flow (returned, refunded, mismatched) stay put.
+_IN_BOX_JOURNEY = (
+    ItemStatus.IN_BOX, ItemStatus.SHIPPED, ItemStatus.IN_TRANSIT,
+    ItemStatus.ARRIVED_DESTINATION_WAREHOUSE,
+)
+BOX_ITEM_CASCADE = {
+    BoxStatus.SHIPPED: (ItemStatus.SHIPPED, {ItemStatus.IN_BOX}),
+    BoxStatus.IN_TRANSIT: (ItemStatus.IN_TRANSIT, {ItemStatus.IN_BOX, ItemStatus.SHIPPED}),
+    BoxStatus.AT_CUSTOMS: (ItemStatus.AT_CUSTOMS, set(_IN_BOX_JOURNEY)),
+    BoxStatus.DELIVERED: (ItemStatus.DELIVERED, {
+        *_IN_BOX_JOURNEY, ItemStatus.AT_CUSTOMS, ItemStatus.RELEASED_CUSTOMS,
+        ItemStatus.OUT_FOR_DELIVERY,
+    }),
+}
+
+TransitionResult = namedtuple('TransitionResult', ['changed', 'rejected', 'cascaded'])
+TransitionResult.__doc__ = """Outcome of `transition`.
+
+`changed` lists the primary keys moved to the new status; `rejected`
+maps each other primary key to the status that blocked the move;
+`cascaded` lists the item primary keys that followed moved boxes.
+"""
+
+
+def predecessors(model, to_status):
+    """Statuses of `model` from which `to_status` can be reached."""
+    edges = TRANSITIONS[model]
+    if to_status not in edges:
+        raise ValueError(f"Unknown {model.__name__} status '{to_status}'")
+    return {status for status, targets in edges.items() if to_status in targets}
+
+
+def can_transition(model, from_status, to_status):
+    return to_status in TRANSITIONS[model].get(from_status, ())
+
+
+def transition(queryset, to_status, by=None, note=None):
+    """Move every row of `queryset` to `to_status` where the state machine allows it.
+
+    Returns a `TransitionResult`. Runs in one transaction; rows are
+    locked while they are checked so the logged and counted previous
+    statuses are exact.
+    """
+    model = queryset.model
+    allowed = predecessors(model, to_status)
+    entity, field = COUNTED_MODELS[model]
+    user_id = getattr(by, 'pk', None)
+
+    with transaction.atomic():
+        # Lock in primary-key order so overlapping moves cannot deadlock.
+        current = list(
+            queryset.order_by('pk').select_for_update(of=('self',)).values_list('pk', field)
+        )
+        changed = [pk for pk, status in current if status in allowed]
+        rejected = {pk: status for pk, status in current if status not in allowed}
+        if not changed:
+            return TransitionResult([], rejected, [])
+
+        # Leave room for the SET value and the predecessor list.
+        max_params = connection.features.max_query_params
+        batch_size = max_params - len(allowed) - 1 if max_params else len(changed)
+        for start in range(0, len(changed), batch_size):
+            model.objects.filter(
+                pk__in=changed[start:start + batch_size], **{f'{field}__in': allowed},
+            ).update(**{field: to_status})
+        StatusLog.objects.bulk_create([
+            StatusLog(entity_type=STATUS_LOG_ENTITIES[model], entity_id=str(pk),
+                      status=to_status, note=note, changed_by_id=user_id)
+            for pk in changed
+        ])
+        notifications.enqueue(model, changed, to_status)
+        live.publish_status(model, changed, to_status)
+        apply_transition(entity, [status for _, status in current if status in allowed], to_status)
+        if model in VERSIONED_MODELS:
+            bump(*VERSIONED_MODELS[model])
+        cascaded = []
+        if model is InternationalBox and to_status in BOX_ITEM_CASCADE:
+            cascaded = cascade_box_items(changed, to_status, by=by, note=note)
+
+    if model in lookup.CODE_SOURCES:
+        lookup.invalidate(lookup.CODE_SOURCES[model][0], changed)
+    return TransitionResult(changed, rejected, cascaded)
+
+
+# Box to item cascade ----------------------------------------------------------
+
+_CASCADE_POSTGRES = """
+WITH moved AS (
+    UPDATE {items} SET status = %s
+    FROM (
+        SELECT i.id, i.status
+        FROM {items} i JOIN {box_items} bi ON bi.item_id = i.id
+        WHERE bi.box_id = ANY(%s) AND i.status = ANY(%s)
+        ORDER BY i.id
+        FOR UPDATE OF i
+    ) AS previous
+    WHERE {items}.id = previous.id
+    RETURNING {items}.id, previous.status
+), logged AS (
+    INSERT INTO {status_logs} (entity_type, entity_id, status, note, changed_by_id, created_at)
+    SELECT %s, id::text, %s, %s, %s, %s FROM moved
+)
+SELECT id, status FROM moved
+"""
+
+
+def _cascade_postgres(cursor, tables, box_ids, item_status, from_statuses, log):
+    cursor.execute(
+        _CASCADE_POSTGRES.format(**tables),
+        [item_status, box_ids, list(from_statuses), *log],
+    )
+    return cursor.fetchall()
+
+
+def _cascade_generic(cursor, tables, box_ids, item_status, from_statuses, log):
+    # The box UPDATE earlier in the transaction already holds SQLite's
+    # write lock, so the three statements see the same rows.
+    max_params = connection.features.max_query_params
+    batch_size = max_params - len(from_statuses) - len(log) if max_params else len(box_ids)
+    statuses = ', '.join(['%s'] * len(from_statuses))
+    moved = []
+    for start in range(0, len(box_ids), batch_size):
+        batch = box_ids[start:start + batch_size]
+        where = (
+            f"status IN ({statuses}) AND id IN (SELECT item_id FROM {tables['box_items']} "
+            f"WHERE box_id IN ({', '.join(['%s'] * len(batch))}))"
+        )
+        params = [*from_statuses, *batch]
+        cursor.execute(f"SELECT id, status FROM {tables['items']} WHERE {where}", params)
+        moved.extend(cursor.fetchall())
+        cursor.execute(
+            f"INSERT INTO {tables['status_logs']} "
+            '(entity_type, entity_id, status, note, changed_by_id, created_at) '
+            f"SELECT %s, CAST(id AS TEXT), %s, %s, %s, %s FROM {tables['items']} WHERE {where}",
+            [*log, *params],
+        )
+        cursor.execute(f"UPDATE {tables['items']} SET status = %s WHERE {where}", [item_status, *params])
+    return moved
+
+
+def cascade_box_items(box_ids, box_status, by=None, note=None):
+    """Move the items packed in `box_ids` after their boxes moved to `box_status`.
+
+    One joined `UPDATE` (items x box_items) moves every item whose status
+    is in the cascade's source set, and the matching `StatusLog` rows are
+    inserted straight from the updated rows; item rows never reach
+    Python beyond their ids and previous statuses, which feed the
+    counters. Must run inside the box transition's transaction. Returns
+    the moved item ids.
+    """
+    item_status, from_statuses = BOX_ITEM_CASCADE[box_status]
+    tables = {
+        'items': connection.ops.quote_name(Item._meta.db_table),
+        'box_items': connection.ops.quote_name(BoxItem._meta.db_table),
+        'status_logs': connection.ops.quote_name(StatusLog._meta.db_table),
+    }
+    log = [
+        EntityType.ITEM, item_status, note or f'Box moved to {box_status}',
+        getattr(by, 'pk', None), connection.ops.adapt_datetimefield_value(timezone.now()),
+    ]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            moved = _cascade_postgres(cursor, tables, list(box_ids), item_status, from_statuses, log)
+        else:
+            moved = _cascade_generic(cursor, tables, list(box_ids), item_status, from_statuses, log)
+    apply_deltas(CounterEntity.ITEM, Counter({
+        **{status: -count for status, count in Counter(status for _, status in moved).items()},
+        item_status: len(moved),
+    }))
+    item_ids = [pk for pk, _ in moved]
+    notifications.enqueue(Item, item_ids, item_status)
+    live.publish_status(Item, item_ids, item_status)
+    transaction.on_commit(lambda: lookup.invalidate(lookup.CODE_SOURCES[Item][0], item_ids))
+    return item_ids
@@ -7,7 +7,7 @@ Add new routes here and include this module from the project `urls.py`.
 """
 
 from django.urls import path
-from .views import api_views, auth_views
+from .views import api_views, auth_views, live_views
 
 urlpatterns = [
     #Auth Endpoints
@@ -21,7 +21,20 @@ urlpatterns = [
 
     #path('api/admin/', api_views.admins_list, name='api_admins'),
     path('api/stats/', api_views.dashboard_stats, name='api_stats'),
+    path('api/statistics/', api_views.statistics_view, name='api_statistics'),
+    path('api/db/connections/', api_views.db_connections_view, name='api_db_connections'),
     path('api/boxes/', api_views.international_boxes, name='api_boxes'),
     path('api/items/', api_views.items_list, name='api_items'),
     path('api/customers/', api_views.customers_list, name='api_customers'),
+    path('api/customers/import/', api_views.customers_import, name='api_customers_import'),
+    path('api/lookup/<str:code>/', api_views.lookup_code, name='api_lookup'),
+    path('api/search/', api_views.search_view, name='api_search'),
+    path('api/timeline/', api_views.timeline_view, name='api_timeline'),
+    path('api/scans/batch/', api_views.batch_scans, name='api_scans_batch'),
+    path('api/packing/plan/', api_views.packing_plan, name='api_packing_plan'),
+    path('api/packing/apply/', api_views.packing_apply, name='api_packing_apply'),
+    path('api/exports/<str:dataset>/', api_views.export_view, name='api_export'),
+    path('api/notifications/', api_views.notifications_view, name='api_notifications'),
+    path('api/notifications/read/', api_views.notifications_mark_read, name='api_notifications_read'),
+    path('api/live/', live_views.live_events, name='api_live'),
 ]
\ No newline at end of file
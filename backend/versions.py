@@ -0,0 +1,138 @@
+"""backend.versions
+
+Conditional GET support for endpoints the dashboard re-fetches often.
+
+Each cached collection has a `CollectionVersion` row that is bumped after
+any write that changes what the endpoint returns: model saves and deletes
+through the signals in `backend.models.signals`, counter changes through
+`backend.counters`, and bulk paths (`bulk_create`, `QuerySet.update()`)
+by calling `bump()` themselves. Bumps run once the writing transaction
+commits, so a client can never cache old data under a new version.
+
+`versioned()` wraps a view with Django's `condition()`: the ETag is built
+from the collection versions plus the request path and query string, so
+an unchanged collection answers `304 Not Modified` after one indexed read,
+without running the view's query or serializer.
+"""
+
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from backend.models import CollectionVersion, InternationalBox, User, Warehouse
+
+BOXES = 'boxes'
+CUSTOMERS = 'customers'
+STATS = 'stats'
+
+# model -> collections whose responses include its rows
+VERSIONED_MODELS = {
+    InternationalBox: (BOXES,),
+    Warehouse: (BOXES,),
+    User: (CUSTOMERS,),
+}
+
+
+def user_key(pk):
+    """Collection name for a single user's profile."""
+    return f'user:{pk}'
+
+
+def bump(*names, using=None):
+    """Mark collections as changed once the current transaction commits."""
+    names = sorted(set(names))
+    transaction.on_commit(lambda: _increment(names, using), using=using)
+
+
+def _increment(names, using=None):
+    now = timezone.now()
+    versions = CollectionVersion.objects.db_manager(using)
+    for name in names:
+        stamp = versions.filter(name=name)
+        if not stamp.update(version=F('version') + 1, updated_at=now):
+            _, created = versions.get_or_create(name=name, defaults={'version': 1, 'updated_at': now})
+            if not created:
+                stamp.update(version=F('version') + 1, updated_at=now)
+
+
+def read_stamps(names):
+    """Return `{name: (version, updated_at)}`; missing names are absent."""
+    return {
+        name: (version, updated_at)
+        for name, version, updated_at in CollectionVersion.objects.filter(
+            name__in=names
+        ).values_list('name', 'version', 'updated_at')
+    }
+
+
+async def aread_stamps(names):
+    """`read_stamps` for async views."""
+    return {
+        name: (version, updated_at)
+        async for name, version, updated_at in CollectionVersion.objects.filter(
+            name__in=names
+        ).values_list('name', 'version', 'updated_at')
+    }
+
+
+def versioned(*names, per_user=False):
+    """Decorate a GET view with an ETag/Last-Modified from collection versions.
+
+    `per_user` adds the requesting user's own version (for profile views).
+    Use below `@api_view` (or `async_api_view` for an async view), so
+    authentication and permissions run first.
+    """
+    def keys_for(request):
+        keys = list(names)
+        if per_user:
+            keys.append(user_key(request.user.pk))
+        return keys
+
+    def stamps_for(request):
+        keys = keys_for(request)
+        cached = getattr(request, '_collection_stamps', None)
+        if cached is None or cached[0] != keys:
+            cached = (keys, read_stamps(keys))
+            request._collection_stamps = cached
+        return cached
+
+    def etag(request, *args, **kwargs):
+        keys, stamps = stamps_for(request)
+        versions = '-'.join(f'{key}.{stamps.get(key, (0,))[0]}' for key in keys)
+        digest = hashlib.blake2b(request.get_full_path().encode(), digest_size=8).hexdigest()
+        return f'"{versions}-{digest}"'
+
+    def last_modified(request, *args, **kwargs):
+        _, stamps = stamps_for(request)
+        return max((updated_at for _, updated_at in stamps.values()), default=None)
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                # `condition()` calls the ETag functions synchronously; read
+                # the stamps first so they are answered from the request.
+                keys = keys_for(request)
+                request._collection_stamps = (keys, await aread_stamps(keys))
+                response = await conditional_view(request, *args, **kwargs)
+                patch_cache_control(response, private=True, no_cache=True)
+                return response
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            # Responses depend on the caller's token: keep them out of shared
+            # caches and make browsers revalidate on every use.
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
@@ -3,16 +3,46 @@
 API endpoints implemented with Django REST Framework. These views
 return JSON responses and are intended to be wired behind the app
 `urls.py` (see `backend/urls.py`). Prefer viewsets and routers for
-larger APIs; function-based views are used here for simplicity.
+larger APIs; function-based views are used here for simplicity. The hot
+read endpoints are async (`backend.async_api`) so they do not hold a
+thread under ASGI.
 """
 
+from datetime import date, timedelta
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import BasePermission
+from rest_framework.permissions import BasePermission, IsAuthenticated
 from rest_framework.response import Response
-from backend.models import InternationalBox, Item, User
-from backend.models.enums import BoxStatus, UserRole
-from backend.serializers import InternationalBoxSerializer, CustomerSerializer
-from backend.views.auth_views import IsAdminOrSuperAdmin
+from backend.models import InternationalBox, Item, Notification, User, Warehouse
+from backend.async_api import async_api_view
+from backend.counters import aread_counters
+from backend.customer_import import import_customers, parse_rows
+from backend.db_metrics import connection_stats
+from backend.db_routing import replica_alias, replica_view, unpinned_writes
+from backend.models.enums import BoxStatus, CounterEntity, ItemStatus, SourceOrderStatus, UserRole
+from backend.exports import EXPORT_DATASETS, EXPORT_FORMATS, aexport_chunks, export_chunks, export_filename
+from backend.fast_serializers import FastSerializer
+from backend.fieldsets import sparse_fieldset
+from backend.filters import filter_boxes, filter_items
+from backend.lookup import aresolve_code
+from backend.packing import (
+    DEFAULT_MAX_ITEMS, DEFAULT_MAX_WEIGHT_KG, StalePlanError, apply_plan, plan_warehouse,
+)
+from backend.pagination import IdCursorPagination
+from backend.reports import report, report_settings, update_rollups
+from backend.scans import MAX_BATCH_SIZE, ingest_scans
+from backend.search import DEFAULT_LIMIT as DEFAULT_SEARCH_LIMIT, SEARCH_TYPES, search
+from backend.serializers import (
+    InternationalBoxSerializer, CustomerSerializer, ItemSerializer, NotificationSerializer,
+    PlannedBoxSerializer, ScanSerializer,
+)
+from backend.timeline import DEFAULT_LIMIT as DEFAULT_TIMELINE_LIMIT, latest_statuses, parse_refs, timelines
+from backend.versions import BOXES, CUSTOMERS, STATS, versioned
+from backend.views.auth_views import IsAdminOrSuperAdmin, IsEmployee
 
 
 # Django URL life cycle:
@@ -21,45 +51,376 @@ from backend.views.auth_views import IsAdminOrSuperAdmin
 # 3. Django View → processes request, queries database
 # 4. Django Response → returns JSON data
 
-@api_view(['GET'])
-def dashboard_stats(request):
+def _breakdown(counts, choices):
+    """Counts for every status in `choices`, including empty ones."""
+    return {value: counts.get(value, 0) for value in choices.values}
+
+@async_api_view(['GET'])
+@versioned(STATS)
+async def dashboard_stats(request):
+    """Dashboard totals read from the maintained status counters."""
+    counters = await aread_counters()
+    boxes = _breakdown(counters.get(CounterEntity.BOX, {}), BoxStatus)
+    items = _breakdown(counters.get(CounterEntity.ITEM, {}), ItemStatus)
+    orders = _breakdown(counters.get(CounterEntity.ORDER, {}), SourceOrderStatus)
+    domestic_orders = counters.get(CounterEntity.DOMESTIC_ORDER, {})
+    users = counters.get(CounterEntity.USER, {})
+
     stats = {
-        'total_boxes': InternationalBox.objects.count(),
-        'boxes_in_transit': InternationalBox.objects.filter(status=BoxStatus.IN_TRANSIT).count(),
-        'total_customers': User.objects.filter(role=UserRole.CUSTOMER).count(),
+        'total_boxes': sum(boxes.values()),
+        'boxes_in_transit': boxes[BoxStatus.IN_TRANSIT],
+        'total_customers': users.get(UserRole.CUSTOMER, 0),
+        'total_items': sum(items.values()),
+        'total_orders': sum(orders.values()),
+        'total_domestic_orders': sum(domestic_orders.values()),
+        'boxes_by_status': boxes,
+        'items_by_status': items,
+        'orders_by_status': orders,
+        'domestic_orders_by_status': domestic_orders,
     }
     return Response(stats)
 
+@async_api_view(['GET'])
+@replica_view
+@versioned(BOXES)
+async def international_boxes(request):
+    """Cursor-paginated boxes, filterable by status, warehouse and destination.
+
+    Supports `?fields=` / `?expand=` (see `backend.fieldsets`).
+    """
+    boxes = filter_boxes(InternationalBox.objects.all(), request.query_params)
+    boxes, fieldset = sparse_fieldset(boxes, InternationalBoxSerializer, request.query_params)
+    serializer = FastSerializer(InternationalBoxSerializer, **fieldset)
+    paginator = IdCursorPagination()
+    page = await paginator.apaginate_queryset(serializer.values(boxes), request)
+    return paginator.get_paginated_response(serializer.serialize(page))
+
+@async_api_view(['GET'])
+@replica_view
+@versioned(CUSTOMERS)
+async def customers_list(request):
+    """Cursor-paginated customer accounts; supports `?fields=`."""
+    customers = User.objects.filter(role=UserRole.CUSTOMER)
+    customers, fieldset = sparse_fieldset(customers, CustomerSerializer, request.query_params)
+    serializer = FastSerializer(CustomerSerializer, **fieldset)
+    paginator = IdCursorPagination()
+    page = await paginator.apaginate_queryset(serializer.values(customers), request)
+    return paginator.get_paginated_response(serializer.serialize(page))
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsAdminOrSuperAdmin])
+def customers_import(request):
+    """Bulk-import customers and provision their lockers.
+
+    Accepts a multipart `file` upload (`.csv` or `.json`) or a JSON body
+    `{"customers": [...]}`. `?dry_run=1` validates without writing.
+    Rows must carry `password_hash` (or no password); plaintext passwords
+    are only hashed by the `import_customers` management command.
+    """
+    upload = request.FILES.get('file')
+    try:
+        if upload is not None:
+            file_format = upload.name.rsplit('.', 1)[-1].lower()
+            rows = parse_rows(upload.read().decode('utf-8-sig'), file_format)
+        else:
+            rows = request.data.get('customers')
+            if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+                raise ValueError('customers must be a list of objects')
+    except (UnicodeDecodeError, ValueError) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    dry_run = request.query_params.get('dry_run') in ('1', 'true')
+    summary = import_customers(rows, dry_run=dry_run)
+    return Response(summary, status=status.HTTP_200_OK if dry_run else status.HTTP_201_CREATED)
+
+@async_api_view(['GET'])
+@replica_view
+async def items_list(request):
+    """Cursor-paginated items with server-side filters (see `filter_items`).
+
+    Supports `?fields=` (see `backend.fieldsets`).
+    """
+    items = filter_items(Item.objects.all(), request.query_params)
+    items, fieldset = sparse_fieldset(items, ItemSerializer, request.query_params)
+    serializer = FastSerializer(ItemSerializer, **fieldset)
+    paginator = IdCursorPagination()
+    page = await paginator.apaginate_queryset(serializer.values(items), request)
+    return paginator.get_paginated_response(serializer.serialize(page))
+
 @api_view(['GET'])
-def international_boxes(request):
-    boxes = InternationalBox.objects.select_related('warehouse').all()
-    serializer = InternationalBoxSerializer(boxes, many=True)
-    return Response(serializer.data)
+@permission_classes([IsAuthenticated, IsAdminOrSuperAdmin])
+def export_view(request, dataset):
+    """Stream a full dump of `items`, `boxes` or `status_logs`.
+
+    Query params: `output` (`ndjson` or `csv`, default `ndjson`) and
+    `gzip=1`. Item and box exports accept the same filters as their list
+    endpoints. Rows are streamed from a DB cursor, so memory use is flat
+    and the first bytes go out before the query finishes; under ASGI the
+    response iterates asynchronously so Django does not buffer it.
+    """
+    if dataset not in EXPORT_DATASETS:
+        return Response({'error': f"Unknown dataset '{dataset}'"}, status=status.HTTP_404_NOT_FOUND)
+    output = request.query_params.get('output', 'ndjson')
+    if output not in EXPORT_FORMATS:
+        return Response(
+            {'error': f"output must be one of: {', '.join(EXPORT_FORMATS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    compress = request.query_params.get('gzip') in ('1', 'true')
+
+    model, _ = EXPORT_DATASETS[dataset]
+    queryset = model.objects.using(replica_alias(request.user))
+    if dataset == 'items':
+        queryset = filter_items(queryset, request.query_params)
+    elif dataset == 'boxes':
+        queryset = filter_boxes(queryset, request.query_params)
+
+    chunks = aexport_chunks if isinstance(request._request, ASGIRequest) else export_chunks
+    response = StreamingHttpResponse(
+        chunks(dataset, output, compress, queryset),
+        content_type='application/gzip' if compress else EXPORT_FORMATS[output],
+    )
+    filename = export_filename(dataset, output, compress)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@async_api_view(['GET'], permission_classes=[IsAuthenticated, IsEmployee])
+async def lookup_code(request, code):
+    """Resolve a scanned code to items, boxes, shipment labels or lockers."""
+    matches = await aresolve_code(code)
+    if not matches:
+        return Response({'code': code, 'error': 'Unknown code'}, status=status.HTTP_404_NOT_FOUND)
+    return Response({'code': code, 'matches': matches})
 
 @api_view(['GET'])
-def customers_list(request):
-    customers = User.objects.filter(role=UserRole.CUSTOMER).prefetch_related('locker_set')
-    serializer = CustomerSerializer(customers, many=True)
-    return Response(serializer.data)
+@permission_classes([IsAuthenticated, IsEmployee])
+@replica_view
+def search_view(request):
+    """Ranked search across customers, items, lockers and orders.
+
+    `?q=` (at least three characters), optional `?type=customer,item` and
+    `?limit=` (default 20, max 100). See `backend.search`.
+    """
+    query = request.query_params.get('q', '')
+    raw_types = request.query_params.get('type')
+    types = [kind.strip() for kind in raw_types.split(',') if kind.strip()] if raw_types else SEARCH_TYPES
+    try:
+        limit = int(request.query_params.get('limit', DEFAULT_SEARCH_LIMIT))
+        results = search(query, types, limit)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'query': query, 'results': results})
 
 @api_view(['GET'])
-def items_list(request):
-    items = Item.objects.select_related('customer', 'international_box').all()
-    from backend.serializers import ItemSerializer  # Add import
-    serializer = ItemSerializer(items, many=True)
-    return Response(serializer.data)
+@permission_classes([IsAuthenticated, IsEmployee])
+@replica_view
+def timeline_view(request):
+    """Status timelines for one or many entities, from one query.
+
+    `?entities=item:1,item:2,box:7` (comma-separated and/or repeated).
+    Returns `{'timelines': [{'entity_type', 'entity_id', 'events'}],
+    'next'}`; pass `next` back as `?cursor=` for the following page and
+    `?limit=` to size pages (default 200, max 1000). With `?latest=1`
+    returns `{'latest': [...]}`, the newest event per entity. See
+    `backend.timeline`.
+    """
+    try:
+        refs = parse_refs(request.query_params.getlist('entities'))
+        if request.query_params.get('latest') in ('1', 'true'):
+            return Response({'latest': latest_statuses(refs)})
+        limit = int(request.query_params.get('limit', DEFAULT_TIMELINE_LIMIT))
+        groups, next_cursor = timelines(refs, limit, request.query_params.get('cursor'))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'timelines': groups, 'next': next_cursor})
+
+def _error_message(errors):
+    """Flatten serializer errors into one `field: message` string."""
+    parts = []
+    for field, messages in errors.items():
+        text = ' '.join(str(message) for message in messages)
+        parts.append(text if field == 'non_field_errors' else f'{field}: {text}')
+    return '; '.join(parts)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsEmployee])
+def batch_scans(request):
+    """Ingest a batch of intake scans: `{"scans": [{"tracking_number", ...}]}`.
+
+    Always answers 200 with one result per input row (in input order);
+    malformed or unknown rows are reported individually instead of
+    failing the batch. A row's `error` is always a message string.
+    """
+    rows = request.data.get('scans') if isinstance(request.data, dict) else None
+    if not isinstance(rows, list) or not rows:
+        return Response(
+            {'error': 'scans must be a non-empty list'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(rows) > MAX_BATCH_SIZE:
+        return Response(
+            {'error': f'At most {MAX_BATCH_SIZE} scans per batch'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    results = [None] * len(rows)
+    valid = []
+    for index, row in enumerate(rows):
+        serializer = ScanSerializer(data=row)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            results[index] = {
+                'tracking_number': row.get('tracking_number') if isinstance(row, dict) else None,
+                'ok': False,
+                'error': _error_message(serializer.errors),
+            }
+    if valid:
+        ingested = ingest_scans([data for _, data in valid], user=request.user)
+        for (index, _), result in zip(valid, ingested):
+            results[index] = result
+
+    succeeded = sum(1 for result in results if result['ok'])
+    return Response({
+        'processed': len(results),
+        'succeeded': succeeded,
+        'failed': len(results) - succeeded,
+        'results': results,
+    })
+
+def _get_warehouse(data):
+    try:
+        return Warehouse.objects.get(pk=int(data.get('warehouse')))
+    except (AttributeError, TypeError, ValueError, Warehouse.DoesNotExist):
+        return None
+
+def _packing_limits(data):
+    """`(max_weight, max_items)` from a packing request; raises ValueError."""
+    try:
+        max_weight = float(data.get('max_weight_kg', DEFAULT_MAX_WEIGHT_KG))
+        max_items = int(data.get('max_items', DEFAULT_MAX_ITEMS))
+    except (TypeError, ValueError):
+        raise ValueError('max_weight_kg and max_items must be numbers')
+    if max_weight <= 0 or max_items <= 0:
+        raise ValueError('max_weight_kg and max_items must be positive')
+    return max_weight, max_items
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsEmployee])
+def packing_plan(request):
+    """Propose box assignments for a warehouse's validated items.
+
+    Body: `{"warehouse": id, "max_weight_kg": 30, "max_items": 50}`.
+    Nothing is written; pass the returned boxes to `/api/packing/apply/`.
+    """
+    warehouse = _get_warehouse(request.data)
+    if warehouse is None:
+        return Response({'error': 'A valid warehouse id is required'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        max_weight, max_items = _packing_limits(request.data)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(plan_warehouse(warehouse, max_weight, max_items))
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated, IsEmployee])
+def packing_apply(request):
+    """Create boxes for a plan: `{"warehouse": id, "boxes": [{"destination_country", "item_ids"}]}`.
+
+    Boxes are checked against `max_weight_kg` and `max_items` (the same
+    fields and defaults as `/api/packing/plan/`). Answers 409 with the
+    offending ids when the plan is stale.
+    """
+    warehouse = _get_warehouse(request.data)
+    if warehouse is None:
+        return Response({'error': 'A valid warehouse id is required'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        max_weight, max_items = _packing_limits(request.data)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    planned = request.data.get('boxes')
+    if not isinstance(planned, list) or not planned:
+        return Response(
+            {'error': 'boxes must be a non-empty list of {destination_country, item_ids}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    serializer = PlannedBoxSerializer(data=planned, many=True)
+    if not serializer.is_valid():
+        return Response({'error': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        boxes = apply_plan(
+            warehouse, serializer.validated_data, user=request.user,
+            max_weight=max_weight, max_items=max_items,
+        )
+    except StalePlanError as e:
+        return Response(
+            {'error': str(e), 'stale_item_ids': e.item_ids},
+            status=status.HTTP_409_CONFLICT
+        )
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    serializer = InternationalBoxSerializer(boxes, many=True)
+    return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 @api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdminOrSuperAdmin])
 def statistics_view(request):
-    # This view is currently not in use.
-    pass
-    return Response({"message": "Statistics view is under construction."})
+    """Reports for a date range from the daily rollups (see `backend.reports`).
+
+    `?start=` and `?end=` are ISO dates (default: the last 30 days,
+    inclusive, at most `REPORTS['MAX_RANGE_DAYS']`); `?warehouse=` limits
+    the report to one warehouse.
+    """
+    params = request.query_params
+    try:
+        end = date.fromisoformat(params['end']) if params.get('end') else timezone.localdate()
+        start = date.fromisoformat(params['start']) if params.get('start') else end - timedelta(days=29)
+        warehouse = params.get('warehouse')
+        warehouse = int(warehouse) if warehouse else None
+        if report_settings()['REFRESH_ON_READ']:
+            with unpinned_writes():
+                update_rollups(max_batches=1, wait=False)
+        data = report(start, end, warehouse, using=replica_alias(request.user))
+    except OverflowError:
+        return Response({'error': 'date out of range'}, status=status.HTTP_400_BAD_REQUEST)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(data)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdminOrSuperAdmin])
+def db_connections_view(request):
+    """Connection reuse and pool counters of the serving process (see `backend.db_metrics`)."""
+    return Response(connection_stats())
   
 @api_view(['GET'])
+@permission_classes([IsAuthenticated])
 def notifications_view(request):
-    # This view is currently not in use.
-    pass
-    return Response({"message": "Notifications view is under construction."})
+    """The current user's notifications, newest first, cursor-paginated.
+
+    `?unread=1` lists only unread ones. Delivery by email/SMS happens in
+    the `send_notifications` worker (see `backend.notifications`).
+    """
+    inbox = Notification.objects.filter(user_id=request.user.pk)
+    if request.query_params.get('unread') in ('1', 'true'):
+        inbox = inbox.filter(read_at__isnull=True)
+    serializer = FastSerializer(NotificationSerializer())
+    paginator = IdCursorPagination()
+    page = paginator.paginate_queryset(serializer.values(inbox), request)
+    return paginator.get_paginated_response(serializer.serialize(page))
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def notifications_mark_read(request):
+    """Mark `{"ids": [...]}` (or every notification when `ids` is absent) as read."""
+    ids = request.data.get('ids')
+    if ids is not None and (not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids)):
+        return Response({'error': 'ids must be a list of integers'}, status=status.HTTP_400_BAD_REQUEST)
+    unread = Notification.objects.filter(user_id=request.user.pk, read_at__isnull=True)
+    if ids is not None:
+        unread = unread.filter(id__in=ids)
+    return Response({'marked': unread.update(read_at=timezone.now())})
 
 @api_view(['GET'])
 @permission_classes([IsAdminOrSuperAdmin])
@@ -11,8 +11,12 @@ from django.contrib.auth import get_user_model, authenticate
 from backend.serializers import UserProfileSerializer
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from backend.async_api import async_api_view
+from backend.authentication import adb_user, add_role_claims, db_user
+from backend.token_blacklist import CachedBlacklistRefreshToken
+from backend.versions import versioned
 
 User = get_user_model()
 
@@ -49,8 +53,8 @@ def login_view(request):
             status=status.HTTP_403_FORBIDDEN
         )
     
-    # Generate tokens
-    refresh = RefreshToken.for_user(user)
+    # Generate tokens (access tokens carry role claims, see backend.authentication)
+    refresh = CachedBlacklistRefreshToken.for_user(user)
     
     return Response({
         'access': str(refresh.access_token),
@@ -74,7 +78,7 @@ def logout_view(request):
     """Logout view - blacklist refresh token"""
     try:
         refresh_token = request.data.get('refresh')
-        token = RefreshToken(refresh_token)
+        token = CachedBlacklistRefreshToken(refresh_token)
         token.blacklist()
         return Response(
             {'detail': 'Successfully logged out.'},
@@ -92,11 +96,15 @@ def logout_view(request):
         )
 
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def current_user(request):
-    """Get current authenticated user information"""
+@async_api_view(['GET'], permission_classes=[IsAuthenticated])
+async def current_user(request):
+    """Get current authenticated user information.
+
+    Answered from the token claims; pass `?fresh=1` to read the database.
+    """
     user = request.user
+    if request.query_params.get('fresh') in ('1', 'true'):
+        user = await adb_user(request)
     return Response({
         'id': user.id,
         'email': user.email,
@@ -122,21 +130,32 @@ def refresh_token_view(request):
         )
     
     try:
-        refresh = RefreshToken(refresh_token)
+        refresh = CachedBlacklistRefreshToken(refresh_token)
         user_id = refresh.payload.get('user_id')
-        user = User.objects.get(id=user_id)
+        user = User.objects.get(id=user_id, is_active=True)
         
-        # Generate new access token
-        new_access_token = str(refresh.access_token)
-        
-        return Response({
+        # Generate new access token with up-to-date role claims
+        new_access_token = str(add_role_claims(refresh.access_token, user))
+        data = {
             'access': new_access_token,
             'user': {
                 'id': user.id,
                 'email': user.email,
                 'role': user.role,
             }
-        })
+        }
+        
+        # Rotate the refresh token; the old one is blacklisted. The blacklist
+        # row is unique per token, so of two concurrent refreshes with the
+        # same token only the one that inserts it gets a new pair.
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                _, created = refresh.blacklist()
+                if not created:
+                    raise TokenError('Token is blacklisted')
+            data['refresh'] = str(CachedBlacklistRefreshToken.for_user(user))
+        
+        return Response(data)
     except TokenError:
         return Response(
             {'error': 'Invalid or expired refresh token'},
@@ -151,14 +170,16 @@ def refresh_token_view(request):
 
 @api_view(['GET', 'PUT'])
 @permission_classes([IsAuthenticated])
+@versioned(per_user=True)
 def user_profile(request):
     """Get or update user profile"""
+    user = db_user(request)
     if request.method == 'GET':
-        serializer = UserProfileSerializer(request.user)
+        serializer = UserProfileSerializer(user)
         return Response(serializer.data)
     
     elif request.method == 'PUT':
-        serializer = UserProfileSerializer(request.user, data=request.data, partial=True)
+        serializer = UserProfileSerializer(user, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
             return Response(serializer.data)
@@ -170,7 +191,7 @@ def user_settings(request):
     """Get or update user settings"""
     if request.method == 'GET':
         # Return current user's settings
-        user = request.user
+        user = db_user(request)
         return Response({
             'email_notifications': getattr(user, 'email_notifications', True),
             'sms_notifications': getattr(user, 'sms_notifications', False),
@@ -179,7 +200,7 @@ def user_settings(request):
     
     elif request.method == 'PUT':
         # Update user settings
-        user = request.user
+        user = db_user(request)
         data = request.data
         
         # Update settings fields if they exist on your User model
@@ -0,0 +1,161 @@
+"""backend.views.live_views
+
+Live update transports for staff dashboards, served under ASGI.
+
+* `live_events` (`GET /api/live/`) is a Server-Sent Events stream.
+* `websocket_application` is a raw ASGI WebSocket app mounted by
+  `shipperdV1.asgi` at `LIVE_WEBSOCKET_PATH`; clients may send
+  `{"warehouses": [1, 2]}` to change their filter.
+
+Both authenticate with an access token (the `Authorization` header or a
+`?token=` parameter, since browsers cannot set headers on EventSource
+or WebSocket), accept staff only, and take an optional
+`?warehouse=1,2` filter. Events come from `backend.live`; each
+connection waits on its own queue, so idle connections cost no thread.
+"""
+
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from backend.authentication import RoleClaimsJWTAuthentication
+from backend.live import get_hub, live_settings
+
+LIVE_WEBSOCKET_PATH = '/ws/live/'
+
+
+def _authenticate(raw_token):
+    """The staff user for `raw_token`; raises PermissionError or AuthenticationFailed."""
+    if not raw_token:
+        raise AuthenticationFailed('Authentication credentials were not provided.')
+    auth = RoleClaimsJWTAuthentication()
+    try:
+        user = auth.get_user(auth.get_validated_token(raw_token))
+    except (InvalidToken, TokenError):
+        raise AuthenticationFailed('Given token not valid or expired.')
+    if not user.is_employee():
+        raise PermissionError('Live updates are available to staff only.')
+    return user
+
+
+def parse_warehouses(value):
+    """`'1,2'` -> `{1, 2}`; empty means every warehouse (None)."""
+    if not value:
+        return None
+    try:
+        return {int(part) for part in value.split(',') if part.strip()} or None
+    except ValueError:
+        raise ValueError('warehouse must be a comma-separated list of ids')
+
+
+# Server-Sent Events -----------------------------------------------------------
+
+def _sse(event):
+    return f'id: {event.id}\nevent: {event.kind}\ndata: {event.payload}\n\n'
+
+
+async def live_events(request):
+    """Stream live updates as `text/event-stream`."""
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {'error': 'Live updates need the ASGI server (shipperdV1.asgi:application)'}, status=503,
+        )
+    header = request.headers.get('Authorization', '')
+    raw_token = header[7:] if header.startswith('Bearer ') else request.GET.get('token')
+    try:
+        warehouses = parse_warehouses(request.GET.get('warehouse'))
+        user = await sync_to_async(_authenticate)(raw_token)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except AuthenticationFailed as e:
+        return JsonResponse({'error': str(e.detail)}, status=401)
+    except PermissionError as e:
+        return JsonResponse({'error': str(e)}, status=403)
+
+    hub = get_hub()
+    subscription = hub.subscribe(user.role, warehouses)
+    heartbeat = live_settings()['HEARTBEAT_SECONDS']
+
+    async def stream():
+        try:
+            # Clients refetch on `ready`, covering anything missed while disconnected.
+            yield f'retry: 3000\nevent: ready\ndata: {json.dumps({"warehouses": sorted(warehouses or [])})}\n\n'
+            while True:
+                event = await subscription.next_event(heartbeat)
+                yield ': keep-alive\n\n' if event is None else _sse(event)
+        finally:
+            hub.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream.
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# WebSocket --------------------------------------------------------------------
+
+def _frame(event):
+    return f'{{"type":"{event.kind}","id":{event.id},"data":{event.payload}}}'
+
+
+async def _read_client(receive, subscription):
+    """Apply filter changes sent by the client until it disconnects."""
+    while True:
+        message = await receive()
+        if message['type'] == 'websocket.disconnect':
+            return
+        if message['type'] == 'websocket.receive' and message.get('text'):
+            try:
+                warehouses = json.loads(message['text']).get('warehouses')
+                subscription.warehouses = {int(pk) for pk in warehouses} if warehouses else None
+            except (ValueError, TypeError, AttributeError):
+                continue
+
+
+async def websocket_application(scope, receive, send):
+    """ASGI app for `LIVE_WEBSOCKET_PATH`; closes with 4400/4401/4403 on bad requests."""
+    if (await receive())['type'] != 'websocket.connect':
+        return
+    if scope['path'] != LIVE_WEBSOCKET_PATH:
+        await send({'type': 'websocket.close', 'code': 4404})
+        return
+    params = parse_qs(scope.get('query_string', b'').decode())
+    try:
+        warehouses = parse_warehouses(params.get('warehouse', [''])[0])
+        user = await sync_to_async(_authenticate)(params.get('token', [''])[0])
+    except ValueError:
+        await send({'type': 'websocket.close', 'code': 4400})
+        return
+    except AuthenticationFailed:
+        await send({'type': 'websocket.close', 'code': 4401})
+        return
+    except PermissionError:
+        await send({'type': 'websocket.close', 'code': 4403})
+        return
+
+    await send({'type': 'websocket.accept'})
+    hub = get_hub()
+    subscription = hub.subscribe(user.role, warehouses)
+    heartbeat = live_settings()['HEARTBEAT_SECONDS']
+    reader = asyncio.ensure_future(_read_client(receive, subscription))
+    try:
+        await send({'type': 'websocket.send', 'text': '{"type":"ready","id":0,"data":{}}'})
+        while True:
+            getter = asyncio.ensure_future(subscription.queue.get())
+            done, _ = await asyncio.wait({getter, reader}, timeout=heartbeat, return_when=asyncio.FIRST_COMPLETED)
+            if getter not in done:
+                getter.cancel()
+            if reader in done:
+                break
+            text = _frame(getter.result()) if getter in done else '{"type":"heartbeat"}'
+            await send({'type': 'websocket.send', 'text': text})
+    finally:
+        hub.unsubscribe(subscription)
+        reader.cancel()
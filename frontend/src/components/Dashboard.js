@@ -1,6 +1,6 @@
 // src/components/Dashboard.js - UPDATED
 import React, { useState, useEffect } from 'react';
-import { dashboardAPI } from '../services/api';
+import { dashboardAPI, debounce, subscribeLive } from '../services/api';
 import EmployeeDashboard from './dashboards/EmployeeDashboard';
 import AdminDashboard from './dashboards/AdminDashboard';
 import SuperAdminDashboard from './dashboards/SuperAdminDashboard';
@@ -34,6 +34,14 @@ const Dashboard = () => {
     };
 
     fetchStats();
+
+    // Counters change in bursts; refetch once things settle.
+    const refresh = debounce(fetchStats, 1000);
+    return subscribeLive((type) => {
+      if (type === 'counters' || type === 'resync') {
+        refresh();
+      }
+    });
   }, []);
 
   const handleProfileUpdated = (updatedUser) => {
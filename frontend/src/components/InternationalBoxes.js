@@ -1,6 +1,6 @@
 // src/components/InternationalBoxes.js
 import React, { useState, useEffect, useCallback } from 'react';
-import { dashboardAPI } from '../services/api';
+import { dashboardAPI, debounce, subscribeLive } from '../services/api';
 
 const InternationalBoxes = () => {
   const [boxes, setBoxes] = useState([]);
@@ -40,7 +40,7 @@ const InternationalBoxes = () => {
         setLoading(true);
         setError(null);
         const response = await dashboardAPI.getBoxes();
-        setBoxes(response.data);
+        setBoxes(response.data.results);
       } catch (error) {
         console.error('Error fetching boxes:', error);
         setError('Failed to load boxes. Showing sample data.');
@@ -50,6 +50,20 @@ const InternationalBoxes = () => {
       }
     };
     fetchBoxes();
+
+    const refresh = debounce(async () => {
+      try {
+        const response = await dashboardAPI.getBoxes();
+        setBoxes(response.data.results);
+      } catch (error) {
+        console.error('Error refreshing boxes:', error);
+      }
+    }, 1000);
+    return subscribeLive((type, data) => {
+      if (type === 'resync' || (type === 'status' && data.entity === 'box')) {
+        refresh();
+      }
+    });
   }, [getDummyBoxes]);
 
   if (loading) {
@@ -37,8 +37,12 @@ api.interceptors.response.use(
           refresh: refreshToken,
         });
         
-        const { access } = response.data;
+        const { access, refresh } = response.data;
         localStorage.setItem('access_token', access);
+        if (refresh) {
+          // Refresh tokens are rotated; the old one is now blacklisted
+          localStorage.setItem('refresh_token', refresh);
+        }
         
         originalRequest.headers.Authorization = `Bearer ${access}`;
         return api(originalRequest);
@@ -59,9 +63,15 @@ api.interceptors.response.use(
 // Dashboard APIs
 export const dashboardAPI = {
   getStats: () => api.get('/stats/'),
-  getBoxes: () => api.get('/boxes/'),
+  getBoxes: () => api.get('/boxes/', {
+    params: {
+      fields: 'box_number,status,total_weight_kg,items_count,warehouse',
+      expand: 'warehouse',
+    },
+  }),
   getItems: () => api.get('/items/'),
   getCustomers: () => api.get('/customers/'),
+  getReport: (params) => api.get('/statistics/', { params }),
 };
 
 // Profile and Settings APIs - ADD THESE
@@ -76,4 +86,32 @@ export const profileAPI = {
 export const authAPI = {
   logout: (refreshToken) => api.post('/auth/logout/', { refresh: refreshToken }),
   getCurrentUser: () => api.get('/auth/me/'),
-};
\ No newline at end of file
+};
+// Live updates over Server-Sent Events; returns a function that closes the stream.
+// onEvent(type, data) gets 'ready', 'status', 'counters' and 'resync' events.
+export const subscribeLive = (onEvent, { warehouses } = {}) => {
+  const params = new URLSearchParams({ token: localStorage.getItem('access_token') || '' });
+  if (warehouses && warehouses.length) {
+    params.set('warehouse', warehouses.join(','));
+  }
+  const source = new EventSource(`${API_BASE_URL}/live/?${params}`);
+  ['ready', 'status', 'counters', 'resync'].forEach((type) => {
+    source.addEventListener(type, (event) => onEvent(type, JSON.parse(event.data)));
+  });
+  return () => source.close();
+};
+
+// Calls fn at most once per `wait` ms, after the last call.
+export const debounce = (fn, wait = 1000) => {
+  let timer = null;
+  return (...args) => {
+    clearTimeout(timer);
+    timer = setTimeout(() => fn(...args), wait);
+  };
+};
+
+// Notification inbox
+export const notificationsAPI = {
+  list: (params) => api.get('/notifications/', { params }),
+  markRead: (ids) => api.post('/notifications/read/', ids ? { ids } : {}),
+};
@@ -2,6 +2,9 @@
 ASGI config for shipperdDjngo_version project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP requests go to Django; WebSocket connections go to the live update
+app in ``backend.views.live_views``. Serve it with an ASGI server, e.g.
+``uvicorn shipperdV1.asgi:application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -12,5 +15,17 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'shipperdV1.settings')
+# Picks the connection mode and pool size for an ASGI process (see DB_CONN_MODE in settings).
+os.environ.setdefault('DB_WORKER_KIND', 'asgi')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up.
+from backend.views.live_views import websocket_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        await websocket_application(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
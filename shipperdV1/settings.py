@@ -6,6 +6,8 @@ Generated by 'django-admin startproject' using Django 5.2.8.
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -56,6 +58,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'backend.db_routing.ReplicaRoutingMiddleware',
 ]
 
 CORS_ALLOWED_ORIGINS = [
@@ -86,6 +89,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'shipperdV1.wsgi.application'
+ASGI_APPLICATION = 'shipperdV1.asgi.application'
 
 
 # Database
@@ -94,14 +98,87 @@ WSGI_APPLICATION = 'shipperdV1.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'shipperd_db',
-        'USER': 'asmaa',     
-        'PASSWORD': 'Asmaa@500500',
-        'HOST': 'localhost',
-        'PORT': '5432',
+        'NAME': os.environ.get('DB_NAME', 'shipperd_db'),
+        'USER': os.environ.get('DB_USER', 'asmaa'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', 'Asmaa@500500'),
+        'HOST': os.environ.get('DB_HOST', 'localhost'),
+        'PORT': os.environ.get('DB_PORT', '5432'),
+        'OPTIONS': {},
     }
 }
 
+# Connection reuse (see backend.db_metrics for the numbers). DB_CONN_MODE:
+#   persistent - each worker thread keeps its connection for DB_CONN_MAX_AGE
+#                seconds, health-checked before reuse (default under WSGI);
+#   pool       - psycopg 3's native pool, `pip install "psycopg[binary,pool]"`;
+#   off        - a new connection (TCP + auth handshake) per request (default
+#                under ASGI, where Django does not close a request's
+#                connection reliably; use pool there for reuse).
+# Pool bounds per process. WSGI workers need one connection per request
+# thread. Under ASGI each request runs its sync and async ORM work on a
+# thread of its own (a thread-sensitive context per request), so every
+# in-flight request that touches the database holds a connection; the max
+# caps that, and requests past it wait up to DB_POOL_TIMEOUT. Background
+# commands (DB_WORKER_KIND=worker) run one job at a time.
+DB_WORKER_KIND = os.environ.get('DB_WORKER_KIND', 'wsgi')
+DB_CONN_MODE = os.environ.get('DB_CONN_MODE', 'off' if DB_WORKER_KIND == 'asgi' else 'persistent')
+DB_POOL_SIZES = {
+    'wsgi': (1, int(os.environ.get('DB_WORKER_THREADS', '4'))),
+    'asgi': (2, int(os.environ.get('DB_ASGI_CONNECTIONS', '10'))),
+    'worker': (1, 2),
+}
+
+if DB_CONN_MODE == 'pool':
+    try:
+        from psycopg_pool import ConnectionPool
+    except ImportError:
+        raise ImproperlyConfigured('DB_CONN_MODE=pool needs psycopg 3: pip install "psycopg[binary,pool]"')
+    if DB_WORKER_KIND not in DB_POOL_SIZES:
+        raise ImproperlyConfigured(f'DB_WORKER_KIND must be one of {", ".join(DB_POOL_SIZES)}')
+    _pool_min, _pool_max = DB_POOL_SIZES[DB_WORKER_KIND]
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', _pool_min)),
+        'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', _pool_max)),
+        # Seconds a request waits for a free connection before failing.
+        'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
+        'max_lifetime': float(os.environ.get('DB_POOL_MAX_LIFETIME', '3600')),
+        'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', '600')),
+        # Health-check connections as they leave the pool.
+        'check': ConnectionPool.check_connection,
+    }
+elif DB_CONN_MODE == 'persistent':
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', '60'))
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+elif DB_CONN_MODE != 'off':
+    raise ImproperlyConfigured('DB_CONN_MODE must be persistent, pool or off')
+
+# Read replica (backend.db_routing). Set DB_REPLICA_HOST to add a `replica`
+# alias; the other connection settings default to the primary's. List,
+# search, report and export reads go there, writers are pinned to the
+# primary for PIN_SECONDS, and an unreachable replica is skipped for
+# RETRY_SECONDS.
+if os.environ.get('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ.get('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'USER': os.environ.get('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.environ.get('DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        'HOST': os.environ['DB_REPLICA_HOST'],
+        'PORT': os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        # Fail fast so a dead replica falls back to the primary quickly.
+        'OPTIONS': {
+            **DATABASES['default']['OPTIONS'],
+            'connect_timeout': int(os.environ.get('DB_REPLICA_CONNECT_TIMEOUT', '3')),
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['backend.db_routing.ReplicaRouter']
+DB_ROUTING = {
+    'REPLICAS': ('replica',),
+    'PIN_SECONDS': int(os.environ.get('DB_PIN_SECONDS', '10')),
+    'RETRY_SECONDS': 30,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -167,7 +244,7 @@ SIMPLE_JWT = {
     
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
-    'TOKEN_USER_CLASS': 'rest_framework_simplejwt.models.TokenUser',
+    'TOKEN_USER_CLASS': 'backend.authentication.RoleTokenUser',
     
     'JTI_CLAIM': 'jti',
 }
@@ -185,10 +262,18 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'backend.authentication.RoleClaimsJWTAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'backend.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ],
 }
 
+# Authenticate API requests from the JWT role claims without loading the
+# user row (see backend.authentication).
+JWT_STATELESS_USER = os.environ.get('JWT_STATELESS_USER', 'false').lower() == 'true'
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",  # React frontend
@@ -200,6 +285,60 @@ CORS_ALLOW_CREDENTIALS = True
 if DEBUG:
     CORS_ALLOW_ALL_ORIGINS = True
 
+# Status log writer (see backend/status_logs.py).
+# BACKGROUND coalesces audit writes across requests in a background thread.
+STATUS_LOG_WRITER = {
+    'BACKGROUND': os.environ.get('STATUS_LOG_BACKGROUND', 'false').lower() == 'true',
+    'FLUSH_INTERVAL_MS': int(os.environ.get('STATUS_LOG_FLUSH_INTERVAL_MS', '200')),
+    'MAX_BATCH': 1000,
+}
+
+# Tracking-code lookup cache (see backend/lookup.py)
+TRACKING_LOOKUP = {
+    'CACHE_SIZE': 10000,
+    'CACHE_TTL_SECONDS': 60,
+    'FILTER_CAPACITY': 2000000,
+    'FILTER_ERROR_RATE': 0.01,
+    'FILTER_REFRESH_SECONDS': 5,
+}
+
+# Locker numbers reserved per round trip by each worker (backend/locker_codes.py)
+LOCKER_CODE_BLOCK_SIZE = 50
+
+# Reporting rollups folded from StatusLog (see backend/reports.py)
+REPORTS = {
+    'BATCH_SIZE': 10000,
+    'SETTLE_SECONDS': 30,
+    'REFRESH_ON_READ': True,
+}
+
+# Outgoing email. Locally messages are written to EMAIL_FILE_PATH; set
+# EMAIL_BACKEND=django.core.mail.backends.smtp.EmailBackend with
+# EMAIL_PORT=1025 to hand them to an SMTP debug server instead.
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.filebased.EmailBackend')
+EMAIL_FILE_PATH = os.environ.get('EMAIL_FILE_PATH', str(BASE_DIR / 'sent_emails'))
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', '25'))
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'notifications@shipperd.local')
+
+# Customer notifications outbox worker (see backend/notifications.py)
+NOTIFICATIONS = {
+    'SMS_BACKEND': os.environ.get('SMS_BACKEND', 'backend.notifications.FileSMSBackend'),
+    'SMS_FILE_PATH': os.environ.get('SMS_FILE_PATH', str(BASE_DIR / 'sent_sms')),
+    'QUIET_HOURS': (22, 7),
+    'DIGEST_SECONDS': 60,
+    'BATCH_SIZE': 500,
+}
+
+# Live dashboard updates (backend.live). Without a broker events only reach
+# connections on the process that made the change; set LIVE_BROKER=postgres
+# when running several ASGI workers.
+LIVE_UPDATES = {
+    'BROKER': os.environ.get('LIVE_BROKER') or None,
+    'QUEUE_SIZE': 256,
+    'HEARTBEAT_SECONDS': 25,
+}
+
 # Login/Logout URLs
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
\ No newline at end of file